@@ -60,6 +60,19 @@ from .core.router import (
 from .core.middleware_chain import (
     MiddlewareChain,
 )
+from .core.offload import (
+    blocking,
+)
+from .core.cpu_bound import (
+    cpu_bound,
+)
+from .core.deadline import (
+    deadline,
+    run_to_completion,
+)
+from .core.bulkhead import (
+    bulkhead,
+)
 
 # alias Application
 Growler = App = Application
@@ -5,6 +5,7 @@
 Code containing Growler's asyncio.Protocol code for handling HTTP requests.
 """
 
+import asyncio
 import traceback
 from sys import stderr
 from asyncio import Future
@@ -16,6 +17,10 @@ from growler.http.errors import (
 )
 
 
+# available from Python 3.12
+eager_task_factory = getattr(asyncio, 'eager_task_factory', None)
+
+
 # Or should this be called HTTPGrowlerProtocol?
 class GrowlerHTTPProtocol(GrowlerProtocol):
     """
@@ -138,11 +143,30 @@ class GrowlerHTTPProtocol(GrowlerProtocol):
         """
         Entry point for the application middleware chain for an asyncio
         event loop.
+        The task is tracked, so it is cancelled if the client disconnects
+        before it completes.
+
+        If the application's `inline_sync` option is set, requests
+        which can be are handled right away, without a task (see
+        :meth:`Application.dispatch`), and if its `eager_tasks` option
+        is set, tasks are started eagerly (on Python 3.12 and later).
         """
+        app = self.http_application
+        if app.inline_sync:
+            coro = app.dispatch(req, res)
+            if coro is None:
+                return
+        else:
+            coro = app.handle_client_request(req, res)
+
         # Add the middleware processing to the event loop - this *should*
         # change the call stack so any server errors do not link back to this
         # function
-        self.loop.create_task(self.http_application.handle_client_request(req, res))
+        if app.eager_tasks and eager_task_factory is not None:
+            task = eager_task_factory(self.loop, coro)
+        else:
+            task = self.loop.create_task(coro)
+        self.track_task(task, req)
 
     def body_storage_pair(self):
         """
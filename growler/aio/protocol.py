@@ -80,7 +80,10 @@ class GrowlerProtocol(asyncio.Protocol, ResponderHandler):
 
     transport = None
     responders = None
+    tasks = None
     is_done_transmitting = False
+    writing_paused = False
+    _drain_waiter = None
 
     def __init__(self, loop, responder_factory):
         """
@@ -102,6 +105,7 @@ class GrowlerProtocol(asyncio.Protocol, ResponderHandler):
         """
         self.make_responder = responder_factory
         self.loop = loop if (loop is not None) else asyncio.get_event_loop()
+        self.tasks = {}
 
     def connection_made(self, transport):
         """
@@ -137,7 +141,9 @@ class GrowlerProtocol(asyncio.Protocol, ResponderHandler):
         (asyncio.Protocol member)
 
         Called upon when a socket closes.
-        This class simply logs the disconnection
+        This logs the disconnection and cancels the tasks still running
+        on behalf of the connection (see :meth:`track_task`), as nobody
+        is left to receive their results.
 
         Args:
             exc (Exception or None): Error if connection closed
@@ -148,6 +154,83 @@ class GrowlerProtocol(asyncio.Protocol, ResponderHandler):
         else:
             log.info("{:d} connection_lost", id(self))
 
+        cancelled = self.cancel_tasks()
+        if cancelled:
+            log.info("%d cancelled %d abandoned task(s)", id(self), cancelled)
+
+        # nothing will be drained any more - release those waiting
+        self.resume_writing()
+
+    def pause_writing(self):
+        """
+        (asyncio.Protocol member)
+
+        Called upon when the transport's write buffer grows past its
+        high-water mark. Writers of large responses should wait on
+        :meth:`drain` before writing more.
+        """
+        self.writing_paused = True
+
+    def resume_writing(self):
+        """
+        (asyncio.Protocol member)
+
+        Called upon when the transport's write buffer has drained below
+        its low-water mark, waking anyone waiting on :meth:`drain`.
+        """
+        self.writing_paused = False
+        waiter, self._drain_waiter = self._drain_waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def drain(self):
+        """
+        Returns once the transport accepts more data; right away unless
+        writing has been paused, otherwise when it is resumed or the
+        connection is lost.
+        """
+        if not self.writing_paused:
+            return
+        if self._drain_waiter is None:
+            self._drain_waiter = self.loop.create_future()
+        # one cancelled writer must not cancel the others' wait
+        await asyncio.shield(self._drain_waiter)
+
+    def track_task(self, task, req=None):
+        """
+        Registers a task running on behalf of the connection, to be
+        cancelled should the connection be lost before it is done.
+        The task is forgotten once done.
+
+        Args:
+            task (asyncio.Task): The task
+            req (object): The request the task serves; if given, and its
+                `cancel_on_disconnect` attribute is false when the
+                connection is lost, the task is left running
+        """
+        self.tasks[task] = req
+        task.add_done_callback(self._forget_task)
+        return task
+
+    def _forget_task(self, task):
+        self.tasks.pop(task, None)
+
+    def cancel_tasks(self):
+        """
+        Cancels every tracked task which is not done, except those of
+        requests which opted out.
+
+        Returns:
+            int: The number of tasks cancelled
+        """
+        cancelled = 0
+        for task, req in list(self.tasks.items()):
+            if task.done() or not getattr(req, 'cancel_on_disconnect', True):
+                continue
+            task.cancel()
+            cancelled += 1
+        return cancelled
+
     def data_received(self, data):
         """
         (asyncio.Protocol member)
@@ -27,13 +27,24 @@ explained elsewhere)
 
 import os
 import sys
+import time
 import types
+import asyncio
 import inspect
 import logging
+from concurrent.futures import ProcessPoolExecutor
 
 from ..utils.event_manager import Events
-from .router import Router, RouterMeta
+from ..utils.json_encoding import default_json_encoder
+from .router import Router, RouterMeta, LazyRouter
 from .middleware_chain import MiddlewareChain
+from .route_cache import RouteCache
+from .pipeline import Pipeline
+from .vhost import VirtualHosts
+from .offload import ThreadPools, DEFAULT_POOL, running_worker
+from .bulkhead import release_all
+from .deadline import parse_timeout_header
+from .background import BackgroundTasks
 
 from ..http import (
     HTTPRequest,
@@ -91,12 +102,41 @@ class Application:
 
     error_recursion_max_depth = 10
 
+    json_encoder = staticmethod(default_json_encoder)
+    json_offload_threshold = None
+
+    offload_sync = False
+
+    inline_sync = False
+    eager_tasks = False
+
+    _process_pool = None
+
+    frozen = False
+    started = False
+
+    _pipelines = None
+    _pipeline_shapes = None
+    _compiled_generation = None
+
     def __init__(self,
                  name=__name__,
                  debug=True,
                  request_class=HTTPRequest,
                  response_class=HTTPResponse,
                  middleware_chain=None,
+                 json_encoder=None,
+                 json_offload_threshold=None,
+                 offload_sync=False,
+                 thread_pool_size=None,
+                 process_pool_size=None,
+                 request_timeout=None,
+                 deadline_header=None,
+                 inline_sync=False,
+                 eager_tasks=False,
+                 background_concurrency=8,
+                 background_queue_size=1000,
+                 warm_up_lazy_routers=False,
                  **kw
                  ):
         """
@@ -132,6 +172,64 @@ class Application:
                 This value is accessible via the attribute
                 :attr:`middleware`.
 
+            json_encoder (callable): Function used by
+                :meth:`HTTPResponse.send_json` to convert an object
+                into bytes.
+                The default uses the standard json module with compact
+                separators; pass
+                :func:`growler.utils.json_encoding.orjson_encoder` to
+                use orjson instead.
+
+            json_offload_threshold (int or None): If not None, objects
+                passed to send_json with more values than this (as
+                estimated by
+                :func:`growler.utils.json_encoding.json_size_hint`)
+                are encoded in the event loop's thread pool instead of
+                blocking the loop.
+
+            offload_sync (bool): If True, every synchronous middleware
+                is run in the 'default' thread pool, as if marked with
+                :func:`growler.core.offload.blocking`.
+
+            thread_pool_size (int or None): The number of workers of
+                thread pools not sized with :meth:`thread_pool`.
+
+            process_pool_size (int or None): The number of worker
+                processes of :attr:`process_pool`; None uses the
+                number of processors.
+
+            request_timeout (float or None): The number of seconds a
+                request may take before its middleware is cancelled and
+                the client sent '504 Gateway Timeout'.
+                Routes may be given budgets of their own with
+                :func:`growler.core.deadline.deadline`.
+
+            deadline_header (str or None): The name of a request header
+                through which clients may give a (shorter) budget in
+                seconds, such as 'X-Request-Timeout'.
+
+            inline_sync (bool): If True, requests whose middleware are
+                all plain functions are handled directly as their
+                headers are parsed, without creating a task (see
+                :meth:`dispatch`).
+
+            eager_tasks (bool): If True, the tasks handling requests
+                start running as they are created, rather than upon
+                the next iteration of the event loop.
+                This requires Python 3.12 and is ignored otherwise.
+
+            background_concurrency (int): The number of jobs given to
+                :meth:`background` (or :meth:`HTTPResponse.after`) run
+                at once.
+
+            background_queue_size (int): The number of background jobs
+                which may wait to run; further jobs are dropped.
+
+            warm_up_lazy_routers (bool): If True, :meth:`startup`
+                imports the lazy routers (see :meth:`warm_up`) before
+                the server accepts connections, trading a slower start
+                for fast first requests.
+
         Keyword Args:
             Any other custom variables for the application.
             This dict is stored as the attribute 'config' in the
@@ -163,7 +261,33 @@ class Application:
         self._request_class = request_class
         self._response_class = response_class
 
+        if json_encoder is not None:
+            self.json_encoder = json_encoder
+        self.json_offload_threshold = json_offload_threshold
+
+        self.offload_sync = offload_sync
+        self.thread_pools = ThreadPools(thread_pool_size)
+        self.process_pool_size = process_pool_size
+
+        self.vhosts = VirtualHosts()
+        self._lazy_routers = []
+
+        self.request_timeout = request_timeout
+        self.deadline_header = deadline_header
+        self.abandoned_requests = 0
+
+        self.inline_sync = inline_sync
+        self.eager_tasks = eager_tasks
+        self.warm_up_lazy_routers = warm_up_lazy_routers
+        self.background_tasks = BackgroundTasks(background_concurrency,
+                                                background_queue_size)
+
+        self._startup_hooks = []
+        self._shutdown_hooks = []
+
         self.handle_404 = self.default_404_handler
+        self.handle_timeout = self.default_timeout_handler
+        self.handle_overload = self.default_overload_handler
 
     #
     # Middleware adding functions
@@ -241,6 +365,20 @@ class Application:
         """
         return self.router.delete(path, middleware)
 
+    def head(self, path="/", middleware=None):
+        """
+        An alias of the default router's 'head' method.
+        The middleware provided is called upon a HEAD HTTP request
+        matching the path; HEAD requests to paths without such
+        middleware are handled by the GET middleware instead.
+
+        Args:
+            path (str): The URL path on which the middleware is mounted
+            middleware (callable): The middleware function called upon
+                a request matching the url
+        """
+        return self.router.head(path, middleware)
+
     def use(self, middleware=None, path='/', method_mask=HTTPMethod.ALL):
         """
         Use the middleware (a callable with parameters res, req, next)
@@ -312,6 +450,190 @@ class Application:
                             func=router,
                             method_mask=HTTPMethod.ALL,)
 
+    def thread_pool(self, name, max_workers):
+        """
+        Sets the number of worker threads of the named pool, in which
+        middleware marked with ``@blocking(pool=name)`` are run.
+        The current number of queued, active and completed calls of
+        every pool is available from ``app.thread_pools.metrics()``.
+
+        Args:
+            name (str): The name of the pool
+            max_workers (int): The number of worker threads
+
+        Returns:
+            This application
+        """
+        self.thread_pools.configure(name, max_workers)
+        return self
+
+    def background(self, job, *args):
+        """
+        Runs follow-up work (an awaitable, or a function called with
+        args) as a tracked background task, see
+        :class:`growler.core.background.BackgroundTasks`.
+        Unlike a task created with loop.create_task, it is subject to
+        the application's limits and may be waited upon at shutdown
+        via ``app.background_tasks.join()``.
+
+        Returns:
+            bool: False if the job was dropped, the queue being full
+        """
+        return self.background_tasks.submit(job, *args)
+
+    def on_startup(self, hook):
+        """
+        Registers a function called with the application by
+        :meth:`startup`, before the server accepts connections; its
+        result is awaited if awaitable.
+        Use it to prepare what would otherwise be created upon the first
+        request, e.g. connection pools, compiled templates or routes.
+        Returns the hook so this method may be used as a decorator.
+        """
+        self._startup_hooks.append(hook)
+        return hook
+
+    def on_shutdown(self, hook):
+        """
+        Registers a function called with the application by
+        :meth:`shutdown`, in the reverse order of registration; its
+        result is awaited if awaitable.
+        Returns the hook so this method may be used as a decorator.
+        """
+        self._shutdown_hooks.append(hook)
+        return hook
+
+    async def startup(self):
+        """
+        Prepares the application for serving requests: binds its
+        background tasks to the running event loop, freezes it (see
+        :meth:`freeze`), imports its lazy routers if
+        `warm_up_lazy_routers` is set and runs the startup hooks in order
+        of registration.
+        Only the first call has any effect.
+        """
+        if self.started:
+            return
+        self.started = True
+        self.background_tasks.loop = asyncio.get_event_loop()
+        self.freeze()
+        if self.warm_up_lazy_routers and self._lazy_routers:
+            await self.warm_up()
+        for hook in self._startup_hooks:
+            result = hook(self)
+            if inspect.isawaitable(result):
+                await result
+
+    async def shutdown(self, timeout=None):
+        """
+        Releases the application's resources once it no longer accepts
+        connections: waits (at most timeout seconds) for its background
+        jobs, cancelling any left, runs the shutdown hooks and shuts
+        down its thread and process pools.
+        An exception raised by a hook is logged, so the following hooks
+        still run.
+        """
+        if not await self.background_tasks.join(timeout):
+            log.warning("%d cancelling %d background job(s)",
+                        id(self), len(self.background_tasks))
+            self.background_tasks.cancel()
+
+        for hook in reversed(self._shutdown_hooks):
+            try:
+                result = hook(self)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                log.exception("%d shutdown hook %r failed", id(self), hook)
+
+        self.thread_pools.shutdown(wait=False)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False)
+            self._process_pool = None
+        self.started = False
+
+    @property
+    def process_pool(self):
+        """
+        The ProcessPoolExecutor running the computations of
+        :func:`growler.core.cpu_bound.cpu_bound` middleware, created
+        upon first use.
+        """
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(self.process_pool_size)
+        return self._process_pool
+
+    def add_lazy_router(self, path, target):
+        """
+        Mounts the router named by an import string on path, without
+        importing it. The module is imported (and the router's routes
+        compiled) upon the first request matching path, or by
+        :meth:`warm_up`.
+
+        Args:
+            path (str or regex): The path on which the router binds
+            target (str): Import string of the router, in the form
+                'package.module:attribute'; the attribute defaults to
+                'router'
+
+        Returns:
+            growler.core.router.LazyRouter: The placeholder router
+        """
+        router = LazyRouter(target)
+        self.add_router(path, router)
+        self._lazy_routers.append(router)
+        return router
+
+    def warm_up(self, loop=None):
+        """
+        Imports every lazy router not yet loaded, in the event loop's
+        default executor, so the first requests to them need not wait.
+
+        Args:
+            loop (asyncio.AbstractEventLoop or None): The event loop;
+                defaults to the current event loop
+
+        Returns:
+            asyncio.Future: Completes once every router is loaded
+        """
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        pending = [loop.run_in_executor(None, router.load)
+                   for router in self._lazy_routers
+                   if router.loaded is None]
+        return asyncio.gather(*pending)
+
+    def vhost(self, hostname, router=None):
+        """
+        Serves requests whose Host header matches hostname with router
+        rather than with the application's middleware chain.
+        The hostname may be a wildcard, such as '*.example.com', which
+        matches every subdomain; an exact hostname takes precedence.
+        Requests for hosts not registered are handled as usual.
+
+        The router is looked up by hostname with a dict lookup and
+        its routes are compiled (and cached) separately from those of
+        other hosts. Middleware shared between hosts must be added to
+        each router.
+
+        Args:
+            hostname (str): The name of the virtual host
+            router (growler.Router or None): The router serving the
+                host; if None, a new Router is created
+
+        Returns:
+            growler.Router: The router serving the host
+        """
+        if router is None:
+            router = Router()
+        elif self.strict_router_check and not isinstance(router, Router):
+            raise TypeError("Expected object of type Router, found %r" % type(router))
+
+        log.info("%d Adding router %s on virtual host %s" % (id(self), router, hostname))
+        self.vhosts.add(hostname, router)
+        MiddlewareChain.generation += 1
+        return router
+
     @property
     def router(self):
         """
@@ -365,43 +687,264 @@ class Application:
         that you have another coroutine scheduled that will take over
         handling client data.
 
-        If a middleware function raises any other exception, the
-        exception is forwarded to the middleware generator, which changes
-        behavior to generating any error handlers it had encountered.
-        This method then calls the handle_server_error method which
+        If a middleware function raises any other exception, the error
+        handlers registered before it (including those of enclosing
+        routers) are passed to the handle_server_error method, which
         *should* handle the error and notify the user.
 
+        The middleware are taken from the :class:`Pipeline` compiled
+        for the request's method and path (see :meth:`resolve`), and
+        the path parameters captured along the way are stored in the
+        dict ``req.params``.
+        If the application's middleware chain is not a
+        :class:`MiddlewareChain`, it is called to produce a generator,
+        which is sent any exception via its throw method.
+
         If after the chain is exhausted, either with an exception raised
         or not, res.has_ended does not evaluate to true, the response
         is sent a simple server error message in text.
 
+        If the request has a time budget (see :meth:`request_deadline`)
+        the middleware is cancelled once it is spent and, unless a
+        response was already sent, handle_timeout is called with the
+        status 504; a request arriving with no budget left is passed
+        to handle_timeout with the status 503 without running any
+        middleware.
+
+        Should the request be cancelled (e.g. by the protocol, its
+        client having disconnected) it is counted in the attribute
+        `abandoned_requests` and the CancelledError propagated.
+
         Args:
             req (growler.HTTPRequest): The incoming request, containing
                 all information about the client.
             res (growler.HTTPResponse): The outgoing response, containing
                 methods for sending headers and data back to the client.
         """
-        # create a middleware generator
-        mw_generator = self.middleware(req.method, req.path)
+        if not self.frozen:
+            self.freeze()
+
+        host = req.headers.get('HOST') if self.vhosts else None
+        try:
+            route = self.resolve(req.method, req.path, host)
+        # e.g. a lazy router which failed to import
+        except Exception as error:
+            await self.handle_server_error(req, res, iter(()), error)
+            return
+
+        try:
+            await self.run_route(req, res, route)
+        except asyncio.CancelledError:
+            self.abandoned_requests += 1
+            log.info("%d abandoned request %s %s", id(self), req.method, req.path)
+            raise
+
+    async def run_route(self, req, res, route):
+        """
+        Runs the middleware of a resolved route within the request's
+        time budget, if any (see :meth:`request_deadline`), and the
+        concurrency limits of the route, if any.
+        """
+        pipeline = None if route is None else route[0]
+        if pipeline is not None:
+            req.cancel_on_disconnect = pipeline.cancellable
+        if pipeline is not None and pipeline.bulkheads:
+            run = self.run_in_bulkheads
+        else:
+            run = self.run_middleware
+
+        timeout = self.request_deadline(req, pipeline)
+        if timeout is None:
+            await run(req, res, route)
+            return
+
+        req.deadline = time.monotonic() + timeout
+        if timeout <= 0:
+            self.handle_timeout(req, res, 503)
+            return
+
+        try:
+            await asyncio.wait_for(run(req, res, route), timeout)
+        except asyncio.TimeoutError:
+            log.info("%d request %s %s exceeded its deadline (%ss)",
+                     id(self), req.method, req.path, timeout)
+            if not res.has_ended:
+                self.handle_timeout(req, res, 504)
+
+    def request_deadline(self, req, pipeline):
+        """
+        Returns the number of seconds the request may take, or None if
+        it is unlimited.
+        This is the smallest budget given to the pipeline's middleware,
+        else the application's request_timeout, shortened by the
+        value of the request's deadline_header, if any.
+        """
+        timeout = None if pipeline is None else pipeline.timeout
+        if timeout is None:
+            timeout = self.request_timeout
+
+        if self.deadline_header is not None:
+            requested = parse_timeout_header(req.headers.get(self.deadline_header.upper()))
+            if requested is not None and (timeout is None or requested < timeout):
+                timeout = requested
+        return timeout
+
+    async def run_in_bulkheads(self, req, res, route):
+        """
+        Runs the middleware of a resolved route once admitted by each of
+        its bulkheads (see :mod:`growler.core.bulkhead`), waiting in
+        their queues if required.
+        If a bulkhead refuses the request, handle_overload is called
+        with the bulkhead's status code and no middleware is run.
+        Should the request end (e.g. its deadline having passed) while a
+        blocking middleware still runs in a worker thread, its slots are
+        held until the thread returns.
+        """
+        held = []
+        try:
+            for limit in route[0].bulkheads:
+                if not await limit.acquire():
+                    log.info("%d request %s %s refused by bulkhead (%d active)",
+                             id(self), req.method, req.path, limit.active)
+                    self.handle_overload(req, res, limit.status)
+                    return
+                held.append(limit)
+            await self.run_middleware(req, res, route)
+        finally:
+            worker = running_worker(res)
+            if worker is None:
+                release_all(held)
+            else:
+                loop = asyncio.get_event_loop()
+                worker.add_done_callback(
+                    lambda _: loop.call_soon_threadsafe(release_all, held))
+
+    def dispatch(self, req, res):
+        """
+        Handles a request without an event loop task, if possible.
+        If the route's :class:`Pipeline` consists only of plain
+        functions run on the event loop, with no time budget or
+        concurrency limit, the middleware are called right away.
+
+        Returns:
+            None if the request was handled, otherwise a coroutine
+            which completes handling it, to be run as a task; this is
+            :meth:`handle_client_request` if the route does not qualify,
+            or a continuation if a middleware returned an awaitable or
+            raised an exception.
+        """
+        if not self.frozen:
+            self.freeze()
+
+        host = req.headers.get('HOST') if self.vhosts else None
+        try:
+            route = self.resolve(req.method, req.path, host)
+        except Exception:
+            return self.handle_client_request(req, res)
+
+        if route is None:
+            return self.handle_client_request(req, res)
+
+        pipeline, params = route
+        if (not pipeline.is_sync
+                or pipeline.bulkheads
+                or self.request_deadline(req, pipeline) is not None):
+            return self.handle_client_request(req, res)
+
+        return self.dispatch_sync(req, res, route)
+
+    def dispatch_sync(self, req, res, route):
+        """
+        Calls the middleware of a route whose pipeline qualifies for
+        :meth:`dispatch` right away, returning None once the request is
+        handled, or a coroutine completing it.
+        """
+        pipeline, params = route
+        req.params = dict(params)
+        req.cancel_on_disconnect = pipeline.cancellable
+
+        for index, mw in enumerate(pipeline.middleware):
+            try:
+                ret_val = mw(req, res)
+            except GrowlerStopIteration:
+                return None
+            except Exception as error:
+                return self.handle_pipeline_error(req, res, pipeline, index, error)
+
+            if ret_val is not None and inspect.isawaitable(ret_val):
+                return self.resume_middleware(req, res, route, index, ret_val)
+            if not res.has_ended and res.pending is not None:
+                return self.resume_middleware(req, res, route, index)
+            if res.has_ended:
+                return None
+
+        self.handle_response_not_sent(req, res)
+        return None
+
+    async def resume_middleware(self, req, res, route, index, awaitable=None):
+        """
+        Completes a request begun by :meth:`dispatch`, awaiting what
+        the middleware at index returned (and any deferred sending)
+        before running the rest of the route's middleware.
+        """
+        pipeline = route[0]
+        try:
+            if awaitable is not None:
+                await awaitable
+            if not res.has_ended and res.pending is not None:
+                await res.pending
+        except GrowlerStopIteration:
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            await self.handle_pipeline_error(req, res, pipeline, index, error)
+            return
+
+        if not res.has_ended:
+            await self.run_middleware(req, res, route, index + 1)
+
+    async def run_middleware(self, req, res, route, start=0):
+        """
+        Calls the middleware of a resolved route (as returned by
+        :meth:`resolve`) with the request and response objects, as
+        described in :meth:`handle_client_request`, beginning with the
+        middleware at index start.
+        """
+        if route is None:
+            # a custom middleware chain - walk its generator
+            pipeline = None
+            mw_generator = self.middleware(req.method, req.path)
+            middleware = mw_generator
+        else:
+            pipeline, params = route
+            req.params = dict(params)
+            middleware = pipeline.middleware[start:]
 
         # loop through middleware
-        for mw in mw_generator:
+        for index, mw in enumerate(middleware, start):
 
             # try calling the function
             try:
-                ret_val = mw(req, res)
-                if inspect.isawaitable(ret_val):
-                    await ret_val
+                await self.call_middleware(req, res, mw, pipeline, index)
 
             # special exception - immediately stop the loop
             #  - do not check if res has sent
             except GrowlerStopIteration:
                 return None
 
-            # on an unhandled exception - notify the generator of the error
+            # the request was cancelled - not an error of the middleware
+            except asyncio.CancelledError:
+                raise
+
+            # on an unhandled exception - call the error handlers in
+            # effect (notifying a generator of the error)
             except Exception as error:
-                mw_generator.throw(error)
-                await self.handle_server_error(req, res, mw_generator, error)
+                if pipeline is None:
+                    mw_generator.throw(error)
+                    await self.handle_server_error(req, res, mw_generator, error)
+                else:
+                    await self.handle_pipeline_error(req, res, pipeline, index, error)
                 return
 
             if res.has_ended:
@@ -410,7 +953,153 @@ class Application:
         if not res.has_ended:
             self.handle_response_not_sent(req, res)
 
-    async def handle_server_error(self, req, res, mw_generator, error, err_count=0):
+    async def call_middleware(self, req, res, mw, pipeline, index):
+        """
+        Calls the middleware at index of the pipeline (or, if pipeline
+        is None, of a custom middleware chain), on its thread pool if it
+        is blocking, then awaits whatever awaitable it returned and any
+        deferred sending of the response.
+        """
+        pool = None if pipeline is None else pipeline.blocking[index]
+        if pool is None:
+            ret_val = mw(req, res)
+        else:
+            ret_val = await self.thread_pools.run(pool, mw, req, res)
+
+        if pipeline is not None and pipeline.is_async[index]:
+            await ret_val
+        # plain functions may still return an awaitable
+        elif ret_val is not None and inspect.isawaitable(ret_val):
+            await ret_val
+
+        # wait on any deferred sending (e.g. offloaded send_json)
+        if not res.has_ended and res.pending is not None:
+            await res.pending
+
+    def handle_pipeline_error(self, req, res, pipeline, index, error):
+        """
+        Returns a coroutine passing an exception raised by the
+        middleware at index of the pipeline to the error handlers in
+        effect there (see :meth:`handle_server_error`).
+        """
+        return self.handle_server_error(
+            req,
+            res,
+            iter(pipeline.error_handlers[index]),
+            error,
+            async_handlers=pipeline.async_error_handlers,
+        )
+
+    def freeze(self, strict=False):
+        """
+        Prepares the application for serving requests, compiling the
+        middleware tree into pipelines which carry the metadata (error
+        handler or not, coroutine function or not) recorded for every
+        middleware, so dispatching a request needs no introspection.
+        This is called automatically upon the first request.
+
+        Middleware added afterwards safely invalidates the compiled
+        pipelines (see :meth:`compile`), unless strict is true, in which
+        case the application's middleware chains are frozen and adding
+        middleware raises a RuntimeError.
+
+        Args:
+            strict (bool): Reject any further middleware
+
+        Returns:
+            This application
+        """
+        self.compile()
+        if strict:
+            if isinstance(self.middleware, MiddlewareChain):
+                self.middleware.freeze()
+            for chain in self.vhosts.chains():
+                chain.freeze()
+        self.frozen = True
+        return self
+
+    def compile(self):
+        """
+        Discards any previously compiled pipelines, so the middleware
+        tree is flattened anew upon the next request.
+        This is done automatically whenever middleware has been added to
+        any chain since the last compilation.
+
+        Returns:
+            This application
+        """
+        size = None
+        if isinstance(self.middleware, MiddlewareChain):
+            size = self.middleware.route_cache_size
+        self._pipelines = RouteCache(size or 1024)
+        self._pipeline_shapes = {}
+        self._compiled_generation = MiddlewareChain.generation
+        return self
+
+    def compile_route(self, method, path, chain=None):
+        """
+        Flattens the middleware of chain (by default the application's
+        middleware) matching method and path into a :class:`Pipeline`,
+        collecting any path parameters captured.
+        Requests resolving to the same middleware and error handlers
+        share the same pipeline object.
+
+        Returns:
+            tuple: The pipeline and the dict of path parameters
+        """
+        if chain is None:
+            chain = self.middleware
+        params, bulkheads = {}, []
+        method = chain.resolve_method(method, path)
+        steps = tuple(chain.flatten(method, path, params=params, bulkheads=bulkheads))
+        shape = Pipeline.shape(steps, bulkheads)
+        try:
+            pipeline = self._pipeline_shapes[shape]
+        except KeyError:
+            sync_pool = DEFAULT_POOL if self.offload_sync else None
+            pipeline = self._pipeline_shapes[shape] = Pipeline(steps, sync_pool, bulkheads)
+        return pipeline, params
+
+    def resolve(self, method, path, host=None):
+        """
+        Returns the compiled :class:`Pipeline` and path parameters of
+        the request method and path, or None if the application's
+        middleware chain is not a :class:`MiddlewareChain`.
+        If host (the value of the Host header) matches a virtual host
+        registered with :meth:`vhost`, its chain is used instead of
+        the application's middleware.
+        Results are kept in a bounded :class:`RouteCache`; the
+        parameter dict must therefore not be modified.
+        """
+        match = self.vhosts.match(host) if host and self.vhosts else None
+        if match is not None:
+            vhost, chain = match
+        elif isinstance(self.middleware, MiddlewareChain):
+            vhost, chain = None, self.middleware
+        else:
+            return None
+
+        if self._compiled_generation != MiddlewareChain.generation:
+            self.compile()
+
+        key = (method, path, vhost)
+        route = self._pipelines.get(key)
+        if route is None:
+            route = self.compile_route(method, path, chain)
+            self._pipelines.put(key, route)
+        return route
+
+    def pipeline(self, method, path, host=None):
+        """
+        Returns the compiled :class:`Pipeline` of the request method and
+        path (and host), or None if the application's middleware chain
+        is not a :class:`MiddlewareChain`.
+        """
+        route = self.resolve(method, path, host)
+        return None if route is None else route[0]
+
+    async def handle_server_error(self, req, res, mw_generator, error, err_count=0,
+                                  async_handlers=None):
         """
         Entry point for handling an exception that occured during
         execution of the middleware chain.
@@ -440,13 +1129,22 @@ class Application:
                 If this value equals self.error_recursion_max_depth, a
                 new exception is raised, potentially confusing everyone
                 involved.
+
+            async_handlers (frozenset or None): The ids of the error
+                handlers which are coroutine functions, as recorded in
+                a compiled :class:`Pipeline`. If None, each handler is
+                inspected.
         """
         if err_count >= self.error_recursion_max_depth:
             raise Exception("Too many exceptions:" + error)
 
         for mw in mw_generator:
+            if async_handlers is None:
+                is_async = inspect.iscoroutinefunction(mw)
+            else:
+                is_async = id(mw) in async_handlers
             try:
-                if inspect.iscoroutinefunction(mw):
+                if is_async:
                     await mw(req, res, error)
                 else:
                     mw(req, res, error)
@@ -457,6 +1155,7 @@ class Application:
                     mw_generator,
                     new_error,
                     err_count + 1,
+                    async_handlers,
                 )
             finally:
                 if res.has_ended:
@@ -536,6 +1235,39 @@ class Application:
                 "</p><pre>{trace}</pre></body></html>\n")
         res.send_html(html.format(path=req.path, trace=trace.getvalue()), 500)
 
+    @staticmethod
+    def default_timeout_handler(req, res, status):
+        """
+        Sends the response to a request which ran out of time; status is
+        504 if its middleware was cancelled, 503 if it was refused.
+        """
+        title = {503: "Service Unavailable"}.get(status, "Gateway Timeout")
+        html = ("<!DOCTYPE html>"
+                "<html><head><title>{status} - {title}</title></head>"
+                "<body>"
+                "<h1>{status} - {title}</h1><hr>"
+                "<p style='font-family:monospace;'>"
+                "The request to '{path}' could not be completed in time"
+                "</p></body></html>\n")
+        res.send_html(html.format(status=status, title=title, path=req.path), status)
+
+    @staticmethod
+    def default_overload_handler(req, res, status):
+        """
+        Sends the response to a request refused by a bulkhead, with the
+        status code configured for it (typically 503 or 429).
+        """
+        title = {429: "Too Many Requests"}.get(status, "Service Unavailable")
+        html = ("<!DOCTYPE html>"
+                "<html><head><title>{status} - {title}</title></head>"
+                "<body>"
+                "<h1>{status} - {title}</h1><hr>"
+                "<p style='font-family:monospace;'>"
+                "The server is too busy to handle requests to '{path}'"
+                "</p></body></html>\n")
+        res.headers['Retry-After'] = '1'
+        res.send_html(html.format(status=status, title=title, path=req.path), status)
+
     @staticmethod
     def default_404_handler(req, res, error=None):
         html = ("<!DOCTYPE html>"
@@ -653,6 +1385,9 @@ class Application:
                 passed directly to the BaseEventLoop.create_server function.
                 Consult their documentation for details.
 
+        The application is started (see :meth:`startup`), running any
+        startup hooks, before the server is created.
+
         Returns:
             asyncio.Server: The result of asyncio.BaseEventLoop.create_server
                 which has been passed to the event loop and setup with
@@ -670,20 +1405,24 @@ class Application:
             from growler.aio import GrowlerHTTPProtocol
             protocol_factory = GrowlerHTTPProtocol.get_factory
 
-        create_server = loop.create_server(
-            protocol_factory(self, loop=loop),
-            **server_config
-        )
+        create_server = self._start_server(loop, protocol_factory, server_config)
 
         if as_coroutine:
             return create_server
         else:
             return loop.run_until_complete(create_server)
 
+    async def _start_server(self, loop, protocol_factory, server_config):
+        await self.startup()
+        return await loop.create_server(protocol_factory(self, loop=loop),
+                                        **server_config)
+
     def create_server_and_run_forever(self, loop=None, **server_config):
         """
         Helper function which constructs an HTTP server and listens the
         loop forever.
+        Once the loop stops (e.g. upon KeyboardInterrupt) the server is
+        closed and the application shut down (see :meth:`shutdown`).
 
         This function exists only to remove boilerplate code for starting
         up a growler app.
@@ -703,8 +1442,12 @@ class Application:
             import asyncio
             loop = asyncio.get_event_loop()
 
-        self.create_server(loop=loop, **server_config)
+        server = self.create_server(loop=loop, **server_config)
         try:
             loop.run_forever()
         except KeyboardInterrupt:
             pass
+
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.run_until_complete(self.shutdown())
@@ -0,0 +1,172 @@
+#
+# growler/core/background.py
+#
+"""
+Running follow-up work outside of the request/response cycle.
+
+Work handed to :meth:`HTTPResponse.after` starts once the response has
+been written to the transport, and work handed to
+:meth:`Application.background` right away; in both cases it is run by
+the application's :class:`BackgroundTasks`, which bounds the number of
+jobs running and waiting, and lets the application wait for them to
+finish when it shuts down:
+
+    >>> @app.post('/orders')
+    ... async def create_order(req, res):
+    ...     order = await orders.create(await req.body())
+    ...     res.send_json(order)
+    ...     res.after(audit_log.record, 'order-created', order)
+"""
+
+import asyncio
+import inspect
+import logging
+from collections import deque
+from functools import partial
+
+log = logging.getLogger(__name__)
+
+
+class BackgroundTasks:
+    """
+    A bounded queue of jobs run as event loop tasks, at most
+    `max_concurrency` at a time.
+    A job is an awaitable, or a callable (called with any arguments it
+    was submitted with) whose result is awaited if awaitable.
+    Jobs submitted while `max_queue` jobs are waiting are dropped.
+    Exceptions raised by jobs are logged and counted as failures.
+
+    Jobs may be submitted from other threads (e.g. by a blocking
+    middleware) once the queue knows its event loop, given here or set
+    by the application upon startup, or else the loop on which jobs
+    were first started.
+    """
+
+    def __init__(self, max_concurrency=8, max_queue=1000, loop=None):
+        """
+        Args:
+            max_concurrency (int): The number of jobs run at once
+            max_queue (int): The number of jobs which may wait to run
+            loop (asyncio.AbstractEventLoop or None): The event loop
+                running the jobs
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.loop = loop
+        self.tasks = set()
+        self._queue = deque()
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, job, *args):
+        """
+        Queues a job, starting it if fewer than max_concurrency jobs
+        are running.
+
+        Returns:
+            bool: False if the queue was full and the job dropped
+        """
+        if not inspect.isawaitable(job):
+            job = partial(job, *args)
+        elif args:
+            raise TypeError("Arguments given with an awaitable job")
+
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            log.warning("%d background queue full, dropping %r", id(self), job)
+            if inspect.iscoroutine(job):
+                job.close()
+            return False
+
+        self._queue.append(job)
+        self._start()
+        return True
+
+    def _start(self):
+        if not self._queue or len(self.tasks) >= self.max_concurrency:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            if self.loop is not None:
+                # called off the event loop - start the jobs from it
+                self.loop.call_soon_threadsafe(self._start)
+                return
+            loop = asyncio.get_event_loop()
+        if self.loop is None:
+            self.loop = loop
+        while self._queue and len(self.tasks) < self.max_concurrency:
+            task = loop.create_task(self._run(self._queue.popleft()))
+            self.tasks.add(task)
+            task.add_done_callback(self._finished)
+
+    async def _run(self, job):
+        try:
+            if not inspect.isawaitable(job):
+                job = job()
+            if inspect.isawaitable(job):
+                await job
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed += 1
+            log.exception("%d background job failed", id(self))
+        else:
+            self.completed += 1
+
+    def _finished(self, task):
+        self.tasks.discard(task)
+        self._start()
+
+    @property
+    def queued(self):
+        return len(self._queue)
+
+    async def join(self, timeout=None):
+        """
+        Waits for every queued and running job to finish.
+
+        Args:
+            timeout (float or None): Seconds to wait at most
+
+        Returns:
+            bool: True if no jobs remain
+        """
+        loop = asyncio.get_event_loop()
+        end = None if timeout is None else loop.time() + timeout
+        while self.tasks:
+            remaining = None if end is None else end - loop.time()
+            if remaining is not None and remaining <= 0:
+                break
+            await asyncio.wait(list(self.tasks), timeout=remaining)
+        return not self.tasks and not self._queue
+
+    def cancel(self):
+        """
+        Drops every queued job and cancels those running.
+        """
+        while self._queue:
+            job = self._queue.popleft()
+            if inspect.iscoroutine(job):
+                job.close()
+            self.dropped += 1
+        for task in self.tasks:
+            task.cancel()
+
+    def metrics(self):
+        """
+        Returns a dict of the limits and counters of the queue.
+        """
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'active': len(self.tasks),
+            'queued': len(self._queue),
+            'completed': self.completed,
+            'failed': self.failed,
+            'dropped': self.dropped,
+        }
+
+    def __len__(self):
+        return len(self.tasks) + len(self._queue)
@@ -0,0 +1,147 @@
+#
+# growler/core/bulkhead.py
+#
+"""
+Per-route concurrency limits ('bulkheads').
+
+Middleware, or a router, marked with the :func:`bulkhead` decorator
+admits at most `max_concurrency` requests at once; up to `max_queue`
+more wait for a slot, and any others are refused immediately (by
+default with '503 Service Unavailable'), so a slow route cannot take
+all of the capacity of the process:
+
+    >>> @app.get('/report')
+    ... @bulkhead(max_concurrency=4, max_queue=8)
+    ... async def report(req, res):
+    ...     res.send_json(await slow_service.report())
+
+Every request routed through a marked middleware or router holds one of
+its slots until its middleware has run.
+"""
+
+import asyncio
+import logging
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+BULKHEAD_ATTR = 'growler_bulkhead'
+
+
+class Bulkhead:
+    """
+    A counting semaphore with a bounded queue of waiters, which refuses
+    rather than waits once the queue is full.
+    Waiters are admitted in arrival order.
+    """
+
+    def __init__(self, max_concurrency, max_queue=0, status=503):
+        """
+        Args:
+            max_concurrency (int): The number of requests admitted at once
+            max_queue (int): The number of requests which may wait for a
+                slot
+            status (int): The status code sent to refused requests,
+                typically 503 or 429
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.status = status
+        self.active = 0
+        self.rejected = 0
+        self.completed = 0
+        self._waiters = deque()
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    async def acquire(self):
+        """
+        Waits for a slot, if the queue has room.
+
+        Returns:
+            bool: True if a slot was acquired (and must be released),
+                False if the request was refused
+        """
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return True
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over as the waiter was cancelled
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return True
+
+    def release(self):
+        """
+        Frees a slot, handing it to the longest waiting request if any.
+        """
+        self.completed += 1
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def metrics(self):
+        """
+        Returns a dict of the bulkhead's limits and counters.
+        """
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'active': self.active,
+            'queued': self.queued,
+            'rejected': self.rejected,
+            'completed': self.completed,
+        }
+
+
+def release_all(limits):
+    """
+    Releases a slot of each of the bulkheads held, in reverse order.
+    """
+    for limit in reversed(limits):
+        limit.release()
+
+
+def bulkhead(func=None, *, max_concurrency, max_queue=0, status=503):
+    """
+    Limits the number of concurrent requests routed through a middleware
+    function or router, see :class:`Bulkhead`.
+    May be used as a decorator or called with the router.
+    """
+    if func is None:
+        return lambda f: bulkhead(f,
+                                  max_concurrency=max_concurrency,
+                                  max_queue=max_queue,
+                                  status=status)
+    setattr(func, BULKHEAD_ATTR, Bulkhead(max_concurrency, max_queue, status))
+    return func
+
+
+def get_bulkhead(func):
+    """
+    Returns the :class:`Bulkhead` given to a function or router with
+    :func:`bulkhead`, or None.
+    """
+    limit = getattr(func, BULKHEAD_ATTR, None)
+    return limit if isinstance(limit, Bulkhead) else None
@@ -0,0 +1,179 @@
+#
+# growler/core/cpu_bound.py
+#
+"""
+Running CPU-bound route computations in a process pool.
+
+The :func:`cpu_bound` decorator turns a pure function into middleware
+which gathers the function's arguments from the request, calls it in the
+application's :class:`~concurrent.futures.ProcessPoolExecutor` (see
+:attr:`Application.process_pool`) and sends the result as the response:
+
+    >>> @app.post('/thumbnail')
+    ... @cpu_bound
+    ... def thumbnail(image_bytes):
+    ...     return make_thumbnail(image_bytes)
+
+The function is sent to the worker processes by its import path, so it
+must be defined at the top level of a module.
+Large bytes-like arguments are placed in shared memory rather than
+pickled through the pool's pipe.
+"""
+
+import asyncio
+import inspect
+from importlib import import_module
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover
+    shared_memory = None
+
+SHARED_MEMORY_THRESHOLD = 2 ** 20
+
+
+async def request_body(req):
+    """
+    The default argument getter of :func:`cpu_bound`; the request body.
+    """
+    return (await req.body(), )
+
+
+def send_result(res, result):
+    """
+    The default result sender of :func:`cpu_bound`.
+    Bytes are sent as 'application/octet-stream', strings as plain text
+    and anything else as JSON.
+    """
+    if isinstance(result, (bytes, bytearray)):
+        res.headers.setdefault('Content-Type', 'application/octet-stream')
+        res.message = bytes(result)
+        res.status_code = 200
+        res.end()
+    elif isinstance(result, str):
+        res.send_text(result)
+    else:
+        res.send_json(result)
+
+
+class SharedPayload:
+    """
+    Reference to bytes placed in a shared memory block, passed to a
+    worker process in place of the bytes themselves.
+    """
+
+    __slots__ = [
+        'name',
+        'size',
+    ]
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def read(self):
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            return bytes(shm.buf[:self.size])
+        finally:
+            shm.close()
+
+
+def import_function(module_name, qualname):
+    """
+    Imports the function named by module and qualified name, unwrapping
+    a :class:`CpuBoundHandler`.
+    """
+    obj = import_module(module_name)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return getattr(obj, 'func', obj) if isinstance(obj, CpuBoundHandler) else obj
+
+
+def run_in_process(func, args):
+    """
+    The function run by a worker process: reads any shared payloads and
+    calls func with the arguments.
+    """
+    args = [arg.read() if isinstance(arg, SharedPayload) else arg for arg in args]
+    return func(*args)
+
+
+class CpuBoundHandler:
+    """
+    Middleware produced by :func:`cpu_bound`.
+    """
+
+    def __init__(self, func, inputs, send, shm_threshold):
+        self.func = func
+        self.inputs = inputs
+        self.send = send
+        self.shm_threshold = shm_threshold
+        self.__module__ = func.__module__
+        self.__qualname__ = func.__qualname__
+        self.__name__ = func.__name__
+        self.__doc__ = func.__doc__
+
+    async def __call__(self, req, res):
+        args = self.inputs(req)
+        if inspect.isawaitable(args):
+            args = await args
+
+        loop = asyncio.get_event_loop()
+        blocks = []
+        try:
+            args = tuple(self.share(arg, blocks) for arg in args)
+            result = await loop.run_in_executor(res.app.process_pool,
+                                                run_in_process, self, args)
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        self.send(res, result)
+
+    def share(self, arg, blocks):
+        """
+        Returns a :class:`SharedPayload` holding a copy of arg if it is
+        a bytes-like object of at least shm_threshold bytes, otherwise
+        arg itself. Created memory blocks are appended to blocks.
+        """
+        if (shared_memory is None or self.shm_threshold is None
+                or not isinstance(arg, (bytes, bytearray, memoryview))
+                or len(arg) < self.shm_threshold):
+            return arg
+
+        size = len(arg)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        blocks.append(shm)
+        shm.buf[:size] = arg
+        return SharedPayload(shm.name, size)
+
+    def __reduce__(self):
+        # sent to worker processes as the wrapped function, by name
+        return import_function, (self.__module__, self.__qualname__)
+
+
+def cpu_bound(func=None, *,
+              inputs=request_body,
+              send=send_result,
+              shm_threshold=SHARED_MEMORY_THRESHOLD):
+    """
+    Decorates a pure, module-level function, producing middleware which
+    runs it in the application's process pool.
+    May be used with or without arguments.
+
+    Args:
+        func (callable): The computation
+        inputs (callable): Called with the request, returns (or returns
+            an awaitable of) the tuple of arguments of func; defaults
+            to the request body
+        send (callable): Called with the response and the result of
+            func to send it to the client
+        shm_threshold (int or None): Size at and above which bytes-like
+            arguments are passed through shared memory; None disables
+            shared memory
+    """
+    if func is None:
+        return lambda f: cpu_bound(f, inputs=inputs, send=send, shm_threshold=shm_threshold)
+    return CpuBoundHandler(func, inputs, send, shm_threshold)
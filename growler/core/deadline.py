@@ -0,0 +1,78 @@
+#
+# growler/core/deadline.py
+#
+"""
+Request deadlines and cancellation.
+
+An application may be given a time budget for every request (the
+`request_timeout` option), routes may be given their own with the
+:func:`deadline` decorator, and clients may ask for a shorter one
+through a request header (the `deadline_header` option).
+Once a request's budget is spent its middleware is cancelled and the
+client is sent '504 Gateway Timeout'; a request arriving with no budget
+left is refused with '503 Service Unavailable'.
+
+Handlers may consult ``req.time_remaining`` to skip optional work.
+
+Requests are also cancelled when the client disconnects before their
+response is sent, unless a middleware of the route is marked with
+:func:`run_to_completion` (e.g. one with side effects which must not be
+interrupted).
+"""
+
+DEADLINE_ATTR = 'growler_deadline'
+
+COMPLETION_ATTR = 'growler_run_to_completion'
+
+
+def deadline(seconds):
+    """
+    Decorator giving requests routed through the middleware a time
+    budget of `seconds`, overriding the application's request_timeout.
+    If several middleware of a route are decorated, the smallest
+    budget is used.
+    """
+    def mark(func):
+        setattr(func, DEADLINE_ATTR, seconds)
+        return func
+    return mark
+
+
+def deadline_timeout(func):
+    """
+    Returns the budget given to a function with :func:`deadline`, or
+    None.
+    """
+    seconds = getattr(func, DEADLINE_ATTR, None)
+    return seconds if isinstance(seconds, (int, float)) else None
+
+
+def parse_timeout_header(value):
+    """
+    Parses the value of a deadline header, a number of seconds, into a
+    float. Returns None if the value is missing or invalid.
+    """
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if seconds == seconds else None
+
+
+def run_to_completion(func):
+    """
+    Decorator keeping requests routed through the middleware running
+    after the client disconnects.
+    """
+    setattr(func, COMPLETION_ATTR, True)
+    return func
+
+
+def cancels_on_disconnect(func):
+    """
+    Returns False if the function was marked with
+    :func:`run_to_completion`, True otherwise.
+    """
+    return getattr(func, COMPLETION_ATTR, False) is not True
@@ -7,8 +7,17 @@ easy interface for request matching.
 """
 
 import re
+import asyncio
 import logging
 from inspect import signature
+from growler.http.methods import HTTPMethod
+from . import path_params
+from .route_index import RouteIndex
+from .offload import blocking_pool
+from .deadline import deadline_timeout, cancels_on_disconnect
+from .bulkhead import get_bulkhead
+
+HEAD_OR_GET = HTTPMethod.HEAD | HTTPMethod.GET
 
 
 class MiddlewareNode:
@@ -28,23 +37,48 @@ class MiddlewareNode:
     __slots__ = [
         'func',
         'path',
+        'route',
+        'converters',
         'mask',
         'is_errorhandler',
         'is_subchain',
+        'is_async',
+        'blocking',
+        'timeout',
+        'cancellable',
+        'bulkhead',
     ]
 
     def __init__(self, **inits):
         """
         The path attribute should be a regular expression.
-        If it is a string, it is escaped and then compiled.
+        If it is a string, it is escaped and then compiled, and the
+        original string is kept as the `route` attribute, allowing the
+        node to be indexed by a :class:`RouteIndex`.
+        Sinatra-style parameters in a string path (e.g. ``:id<int>``,
+        see :mod:`growler.core.path_params`) become named groups, and
+        the functions converting their values are stored in the
+        `converters` attribute.
 
         Keyword Args:
             path (String or regex): A regex to be matched upon connection
                 Simple mappings to attributes
         """
+        self.route = None
+        self.converters = None
+        self.is_async = False
+        self.blocking = None
+        self.timeout = None
+        self.cancellable = True
+        self.bulkhead = None
         for k, v in inits.items():
             if k == 'path' and isinstance(v, str):
-                v = self.path_to_regex(v)
+                self.route = v
+                if path_params.has_params(v):
+                    self.converters = path_params.path_converters(v)
+                    v = path_params.path_to_regex(v)
+                else:
+                    v = self.path_to_regex(v)
             setattr(self, k, v)
 
     @staticmethod
@@ -57,12 +91,34 @@ class MiddlewareNode:
         esc_path = re.escape(path)
         return re.compile(esc_path)
 
+    def params(self, match):
+        """
+        Returns a dict of the (converted) values of the named groups in
+        a match object returned by :meth:`path_split`.
+        """
+        params = match.groupdict()
+        if self.converters and params:
+            for name, convert in self.converters.items():
+                params[name] = convert(params[name])
+        return params
+
     def matches_method(self, method):
         """
-        Method to determine if the http method matches this middleware.
+        Method to determine if the http method (or mask of methods)
+        matches this middleware.
+        See :meth:`MiddlewareChain.resolve_method` for the handling of
+        HEAD requests.
         """
         return self.mask & method
 
+    @property
+    def is_explicit_head(self):
+        """
+        True if the node was mounted for HEAD requests but not for GET
+        requests, i.e. it is a dedicated HEAD handler.
+        """
+        return bool(self.mask & HTTPMethod.HEAD) and not self.mask & HTTPMethod.GET
+
     def path_split(self, path):
         """
         Splits a path into the part matching this middleware and the part remaining.
@@ -104,16 +160,38 @@ class MiddlewareNode:
 class MiddlewareChain:
     """
     Class handling the storage and retreival of growler middleware functions.
+
+    Matching is not cached by the chain: the application keeps the
+    compiled pipeline of each route in a bounded :class:`RouteCache`,
+    whose size is set by the class attribute `route_cache_size` of its
+    middleware chain.
+
+    Each node records whether its function is an error handler, whether
+    it is a coroutine function, the thread pool it is marked to run in
+    (see :func:`growler.core.offload.blocking`), its time budget (see
+    :func:`growler.core.deadline.deadline`), its concurrency limit (see
+    :func:`growler.core.bulkhead.bulkhead`) and whether it may be
+    cancelled when the client disconnects when it is added, so
+    requests may be dispatched without inspecting the functions again.
     """
 
     ROOT_PATTERN = re.compile(re.escape('/'))
 
+    route_cache_size = 1024
+
+    frozen = False
+
+    # incremented whenever middleware is added to any chain, allowing
+    # compiled pipelines to detect changes anywhere in the tree
+    generation = 0
+
     mw_list = None
     log = None
 
     def __init__(self):
         self.mw_list = []
         self.log = logging.getLogger("%s:%d" % (__name__, id(self)))
+        self._route_indexes = {}
 
     def __call__(self, method, path):
         """
@@ -143,6 +221,7 @@ class MiddlewareChain:
             What to do when the error handler raises a new error?
         """
         error_handler_stack = []
+        method = self.resolve_method(method, path)
 
         # loop through all middleware matching the request
         matching_middleware = self.find_matching_middleware(method, path)
@@ -153,7 +232,7 @@ class MiddlewareChain:
 
                 # We need to call sub middleware with only the URL past the
                 # matching string
-                subpath = '/' + rest_url
+                subpath = rest_url if rest_url.startswith('/') else '/' + rest_url
 
                 # middleware func is the generator of sub-middleware
                 subchain = mw.func(method, subpath)
@@ -180,24 +259,92 @@ class MiddlewareChain:
                     yield from self.handle_error(err, error_handler_stack)
                     break
 
+    def resolve_method(self, method, path):
+        """
+        Returns the method mask used to find the middleware of a request.
+        HEAD requests are routed to the middleware mounted for HEAD; if
+        none of those matching path is a dedicated HEAD handler, they
+        fall back to the middleware mounted for GET as well.
+        """
+        if method != HTTPMethod.HEAD:
+            return method
+        for node, _ in self.flatten(HTTPMethod.HEAD, path):
+            if node.is_explicit_head:
+                return HTTPMethod.HEAD
+        return HEAD_OR_GET
+
+    def flatten(self, method, path, error_handlers=(), params=None, bulkheads=None):
+        """
+        Generator walking the middleware tree matching the method and
+        path, like :meth:`__call__`, but yielding every matching
+        (non error-handling) node paired with the tuple of error
+        handlers in effect at that point, outermost first.
+        Subchains are descended into directly, so they see the error
+        handlers of the chains enclosing them.
+
+        The path parameters captured by each node (and the chains
+        enclosing it) are collected into the `params` dict, if given,
+        and the :class:`~growler.core.bulkhead.Bulkhead` objects of the
+        matching nodes, subchains included, into the `bulkheads` list.
+
+        Args:
+            method (growler.http.HTTPMethod): The request method
+            path (str): URL path of the request
+            error_handlers (tuple): Error handler nodes of enclosing chains
+            params (dict or None): Storage for captured path parameters
+            bulkheads (list or None): Storage for concurrency limits
+
+        Yields:
+            tuple: (MiddlewareNode, tuple of error handler MiddlewareNodes)
+        """
+        for mw, path_match, rest_url in self.find_matching_middleware(method, path):
+            if params is not None and not mw.is_errorhandler:
+                params.update(mw.params(path_match))
+            if bulkheads is not None and mw.bulkhead is not None and not mw.is_errorhandler:
+                if mw.bulkhead not in bulkheads:
+                    bulkheads.append(mw.bulkhead)
+
+            if mw.is_subchain:
+                subpath = rest_url if rest_url.startswith('/') else '/' + rest_url
+                yield from mw.func.flatten(method, subpath, error_handlers, params, bulkheads)
+            elif mw.is_errorhandler:
+                error_handlers += (mw, )
+            else:
+                yield mw, error_handlers
+
     def find_matching_middleware(self, method, path):
         """
         Iterator handling the matching of middleware against a method+path
-        pair. Yields the middleware, and the
-        """
-        for mw in self.mw_list:
-            if not mw.matches_method(method):
-                continue
+        pair. Yields the middleware, the match object and the 'rest' of
+        the url (i.e. the part that comes AFTER the match) to be
+        potentially matched later by a subchain.
 
-            # get the path matching this middleware and the 'rest' of the url
-            # (i.e. the part that comes AFTER the match) to be potentially
-            # matched later by a subchain
-            path_match, rest_url = mw.path_split(path)
+        Candidates are found via the :class:`RouteIndex` holding only the
+        middleware accepting this method, which is built upon first use
+        and rebuilt after the chain changes.
+        """
+        for mw, path_match, rest_url in self.route_index(method).lookup(path):
             if self.should_skip_middleware(mw, path_match, rest_url):
                 continue
 
             yield mw, path_match, rest_url
 
+    def route_index(self, method):
+        """
+        Returns the compiled :class:`RouteIndex` of the middleware in this
+        chain which match the request method.
+
+        Args:
+            method (growler.http.HTTPMethod): The request method
+        """
+        try:
+            return self._route_indexes[method]
+        except KeyError:
+            pass
+        nodes = [mw for mw in self.mw_list if mw.matches_method(method)]
+        index = self._route_indexes[method] = RouteIndex(nodes, self.ROOT_PATTERN)
+        return index
+
     def iterate_subchain(self, chain):
         """
         A coroutine used by __call__ to forward all requests to a
@@ -241,14 +388,49 @@ class MiddlewareChain:
             func (callable): The function to be yieled from the generator upon a request
                 matching the method_mask and path
         """
+        if self.frozen:
+            raise RuntimeError("Cannot add middleware to a frozen MiddlewareChain")
+        self._add(method_mask, path, func)
+
+    def _add(self, method_mask, path, func):
+        """
+        Appends a node for func to the chain, even if the chain is
+        frozen, and invalidates any routes cached or compiled from it.
+        """
         is_err = len(signature(func).parameters) == 3
         is_subchain = isinstance(func, MiddlewareChain)
         tup = MiddlewareNode(func=func,
                              mask=method_mask,
                              path=path,
                              is_errorhandler=is_err,
-                             is_subchain=is_subchain,)
+                             is_subchain=is_subchain,
+                             is_async=self.is_async_callable(func),
+                             blocking=blocking_pool(func),
+                             timeout=deadline_timeout(func),
+                             cancellable=cancels_on_disconnect(func),
+                             bulkhead=get_bulkhead(func),)
         self.mw_list.append(tup)
+        self._route_indexes.clear()
+        MiddlewareChain.generation += 1
+
+    @staticmethod
+    def is_async_callable(func):
+        """
+        Returns whether calling func produces a coroutine, either as a
+        coroutine function or an object whose __call__ method is one.
+        """
+        return (asyncio.iscoroutinefunction(func)
+                or asyncio.iscoroutinefunction(getattr(func, '__call__', None)))
+
+    def freeze(self):
+        """
+        Prevents middleware from being added to this chain, and every
+        chain mounted within it; :meth:`add` raises a RuntimeError.
+        """
+        self.frozen = True
+        for mw in self.mw_list:
+            if mw.is_subchain:
+                mw.func.freeze()
 
     def __contains__(self, func):
         """
@@ -0,0 +1,309 @@
+#
+# growler/core/offload.py
+#
+"""
+Running blocking, synchronous middleware in thread pools.
+
+Middleware marked with the :func:`blocking` decorator (or, if the
+application's `offload_sync` option is set, every synchronous
+middleware) is called in a worker thread of a bounded
+:class:`ThreadPool` rather than on the event loop, which keeps serving
+other connections while it runs:
+
+    >>> @app.get('/report')
+    ... @blocking(pool='reports')
+    ... def report(req, res):
+    ...     res.send_json(legacy_db.query(...))
+
+Pools are named, so routes may be given pools sized to their needs with
+:meth:`Application.thread_pool`; the pool 'default' is used otherwise.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+BLOCKING_ATTR = 'growler_blocking'
+
+DEFAULT_POOL = 'default'
+
+
+def blocking(func=None, *, pool=DEFAULT_POOL):
+    """
+    Marks a synchronous middleware function as blocking, so it is run
+    in the application's thread pool named `pool`.
+    May be used with or without arguments.
+    """
+    if func is None:
+        return lambda f: blocking(f, pool=pool)
+    setattr(func, BLOCKING_ATTR, pool)
+    return func
+
+
+def blocking_pool(func):
+    """
+    Returns the name of the pool a function was marked to run in with
+    :func:`blocking`, or None.
+    """
+    pool = getattr(func, BLOCKING_ATTR, None)
+    return pool if isinstance(pool, str) else None
+
+
+class ThreadSafeStream:
+    """
+    Wraps a transport so the output of a response written from a worker
+    thread reaches it through the event loop's thread.
+
+    Writes made on the loop's thread go straight to the transport, and
+    those made from any other thread are scheduled on the loop, so both
+    arrive in the order they were made.
+    The response's own writing methods are deferred to the loop as a
+    whole (see :meth:`defer`), so its events fire there too, after the
+    data written before them.
+    Once abandoned (the request having been cancelled while the worker
+    still runs) everything coming from other threads is dropped.
+
+    A worker writing a large body waits on :meth:`drain` between writes,
+    so it does not get ahead of the connection's flow control.
+    """
+
+    def __init__(self, stream, loop):
+        self.stream = stream
+        self.loop = loop
+        self.abandoned = False
+        # the concurrent.futures.Future of the worker's call, if any
+        self.worker = None
+        self._loop_thread = threading.get_ident()
+        self._draining = None
+
+    def abandon(self):
+        """
+        Drops all further output of other threads, releasing a worker
+        waiting on :meth:`drain`.
+        """
+        self.abandoned = True
+        draining = self._draining
+        if draining is not None:
+            draining.cancel()
+
+    def defer(self, func, *args):
+        """
+        Schedules func(*args) on the event loop if called from another
+        thread, or drops it if the stream was abandoned.
+
+        Returns:
+            bool: False if called on the loop's thread, where func
+                should be run right away
+        """
+        if threading.get_ident() == self._loop_thread:
+            return False
+        if not self.abandoned:
+            self.loop.call_soon_threadsafe(func, *args)
+        return True
+
+    def drain(self, protocol):
+        """
+        Blocks the calling worker thread until the loop has passed on
+        everything written so far and the protocol's transport accepts
+        more data (see :meth:`GrowlerProtocol.drain`).
+
+        Returns:
+            bool: False if called on the loop's thread, where the
+                caller must not block
+
+        Raises:
+            concurrent.futures.CancelledError: If the stream is, or gets,
+                abandoned, so the worker stops producing output
+        """
+        if threading.get_ident() == self._loop_thread:
+            return False
+        if self.abandoned:
+            raise CancelledError()
+        self._draining = asyncio.run_coroutine_threadsafe(protocol.drain(), self.loop)
+        if self.abandoned:
+            self._draining.cancel()
+        self._draining.result()
+        return True
+
+    def write(self, data):
+        if not self.defer(self.stream.write, data):
+            self.stream.write(data)
+
+    def write_eof(self):
+        if not self.defer(self.stream.write_eof):
+            self.stream.write_eof()
+
+
+def running_worker(res):
+    """
+    Returns the concurrent.futures.Future of a blocking middleware still
+    writing to the response from a worker thread, after the request was
+    abandoned, or None.
+    """
+    handoff = res.handoff
+    if isinstance(handoff, ThreadSafeStream) and handoff.worker is not None:
+        if not handoff.worker.done():
+            return handoff.worker
+    return None
+
+
+class ThreadPool:
+    """
+    A bounded ThreadPoolExecutor which counts the calls waiting for a
+    worker (queued), being run (active) and finished (completed), and
+    the largest queue seen.
+    """
+
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers,
+                                           thread_name_prefix='growler-%s' % name)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.max_queued = 0
+
+    async def run(self, loop, func, *args):
+        """
+        Calls func(*args) in a worker thread, returning its result.
+        """
+        return await asyncio.wrap_future(self.submit(func, *args), loop=loop)
+
+    def submit(self, func, *args):
+        """
+        Schedules func(*args) in a worker thread.
+
+        Returns:
+            concurrent.futures.Future: The future of the call
+        """
+        with self._lock:
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        return self.executor.submit(self._call, func, args)
+
+    def _call(self, func, args):
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def metrics(self):
+        """
+        Returns a dict of the pool's size and counters.
+        """
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'queued': self.queued,
+                'active': self.active,
+                'completed': self.completed,
+                'max_queued': self.max_queued,
+            }
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+class ThreadPools:
+    """
+    The named thread pools of an application, created upon first use.
+    """
+
+    def __init__(self, default_max_workers=None):
+        """
+        Args:
+            default_max_workers (int or None): Size of pools which have
+                not been configured; None uses the ThreadPoolExecutor
+                default
+        """
+        self.default_max_workers = default_max_workers
+        self.sizes = {}
+        self.pools = {}
+
+    def configure(self, name, max_workers):
+        """
+        Sets the size of the named pool, replacing (after its running
+        calls complete) any pool already created under that name.
+        """
+        self.sizes[name] = max_workers
+        old = self.pools.pop(name, None)
+        if old is not None:
+            old.shutdown(wait=False)
+
+    def get(self, name):
+        """
+        Returns the named pool, creating it if required.
+        """
+        try:
+            return self.pools[name]
+        except KeyError:
+            pass
+        size = self.sizes.get(name, self.default_max_workers)
+        pool = self.pools[name] = ThreadPool(name, size)
+        log.debug("%d created thread pool %s (%s workers)" % (id(self), name, size))
+        return pool
+
+    async def run(self, name, func, req, res):
+        """
+        Calls the middleware func(req, res) in the named pool, writing
+        the response's output (and emitting its events) through the
+        event loop.
+
+        Should the request be cancelled (e.g. its deadline having
+        passed) while the middleware runs, the response keeps the
+        worker away from the transport until it returns: its output is
+        dropped, and it is not called at all if it had yet to start.
+        Neither is it called once the request's deadline has passed.
+        """
+        loop = asyncio.get_event_loop()
+        stream = res.stream
+        safe = ThreadSafeStream(stream, loop)
+
+        def call():
+            deadline = req.deadline
+            if safe.abandoned or (deadline is not None and time.monotonic() >= deadline):
+                return None
+            return func(req, res)
+
+        def restore():
+            if res.stream is safe:
+                res.stream = stream
+            if res.handoff is safe:
+                res.handoff = None
+
+        res.stream = res.handoff = safe
+        safe.worker = self.get(name).submit(call)
+        try:
+            return await asyncio.wrap_future(safe.worker, loop=loop)
+        except asyncio.CancelledError:
+            safe.abandon()
+            raise
+        finally:
+            if safe.worker.done():
+                restore()
+            else:
+                safe.worker.add_done_callback(
+                    lambda _: loop.call_soon_threadsafe(restore))
+
+    def metrics(self):
+        """
+        Returns a dict mapping the name of each created pool to its
+        metrics.
+        """
+        return {name: pool.metrics() for name, pool in self.pools.items()}
+
+    def shutdown(self, wait=True):
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
+        self.pools.clear()
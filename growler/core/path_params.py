@@ -0,0 +1,138 @@
+#
+# growler/core/path_params.py
+#
+"""
+Parsing of sinatra-style middleware paths containing named parameters.
+
+A path segment of the form ``:name`` captures a single (non-empty)
+segment of the request path, ``:name<converter>`` additionally
+validates and converts it, and ``*name`` captures the remainder of the
+request path, slashes included:
+
+    >>> router.get('/users/:id<int>/files/*filepath', cb)
+
+The converted values of a request are available as ``req.params``.
+"""
+
+import re
+import uuid
+
+
+class Converter:
+    """
+    A named path parameter type: the regular expression a captured
+    segment must (fully) match, and the function converting the matched
+    string into a python value.
+    """
+
+    __slots__ = [
+        'name',
+        'pattern',
+        'regex',
+        'to_python',
+        'consumes_rest',
+    ]
+
+    def __init__(self, name, pattern, to_python, consumes_rest=False):
+        self.name = name
+        self.pattern = pattern
+        self.regex = re.compile(pattern)
+        self.to_python = to_python
+        self.consumes_rest = consumes_rest
+
+
+CONVERTERS = {
+    'str': Converter('str', r'[^/]+', str),
+    'int': Converter('int', r'-?\d+', int),
+    'float': Converter('float', r'-?\d+(?:\.\d+)?', float),
+    'uuid': Converter('uuid',
+                      r'[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}',
+                      uuid.UUID),
+    'path': Converter('path', r'.*', str, consumes_rest=True),
+}
+
+DEFAULT_CONVERTER = 'str'
+
+PARAM_SEGMENT_REGEX = re.compile(r':(?P<name>\w+)(?:<(?P<converter>\w+)>)?$')
+REST_SEGMENT_REGEX = re.compile(r'\*(?P<name>\w+)$')
+
+
+class Param:
+    """
+    A parameter segment of a parsed path.
+    """
+
+    __slots__ = [
+        'name',
+        'converter',
+    ]
+
+    def __init__(self, name, converter):
+        self.name = name
+        self.converter = converter
+
+    @property
+    def key(self):
+        return self.name, self.converter.name
+
+
+def parse_segment(segment):
+    """
+    Returns a :class:`Param` if the path segment names a parameter,
+    otherwise the segment itself.
+
+    Raises:
+        ValueError: If the segment names an unknown converter
+    """
+    match = PARAM_SEGMENT_REGEX.match(segment)
+    if match is not None:
+        name = match.group('converter') or DEFAULT_CONVERTER
+        try:
+            converter = CONVERTERS[name]
+        except KeyError:
+            raise ValueError("Unknown path parameter converter %r in %r" % (name, segment))
+        return Param(match.group('name'), converter)
+
+    match = REST_SEGMENT_REGEX.match(segment)
+    if match is not None:
+        return Param(match.group('name'), CONVERTERS['path'])
+
+    return segment
+
+
+def parse_path(path):
+    """
+    Splits a path on '/' into a list of literal segments (str) and
+    :class:`Param` objects.
+    """
+    return [parse_segment(segment) for segment in path.split('/')]
+
+
+def has_params(path):
+    """
+    Returns whether any segment of the path names a parameter.
+    """
+    return any(isinstance(segment, Param) for segment in parse_path(path))
+
+
+def path_to_regex(path):
+    """
+    Compiles a path with parameters into a regular expression with a
+    named group per parameter; literal segments are escaped.
+    """
+    return re.compile('/'.join(
+        "(?P<%s>%s)" % (segment.name, segment.converter.pattern)
+        if isinstance(segment, Param)
+        else re.escape(segment)
+        for segment in parse_path(path)
+    ))
+
+
+def path_converters(path):
+    """
+    Returns a dict mapping each parameter name in the path to the
+    function converting its captured string.
+    """
+    return {segment.name: segment.converter.to_python
+            for segment in parse_path(path)
+            if isinstance(segment, Param)}
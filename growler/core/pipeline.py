@@ -0,0 +1,92 @@
+#
+# growler/core/pipeline.py
+#
+"""
+Provides the Pipeline class, the flattened form of the middleware tree
+for a request's method and path, built by :meth:`Application.compile_route`.
+"""
+
+
+class Pipeline:
+    """
+    The linear sequence of middleware functions matching a request, with
+    the error handlers to call should any of them raise an exception.
+
+    ``error_handlers[i]`` holds, most specific first, every error handler
+    registered before ``middleware[i]`` along its path through the tree,
+    including those of enclosing chains.
+
+    ``is_async[i]`` records whether ``middleware[i]`` is a coroutine
+    function, and `async_error_handlers` holds the ids of the error
+    handlers which are, as determined by :meth:`MiddlewareChain.add`.
+    ``blocking[i]`` names the thread pool ``middleware[i]`` is run in,
+    or is None if it is called on the event loop; `is_sync` is True if
+    every middleware is a plain function called on the event loop.
+    `timeout` is the smallest time budget given to any of the
+    middleware, or None, and `cancellable` is False if any of them must
+    run to completion after the client disconnects.
+    `bulkheads` holds the concurrency limits of the middleware and the
+    routers enclosing them, outermost first, each of which must admit a
+    request before any of the middleware runs.
+
+    Requests whose paths resolve to the same nodes (the same 'route
+    shape') share a single Pipeline object.
+    """
+
+    __slots__ = [
+        'nodes',
+        'middleware',
+        'is_async',
+        'blocking',
+        'is_sync',
+        'timeout',
+        'cancellable',
+        'bulkheads',
+        'error_handlers',
+        'async_error_handlers',
+    ]
+
+    def __init__(self, steps, sync_pool=None, bulkheads=()):
+        """
+        Args:
+            steps (iterable): Pairs of a MiddlewareNode and the tuple of
+                error handler nodes, outermost first, in effect when it
+                runs, as produced by :meth:`MiddlewareChain.flatten`
+            sync_pool (str or None): The thread pool running every
+                synchronous middleware not marked with a pool of its own
+            bulkheads (iterable): The :class:`Bulkhead` objects limiting
+                the concurrency of the route, as collected by
+                :meth:`MiddlewareChain.flatten`
+        """
+        steps = tuple(steps)
+        self.nodes = tuple(node for node, _ in steps)
+        self.middleware = tuple(node.func for node in self.nodes)
+        self.is_async = tuple(node.is_async for node in self.nodes)
+        self.blocking = tuple(node.blocking or (None if node.is_async else sync_pool)
+                              for node in self.nodes)
+        self.is_sync = not any(self.is_async) and not any(self.blocking)
+        timeouts = [node.timeout for node in self.nodes if node.timeout is not None]
+        self.timeout = min(timeouts) if timeouts else None
+        self.cancellable = all(node.cancellable for node in self.nodes)
+        self.bulkheads = tuple(bulkheads)
+        self.error_handlers = tuple(tuple(handler.func for handler in reversed(handlers))
+                                    for _, handlers in steps)
+        self.async_error_handlers = frozenset(id(handler.func)
+                                              for _, handlers in steps
+                                              for handler in handlers
+                                              if handler.is_async)
+
+    @staticmethod
+    def shape(steps, bulkheads=()):
+        """
+        Returns the hashable key identifying the route shape of steps.
+        """
+        return (tuple((id(node), tuple(map(id, handlers)))
+                      for node, handlers in steps),
+                tuple(map(id, bulkheads)))
+
+    def __iter__(self):
+        return iter(self.middleware)
+
+    def __len__(self):
+        return len(self.middleware)
@@ -0,0 +1,81 @@
+#
+# growler/core/route_cache.py
+#
+"""
+Provides the RouteCache class, a bounded least-recently-used mapping
+used to remember the result of resolving a request's method and path.
+"""
+
+from collections import OrderedDict
+
+
+class RouteCache:
+    """
+    A bounded LRU cache with a 'doorkeeper' admission policy: a key is
+    only stored once it has been offered `admit_after` times.
+    Paths seen a single time (e.g. those containing ids, or produced by
+    scanners) therefore never displace frequently requested ones.
+
+    The doorkeeper's counts are themselves bounded; they are forgotten
+    once as many distinct keys as the cache may hold have been counted.
+    """
+
+    def __init__(self, maxsize=1024, admit_after=2):
+        """
+        Args:
+            maxsize (int): The maximum number of entries stored
+            admit_after (int): Number of times a key must be offered via
+                :meth:`put` before it is stored
+        """
+        self.maxsize = maxsize
+        self.admit_after = admit_after
+        self._entries = OrderedDict()
+        self._sightings = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the value stored under key, or None if not present.
+        """
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Offers a value to the cache, storing it if the key has been seen
+        often enough, and evicting the least recently used entry if the
+        cache is full.
+        """
+        if self.admit_after > 1:
+            count = self._sightings.get(key, 0) + 1
+            if count < self.admit_after:
+                if len(self._sightings) >= self.maxsize:
+                    self._sightings.clear()
+                self._sightings[key] = count
+                return
+            self._sightings.pop(key, None)
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes every entry, and forgets every key seen.
+        """
+        self._entries.clear()
+        self._sightings.clear()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
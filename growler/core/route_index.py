@@ -0,0 +1,204 @@
+#
+# growler/core/route_index.py
+#
+"""
+Provides the RouteIndex class, a compiled lookup structure used by
+MiddlewareChain to find the middleware matching a request path without
+testing every node's regular expression.
+
+Middleware mounted on string paths are stored in a trie keyed on the
+'/'-separated segments of their path, so a lookup only visits the nodes
+along the request's own path.
+Parameter segments (see :mod:`growler.core.path_params`) are edges
+tested with their converter's regular expression.
+Middleware mounted on arbitrary regular expressions cannot be indexed
+this way and are kept in a separate list, tested in turn.
+"""
+
+from .path_params import (
+    Param,
+    parse_segment,
+)
+
+
+class RouteMatch:
+    """
+    The (always truthy) result of matching a request path against an
+    indexed middleware path, standing in for the regex match object
+    produced by :meth:`MiddlewareNode.path_split`.
+    """
+
+    __slots__ = [
+        'route',
+        'groups',
+    ]
+
+    def __init__(self, route, groups=()):
+        self.route = route
+        self.groups = groups
+
+    def group(self):
+        return self.route
+
+    def groupdict(self):
+        return dict(self.groups)
+
+
+class SegmentTrie:
+    """
+    A trie whose edges are path segments, either literal strings or
+    :class:`Param` objects.
+    Each trie node holds the entries whose path ends at that node.
+    """
+
+    __slots__ = [
+        'children',
+        'params',
+        'entries',
+    ]
+
+    def __init__(self):
+        self.children = {}
+        self.params = {}
+        self.entries = []
+
+    def insert(self, segments, entry):
+        node = self
+        for segment in segments:
+            if isinstance(segment, Param):
+                _, node = node.params.setdefault(segment.key, (segment, SegmentTrie()))
+            else:
+                node = node.children.setdefault(segment, SegmentTrie())
+        node.entries.append(entry)
+
+    def walk(self, segments, depth=0, groups=()):
+        """
+        Yields (depth, entry, groups) triples of every entry stored on
+        the trie nodes visited by following segments from this node,
+        where groups are the (name, value) pairs of parameters captured
+        on the way.
+        """
+        for entry in self.entries:
+            yield depth, entry, groups
+        if depth == len(segments):
+            return
+
+        segment = segments[depth]
+        child = self.children.get(segment)
+        if child is not None:
+            yield from child.walk(segments, depth + 1, groups)
+
+        for param, child in self.params.values():
+            converter = param.converter
+            if converter.consumes_rest:
+                value = '/'.join(segments[depth:])
+                end = len(segments)
+            else:
+                value = segment
+                end = depth + 1
+            if converter.regex.fullmatch(value):
+                yield from child.walk(segments, end, groups + ((param.name, value), ))
+
+
+class RouteIndex:
+    """
+    Compiled index of the nodes of a single MiddlewareChain (subchains
+    are indexed by their own chain).
+
+    Lookups produce the same (node, match, rest) triples, in the same
+    order of registration, as testing every node with
+    :meth:`MiddlewareNode.path_split`.
+    """
+
+    def __init__(self, nodes, root_pattern=None):
+        """
+        Args:
+            nodes (iterable of MiddlewareNode): The chain's nodes, in
+                order of registration.
+            root_pattern (regex): The chain's root pattern, which is
+                indexed as the literal path '/'.
+        """
+        self.nodes = list(nodes)
+        self.trie = SegmentTrie()
+        self.regex_nodes = []
+
+        for order, node in enumerate(self.nodes):
+            route = node.route
+            if route is None and node.path is root_pattern:
+                route = '/'
+
+            if route is None:
+                self.regex_nodes.append((order, node))
+                continue
+
+            key = self.route_key(route)
+            if key is False:
+                self.regex_nodes.append((order, node))
+            elif key is not None:
+                segments, needs_more = key
+                self.trie.insert(segments, (order, node, needs_more, route))
+
+    @staticmethod
+    def route_key(route):
+        """
+        Converts a literal middleware path into trie segments and a flag
+        indicating whether the request path must continue past them.
+
+        A path ending with '/' must be followed by more of the request
+        path; otherwise it matches at a segment boundary. A path not
+        starting with '/' (other than the empty path, which matches
+        everything) can never match and returns None.
+        Parameter segments are returned as :class:`Param` objects.
+        A path continuing past a parameter consuming the rest of the
+        request path cannot be indexed and returns False.
+        """
+        if route == '':
+            return (), False
+        if not route.startswith('/'):
+            return None
+
+        segments = [parse_segment(segment) for segment in route.split('/')[1:]]
+        needs_more = route.endswith('/')
+        if needs_more:
+            segments.pop()
+
+        for segment in segments[:-1]:
+            if isinstance(segment, Param) and segment.converter.consumes_rest:
+                return False
+        return tuple(segments), needs_more
+
+    def lookup(self, path):
+        """
+        Returns a list of (node, match, rest) triples for every node
+        whose path matches the request path, in order of registration.
+        """
+        if not path.startswith('/'):
+            return [(node, match, rest)
+                    for node in self.nodes
+                    for match, rest in (node.path_split(path), )
+                    if match is not None]
+
+        segments = path.split('/')[1:]
+        found = []
+
+        for depth, (order, node, needs_more, route), groups in self.trie.walk(segments):
+            remaining = segments[depth:]
+            if needs_more:
+                if not remaining:
+                    continue
+                rest = '/'.join(remaining)
+            else:
+                rest = '/' + '/'.join(remaining) if remaining else ''
+
+            if node.IGNORE_TRAILING_SLASH and rest == '/':
+                rest = ''
+
+            found.append((order, node, RouteMatch(route, groups), rest))
+
+        for order, node in self.regex_nodes:
+            match, rest = node.path_split(path)
+            if match is not None:
+                found.append((order, node, match, rest))
+
+        found.sort(key=lambda item: item[0])
+        return [item[1:] for item in found]
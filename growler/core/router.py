@@ -3,10 +3,15 @@
 #
 
 import re
+import types
 import logging
+import weakref
+import threading
+from importlib import import_module
 from functools import partialmethod
 from collections import OrderedDict
 from growler.http import HTTPMethod
+from . import path_params
 from .middleware_chain import (
     MiddlewareChain,
 )
@@ -44,6 +49,12 @@ class Router(MiddlewareChain):
     >>> blog_router.post("/new_post", ...)
     >>> root_router.use("/blog", blog_router)
 
+    Paths may contain named parameters (``:name``, ``:name<int>``,
+    ``*rest``; see :mod:`growler.core.path_params`) whose converted
+    values are stored in ``req.params``:
+
+    >>> router.get("/posts/:id<int>", cb)
+
     The default growler.App has its root router at self.router, and
     offers convience aliases to automatically add routes:
     >>> app.get(..) == app.router.get(...)
@@ -82,6 +93,7 @@ class Router(MiddlewareChain):
     post = partialmethod(_add_route, HTTPMethod.POST)
     put = partialmethod(_add_route, HTTPMethod.PUT)
     delete = partialmethod(_add_route, HTTPMethod.DELETE)
+    head = partialmethod(_add_route, HTTPMethod.HEAD)
 
     def use(self, middleware, path=None):
         """
@@ -117,8 +129,11 @@ class Router(MiddlewareChain):
         """
         Returns True (i.e. should skip) if request does not match the
         entire middleware path.
-        This is a simple check if 'rest' is truthy or not.
+        This is a simple check if 'rest' is truthy or not, except for
+        mounted subchains (e.g. routers), which handle the rest.
         """
+        if middleware.is_subchain:
+            return bool(not matching)
         return bool(not matching) or bool(rest)
 
     @property
@@ -143,14 +158,86 @@ class Router(MiddlewareChain):
         if type(path) is cls.regex_type:
             return path
 
-        # Build a regular expression string which is split on the '/' character
-        regex = [
-            "(?P<{}>\w+)".format(segment[1:])
-            if cls.sinatra_param_regex.match(segment)
-            else segment
-            for segment in path.split('/')
-        ]
-        return re.compile('/'.join(regex))
+        return path_params.path_to_regex(path)
+
+
+class LazyRouter(Router):
+    """
+    A router standing in for another, named by an import string of the
+    form 'package.module:attribute', which is only imported upon the
+    first request routed to it (or when :meth:`load` is called, e.g. by
+    :meth:`Application.warm_up`).
+
+    The attribute may be a :class:`MiddlewareChain` (e.g. a Router), or
+    a callable returning one. The loaded router is mounted within this
+    one, so it is matched against the remainder of the request path.
+    If the import fails, the exception is raised to the request and the
+    import is attempted again on the next one.
+    """
+
+    def __init__(self, target):
+        """
+        Args:
+            target (str): The import string naming the router
+        """
+        super().__init__()
+        self.target = target
+        self.loaded = None
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        """
+        Imports and mounts the target router, if not already loaded.
+        Safe to call from a worker thread.
+
+        Returns:
+            MiddlewareChain: The loaded router
+        """
+        if self.loaded is not None:
+            return self.loaded
+
+        with self._load_lock:
+            if self.loaded is None:
+                router = self.import_target(self.target)
+                self.log.info(" Loaded lazy router %s" % self.target)
+                # mounted even if frozen: loading completes the tree
+                # rather than changing it, so it is frozen in turn
+                self._add(HTTPMethod.ALL, '', router)
+                if self.frozen:
+                    router.freeze()
+                self.loaded = router
+        return self.loaded
+
+    @staticmethod
+    def import_target(target):
+        """
+        Imports the object named by 'module:attribute' (the attribute
+        may be dotted), calling it if it is not already a chain.
+
+        Raises:
+            ImportError: If the module cannot be imported
+            AttributeError: If the module lacks the attribute
+            TypeError: If the object is not (and does not produce) a
+                MiddlewareChain
+        """
+        module_name, _, attr_path = target.partition(':')
+        obj = import_module(module_name)
+        for attr in (attr_path or 'router').split('.'):
+            obj = getattr(obj, attr)
+
+        if not isinstance(obj, MiddlewareChain) and callable(obj):
+            obj = obj()
+        if not isinstance(obj, MiddlewareChain):
+            raise TypeError("Lazy router %r is not a MiddlewareChain" % target)
+        return obj
+
+    def find_matching_middleware(self, method, path):
+        if self.loaded is None:
+            self.load()
+        return super().find_matching_middleware(method, path)
+
+    def __repr__(self):
+        return "<%s %r>" % (type(self).__name__, self.target)
 
 
 class RouterMeta(type):
@@ -189,9 +276,9 @@ class RouterMeta(type):
         def build_router(self):
             router = Router()
 
-            routes = get_routing_attributes(self, keys=classdict.keys())
-            for method, path, func in routes:
-                router.add(method, path, func)
+            routes = get_route_table(child_class, keys=classdict.keys())
+            for method, path, attr in routes:
+                router.add(method, path, getattr(self, attr))
             self.__growler_router = router
             return router
 
@@ -224,6 +311,22 @@ def _find_routeable_attributes(obj, keys):
         yield val, method_name
 
 
+def _find_routes(obj, keys):
+    """
+    Yields (attribute name, method, path, value, rest of docstring) of
+    every routeable attribute of `obj` whose docstring names a path.
+    """
+    for attr in keys:
+        for val, method_str in _find_routeable_attributes(obj, (attr, )):
+
+            path, *doc = val.__doc__.split(maxsplit=1) or ('', '')
+
+            if not path:
+                continue
+
+            yield attr, HTTPMethod[method_str], path, val, doc
+
+
 def get_routing_attributes(obj, modify_doc=False, keys=None):
     """
     Loops through the provided object (using the dir() function) and
@@ -241,21 +344,47 @@ def get_routing_attributes(obj, modify_doc=False, keys=None):
     if keys is None:
         keys = dir(obj)
 
-    for val, method_str in _find_routeable_attributes(obj, keys):
-
-        path, *doc = val.__doc__.split(maxsplit=1) or ('', '')
-
-        if not path:
-            continue
+    for _, method, path, val, doc in _find_routes(obj, keys):
 
         if modify_doc:
             val.__doc__ = ''.join(doc)
 
-        method = HTTPMethod[method_str]
-
         yield method, path, val
 
 
+_route_tables = weakref.WeakKeyDictionary()
+
+
+def get_route_table(cls, keys=None):
+    """
+    Returns the routes defined by a class as a tuple of (method, path,
+    attribute name) triples, found as by :func:`get_routing_attributes`.
+    The attributes of the class are only searched upon the first call
+    for each class (and set of keys); instances are then routed by
+    binding the named attributes.
+
+    Routes are discovered on the class, so routeable attributes set on
+    an instance are not found.
+
+    Args:
+        cls (type): The class defining the routes
+        keys (iterable or None): The attribute names to consider,
+            defaulting to ``dir(cls)``
+    """
+    key = None if keys is None else tuple(keys)
+    tables = _route_tables.setdefault(cls, {})
+    try:
+        return tables[key]
+    except KeyError:
+        pass
+
+    if keys is None:
+        keys = dir(cls)
+    table = tables[key] = tuple((method, path, attr)
+                                for attr, method, path, _, _ in _find_routes(cls, keys))
+    return table
+
+
 def routerclass(cls):
     """
     A class decorator which parses a class, looking for an member
@@ -283,6 +412,9 @@ def routerify(obj):
     Scan through attributes of object parameter looking for any which
     match a route signature.
     A router will be created and added to the object with parameter.
+    The routes of an instance are looked up in the route table of its
+    class (see :func:`get_route_table`), so the search is only done
+    once per class.
 
     Args:
         obj (object): The object (with attributes) from which to
@@ -292,7 +424,12 @@ def routerify(obj):
         Router: The router created from attributes in the object.
     """
     router = Router()
-    for info in get_routing_attributes(obj):
+    if isinstance(obj, (type, types.ModuleType)):
+        routes = get_routing_attributes(obj)
+    else:
+        routes = ((method, path, getattr(obj, attr))
+                  for method, path, attr in get_route_table(type(obj)))
+    for info in routes:
         router.add_route(*info)
     obj.__growler_router = router
     return router
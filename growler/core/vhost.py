@@ -0,0 +1,92 @@
+#
+# growler/core/vhost.py
+#
+"""
+Provides the VirtualHosts class, mapping the value of a request's Host
+header to the middleware chain serving that (virtual) host.
+"""
+
+
+class VirtualHosts:
+    """
+    Collection of middleware chains keyed by hostname.
+
+    Hostnames are either exact ('api.example.com') or wildcards
+    ('*.example.com'), the latter matching any hostname ending with the
+    suffix, at any depth.
+    Exact names are found with a single dict lookup; wildcards with one
+    dict lookup per label of the requested hostname, the most specific
+    suffix winning.
+    Hostnames are compared case-insensitively, ignoring any port and
+    trailing dot.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.wildcards = {}
+
+    @staticmethod
+    def normalize(host):
+        """
+        Returns the lowercase hostname of the value of a Host header,
+        without port or trailing dot.
+        """
+        host = host.strip().lower()
+        if host.startswith('['):
+            # IPv6 literal, e.g. '[::1]:8080'
+            host = host[:host.find(']') + 1]
+        else:
+            host = host.partition(':')[0]
+        return host.rstrip('.')
+
+    def add(self, hostname, chain):
+        """
+        Registers the chain serving hostname, replacing any chain
+        previously registered under the same name.
+
+        Raises:
+            ValueError: If hostname contains a '*' anywhere but as its
+                first label
+        """
+        if hostname.startswith('*.'):
+            suffix = self.normalize(hostname[1:])
+            if '*' in suffix:
+                raise ValueError("Invalid wildcard hostname %r" % hostname)
+            self.wildcards[suffix] = chain
+            return
+        if '*' in hostname:
+            raise ValueError("Invalid wildcard hostname %r" % hostname)
+        self.exact[self.normalize(hostname)] = chain
+
+    def match(self, host):
+        """
+        Finds the chain serving the value of a Host header.
+
+        Returns:
+            tuple or None: The matching registered name (the hostname,
+                or the wildcard suffix starting with '.') and its chain,
+                or None if no name matches.
+        """
+        host = self.normalize(host)
+        chain = self.exact.get(host)
+        if chain is not None:
+            return host, chain
+
+        if self.wildcards:
+            dot = host.find('.')
+            while dot != -1:
+                suffix = host[dot:]
+                chain = self.wildcards.get(suffix)
+                if chain is not None:
+                    return suffix, chain
+                dot = host.find('.', dot + 1)
+        return None
+
+    def chains(self):
+        """
+        Returns every registered chain.
+        """
+        return list(self.exact.values()) + list(self.wildcards.values())
+
+    def __len__(self):
+        return len(self.exact) + len(self.wildcards)
@@ -0,0 +1,46 @@
+#
+# growler/http/etag.py
+#
+"""
+Helpers for entity tags and the If-None-Match conditional request
+header (RFC 7232).
+"""
+
+
+def format_etag(value, weak=False):
+    """
+    Returns `value` as a quoted entity-tag, prefixed with 'W/' if weak.
+    Values which are already quoted are returned unchanged.
+
+    Args:
+        value (str): The opaque tag
+        weak (bool): Whether this is a weak validator
+    """
+    if value.startswith(('"', 'W/"')):
+        return value
+    return '%s"%s"' % ('W/' if weak else '', value)
+
+
+def strip_weak(etag):
+    """
+    Removes the weakness indicator from an entity-tag.
+    """
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Returns whether `etag` matches any entity-tag listed in the value of
+    an If-None-Match header, using the weak comparison function.
+
+    Args:
+        if_none_match (str or None): The If-None-Match header value
+        etag (str): The (quoted) entity-tag of the current representation
+    """
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    etag = strip_weak(etag)
+    return any(strip_weak(tag.strip()) == etag
+               for tag in if_none_match.split(','))
@@ -0,0 +1,131 @@
+#
+# growler/http/ranges.py
+#
+"""
+Helpers for interpreting the HTTP ``Range`` request header (RFC 7233).
+
+Only the ``bytes`` range unit is understood.
+The functions here are purely computational; reading the requested bytes
+out of a file and writing them to the client is left to the
+:class:`growler.http.HTTPResponse` object.
+"""
+
+import re
+
+BYTE_RANGE_SPEC_REGEX = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+MAX_RANGE_COUNT = 16
+
+
+class RangeNotSatisfiable(ValueError):
+    """
+    Raised when a syntactically valid Range header does not overlap
+    the resource at all.
+    The response should be a '416 Range Not Satisfiable'.
+    """
+    pass
+
+
+def parse_range_header(value, size, max_ranges=MAX_RANGE_COUNT):
+    """
+    Converts the value of a Range header into a list of inclusive
+    ``(first, last)`` byte offsets into a resource of length `size`.
+
+    Overlapping and adjacent ranges are coalesced and the result is
+    sorted by offset.
+    If the header is malformed, uses an unknown unit, or requests more
+    than `max_ranges` ranges, None is returned and the Range header
+    should be ignored (i.e. the full resource is sent).
+
+    Args:
+        value (str): The value of the Range header (e.g. 'bytes=0-99')
+        size (int): The total length of the resource
+        max_ranges (int): Upper bound on the number of ranges accepted
+
+    Returns:
+        list or None: The satisfiable (first, last) pairs
+
+    Raises:
+        RangeNotSatisfiable: If no requested range overlaps the resource
+    """
+    unit, sep, range_set = value.partition('=')
+    if not sep or unit.strip().lower() != 'bytes':
+        return None
+
+    specs = range_set.split(',')
+    if len(specs) > max_ranges:
+        return None
+
+    ranges = []
+    for spec in specs:
+        try:
+            byte_range = parse_byte_range_spec(spec, size)
+        except ValueError:
+            return None
+        if byte_range is not None:
+            ranges.append(byte_range)
+
+    if not ranges:
+        raise RangeNotSatisfiable(value)
+
+    return coalesce_ranges(ranges)
+
+
+def parse_byte_range_spec(spec, size):
+    """
+    Converts a single byte-range-spec of a Range header ('0-99', '100-'
+    or the suffix range '-50') into an inclusive (first, last) pair.
+
+    Returns:
+        tuple or None: The pair, or None if the range does not overlap
+            a resource of length `size`
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    match = BYTE_RANGE_SPEC_REGEX.match(spec)
+    if match is None:
+        raise ValueError("Invalid byte range %r" % spec)
+
+    first, last = match.groups()
+
+    # suffix range: the last N bytes
+    if not first:
+        if not last:
+            raise ValueError("Invalid byte range %r" % spec)
+        length = int(last)
+        if length == 0 or size == 0:
+            return None
+        return (max(size - length, 0), size - 1)
+
+    first = int(first)
+    last = int(last) if last else size - 1
+
+    # first-byte-pos greater than last-byte-pos is invalid syntax
+    if last < first:
+        raise ValueError("Invalid byte range %r" % spec)
+
+    if first < size:
+        return (first, min(last, size - 1))
+    return None
+
+
+def coalesce_ranges(ranges):
+    """
+    Sorts and merges overlapping or adjacent (first, last) pairs.
+    """
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(last, merged[-1][1]))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def content_range(first, last, size):
+    """
+    Returns the value of a Content-Range header for the given inclusive
+    byte offsets.
+    """
+    return "bytes %d-%d/%d" % (first, last, size)
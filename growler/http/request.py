@@ -2,6 +2,7 @@
 # growler/http/request.py
 #
 
+import time
 import asyncio
 import logging
 
@@ -27,6 +28,18 @@ class HTTPRequest:
     headers = None
     _body = None
 
+    # the time (as given by time.monotonic) by which the response should
+    # have been sent; set by the application if the request has a budget
+    deadline = None
+
+    # whether the request is cancelled if the client disconnects before
+    # its response is sent; set by the application from the route
+    cancel_on_disconnect = True
+
+    # the parameters captured from the path by the matched route; set by
+    # the application once the request is routed
+    params = None
+
     def __init__(self, responder, headers):
         """
         The HTTPRequest object is all the information you could want
@@ -88,6 +101,16 @@ class HTTPRequest:
         """
         return self.headers['content-type'] == mime_type
 
+    @property
+    def time_remaining(self):
+        """
+        The number of seconds left before the request's deadline (never
+        negative), or None if the request has no deadline.
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
     @property
     def ip(self):
         return self._responder.ip
@@ -216,9 +216,13 @@ class GrowlerHTTPResponder(GrowlerResponder):
         """
         Simple method which calls the request and response factories
         the responder was given, and returns the pair.
+        The response is given a reference to its request (the
+        `request` attribute) so it may honor request headers such as
+        Range.
         """
         req = self.build_req(self, self.headers)
         res = self.build_res(self._handler)
+        res.request = req
         return req, res
 
     def validate_and_store_body_data(self, data):
@@ -3,17 +3,29 @@
 #
 
 import io
+import os
 import sys
-import json
 import time
+import asyncio
+import uuid
 import growler
 
-from pathlib import Path
 from itertools import chain
 from datetime import datetime
 from collections import OrderedDict
 from growler.http import HttpStatus
+from growler.http.methods import HTTPMethod
+from growler.http.etag import (
+    format_etag,
+    etag_matches,
+)
+from growler.http.ranges import (
+    RangeNotSatisfiable,
+    parse_range_header,
+    content_range,
+)
 from growler.utils.event_manager import Events
+from growler.utils.json_encoding import json_size_hint
 from wsgiref.handlers import format_date_time as format_RFC_1123
 
 
@@ -46,7 +58,10 @@ class HTTPResponse:
         growler_version=growler.__version__,
     )
 
+    FILE_CHUNK_SIZE = 64 * 1024
+
     protocol = None
+    request = None
     has_sent_headers = False
     has_ended = False
     status_code = 200
@@ -54,6 +69,14 @@ class HTTPResponse:
     message = ''
     EOL = ''
     phrase = None
+    content_encoder = None
+    streaming = False
+    pending = None
+    # while a blocking middleware writes the response from a worker
+    # thread, the object passing its output on to the event loop (see
+    # growler.core.offload.ThreadPools.run)
+    handoff = None
+    _stream = None
 
     def __init__(self, protocol, EOL="\r\n"):
         self.protocol = protocol
@@ -77,6 +100,8 @@ class HTTPResponse:
         """
         Sends the headers to the client
         """
+        if self.handoff is not None and self.handoff.defer(self.send_headers):
+            return
         self.events.sync_emit('headers')
         self._set_default_headers()
         header_str = self.status_line + self.EOL + str(self.headers)
@@ -84,15 +109,43 @@ class HTTPResponse:
         self.events.sync_emit('after_headers')
 
     def write(self, msg=None):
+        """
+        Writes body data to the client.
+        If a content_encoder has been installed (e.g. by the Compression
+        middleware) the data is passed through it first.
+        Nothing is written in response to a HEAD request.
+        """
+        if self.handoff is not None and self.handoff.defer(self.write, msg):
+            return
+        if self.is_head_request:
+            return
         msg = self.message if msg is None else msg
         msg = msg.encode() if isinstance(msg, str) else msg
+        if self.content_encoder is not None:
+            msg = self.content_encoder.compress(msg)
+            if not msg:
+                return
         self.stream.write(msg)
 
     def write_eof(self):
+        if self.handoff is not None and self.handoff.defer(self.write_eof):
+            return
+        if self.content_encoder is not None:
+            if not self.is_head_request:
+                self.stream.write(self.content_encoder.flush())
+            self.content_encoder = None
         self.stream.write_eof()
         self.has_ended = True
         self.events.sync_emit('after_send')
 
+    @property
+    def is_head_request(self):
+        """
+        True if this is the response to a HEAD request, in which case
+        headers are sent as usual but the body is omitted.
+        """
+        return self.request is not None and self.request.method == HTTPMethod.HEAD
+
     @property
     def status_line(self):
         """
@@ -166,21 +219,96 @@ class HTTPResponse:
 
     def send_json(self, obj, status=200):
         """
-        Sends a stringified JSON response to client. Automatically sets the
+        Sends a JSON response to client. Automatically sets the
         content-type header to application/json.
 
+        The object is encoded directly to bytes by the application's
+        `json_encoder`.
+        If the application's `json_offload_threshold` is set and the
+        object is estimated to be larger (see
+        :func:`growler.utils.json_encoding.json_size_hint`), encoding is
+        done in the event loop's thread pool executor.
+        In that case this method returns an awaitable, which is also
+        stored as the `pending` attribute so the application waits for
+        the response to be sent before continuing.
+
         Parameters
         ----------
         obj : mixed
-            Any object which will be serialized by the json.dumps module
-            function
+            Any object which can be serialized by the json encoder
         status : int, optional
             The HTTP status code, defaults to 200 (OK)
+
+        Returns
+        -------
+        None or asyncio.Future
+            A future which completes once the response has been sent,
+            if encoding was offloaded to a thread.
         """
         self.headers['Content-Type'] = 'application/json'
         self.status_code = status
-        message = json.dumps(obj)
-        self.send_text(message)
+
+        app = self.app
+        encode = app.json_encoder
+        threshold = app.json_offload_threshold
+
+        if threshold is not None and json_size_hint(obj, threshold) > threshold:
+            self.pending = asyncio.ensure_future(
+                self._send_json_in_executor(encode, obj),
+                loop=self.protocol.loop,
+            )
+            return self.pending
+
+        self.send_text(encode(obj), status)
+
+    async def _send_json_in_executor(self, encode, obj):
+        """
+        Encodes obj in the loop's executor and sends the result.
+        """
+        message = await self.protocol.loop.run_in_executor(None, encode, obj)
+        self.pending = None
+        self.send_text(message, self.status_code)
+
+    def not_modified(self, etag, weak=False):
+        """
+        Sets the ETag header of the response and, if the request's
+        If-None-Match header shows the client already holds this
+        version, sends a bodyless '304 Not Modified' response.
+
+        This allows a handler which can cheaply determine the version of
+        a resource to skip rendering it entirely:
+
+        >>> if res.not_modified(article.version):
+        >>>     return
+        >>> res.render('article', article)
+
+        Parameters
+        ----------
+        etag : str
+            The entity-tag, quoted or not
+        weak : bool, optional
+            Whether an unquoted etag should be marked as weak
+
+        Returns
+        -------
+        bool
+            True if a 304 response was sent
+        """
+        etag = format_etag(etag, weak)
+        self.headers['ETag'] = etag
+
+        req = self.request
+        if req is None or req.method not in (HTTPMethod.GET, HTTPMethod.HEAD):
+            return False
+
+        if not etag_matches(req.headers.get('IF-NONE-MATCH'), etag):
+            return False
+
+        self.status_code = 304
+        self.message = b''
+        self.headers['Content-Length'] = None
+        self.end()
+        return True
 
     def send_html(self, html, status=200):
         """
@@ -201,6 +329,26 @@ class HTTPResponse:
         self.write()
         self.write_eof()
 
+    def after(self, job, *args):
+        """
+        Runs follow-up work once the response has been sent, as a
+        background task of the application (see
+        :meth:`Application.background`), so the client does not wait
+        for it.
+        If the response has already been sent the work is started
+        right away.
+
+        Parameters
+        ----------
+        job : awaitable or callable
+            The work; a callable is called with args and its result
+            awaited if awaitable
+        """
+        if self.has_ended:
+            self.app.background(job, *args)
+        else:
+            self.events.on('after_send', lambda: self.app.background(job, *args))
+
     def send_text(self, txt, status=200):
         """
         Sends plaintext response to client. Automatically sets the content-type
@@ -223,23 +371,188 @@ class HTTPResponse:
 
     def send_file(self, filename, status=200):
         """
-        Reads in the file 'filename' and sends bytes to client
+        Sends the contents of the file 'filename' to the client.
+
+        The file is streamed to the transport in blocks of FILE_CHUNK_SIZE
+        bytes rather than read into memory at once.
+        Should the transport ask to pause writing (the client reading
+        slower than the file is read), the rest of the file is sent once
+        it has drained; this method then returns an awaitable, also
+        stored as the `pending` attribute so the application waits for
+        the response to be sent before continuing.
+        If the request carries a ``Range`` header (and an ``If-Range``
+        validator, if any, matches this response's ``Etag`` or
+        ``Last-Modified`` header) only the requested byte ranges are read
+        and sent as a '206 Partial Content' response; multiple ranges are
+        sent as a ``multipart/byteranges`` body.
+        A range which lies entirely outside of the file produces a
+        '416 Range Not Satisfiable' response.
+        In response to a HEAD request the file is not opened; only its
+        size is read to send the Content-Length header.
 
         Parameters
         ----------
-        filename : str
+        filename : str or pathlib.Path
             Filename of the file to read
         status : int, optional
             The HTTP status code, defaults to 200 (OK)
+
+        Returns
+        -------
+        None or asyncio.Future
+            A future which completes once the response has been sent,
+            if writing was paused.
         """
-        if isinstance(filename, Path) and sys.version_info >= (3, 5):
-            self.message = filename.read_bytes()
-        else:
-            with io.FileIO(str(filename)) as f:
-                self.message = f.read()
-        self.status_code = status
+        filename = str(filename)
+        size = os.stat(filename).st_size
+        # the body is not held in self.message (see the ETag middleware)
+        self.streaming = True
+        self.headers.setdefault('Accept-Ranges', 'bytes')
+
+        try:
+            ranges = self._requested_ranges(size) if status == 200 else None
+        except RangeNotSatisfiable:
+            self.status_code = 416
+            self.headers['Content-Range'] = "bytes */%d" % size
+            self.headers['Content-Length'] = '0'
+            self.message = b''
+            self.send_headers()
+            self.write_eof()
+            return
+
+        # the file need not be opened to answer a HEAD request
+        if self.is_head_request:
+            self.status_code = status
+            self.headers['Content-Length'] = "%d" % size
+            self.send_headers()
+            self.write_eof()
+            return
+
+        f = io.FileIO(filename)
+        try:
+            if not ranges:
+                self.status_code = status
+                self.headers['Content-Length'] = "%d" % size
+                self.send_headers()
+                chunks = self._file_chunks(f, 0, size)
+            elif len(ranges) == 1:
+                first, last = ranges[0]
+                self.status_code = 206
+                self.headers['Content-Range'] = content_range(first, last, size)
+                self.headers['Content-Length'] = "%d" % (last - first + 1)
+                self.send_headers()
+                chunks = self._file_chunks(f, first, last - first + 1)
+            else:
+                chunks = self._multipart_ranges(f, ranges, size)
+            return self._send_file_chunks(f, chunks)
+        except BaseException:
+            f.close()
+            raise
+
+    def _requested_ranges(self, size):
+        """
+        Returns the list of (first, last) byte pairs the client requested
+        via the Range header, or None if the full content should be sent.
+
+        Raises:
+            RangeNotSatisfiable: If the requested ranges lie outside of
+                the content.
+        """
+        req = self.request
+        if req is None or req.method != HTTPMethod.GET:
+            return None
+
+        range_header = req.headers.get('RANGE')
+        if not range_header:
+            return None
+
+        if_range = req.headers.get('IF-RANGE')
+        if if_range is not None:
+            validator = (self.headers.get('Etag')
+                         if not if_range.endswith('GMT')
+                         else self.headers.get('Last-Modified'))
+            if if_range.startswith('W/') or if_range != validator:
+                return None
+
+        return parse_range_header(range_header, size)
+
+    def _multipart_ranges(self, f, ranges, size):
+        """
+        Generator sending the headers of a multipart/byteranges message
+        of the file's byte ranges, then yielding its body.
+        """
+        boundary = uuid.uuid4().hex
+        content_type = self.headers.get('Content-Type') or 'application/octet-stream'
+        part_headers = [
+            ("%s--%s%sContent-Type: %s%sContent-Range: %s%s%s" % (
+                self.EOL, boundary, self.EOL,
+                content_type, self.EOL,
+                content_range(first, last, size), self.EOL, self.EOL,
+            )).encode()
+            for first, last in ranges
+        ]
+        closing = ("%s--%s--%s" % (self.EOL, boundary, self.EOL)).encode()
+
+        length = sum(map(len, part_headers)) + len(closing)
+        length += sum(last - first + 1 for first, last in ranges)
+
+        self.status_code = 206
+        self.headers['Content-Type'] = "multipart/byteranges; boundary=%s" % boundary
+        self.headers['Content-Length'] = "%d" % length
         self.send_headers()
-        self.write()
+
+        for head, (first, last) in zip(part_headers, ranges):
+            yield head
+            yield from self._file_chunks(f, first, last - first + 1)
+        yield closing
+
+    def _file_chunks(self, f, offset, length):
+        """
+        Yields `length` bytes of the open file `f`, starting at `offset`,
+        in blocks of FILE_CHUNK_SIZE bytes.
+        """
+        f.seek(offset)
+        while length > 0:
+            chunk = f.read(min(length, self.FILE_CHUNK_SIZE))
+            if not chunk:
+                break
+            yield chunk
+            length -= len(chunk)
+
+    def _send_file_chunks(self, f, chunks):
+        """
+        Writes chunks, then closes the file f and ends the response.
+
+        Should the transport pause writing, the remaining chunks are
+        written by a task waiting for it to drain, which is returned and
+        stored as the `pending` attribute.
+        A blocking middleware's worker thread waits on the transport
+        itself (see :meth:`ThreadSafeStream.drain`).
+        """
+        for chunk in chunks:
+            self.write(chunk)
+            if self.handoff is not None and self.handoff.drain(self.protocol):
+                continue
+            if self.protocol.writing_paused:
+                self.pending = asyncio.ensure_future(
+                    self._send_file_chunks_drained(chunks),
+                    loop=self.protocol.loop,
+                )
+                self.pending.add_done_callback(lambda _: f.close())
+                return self.pending
+        f.close()
+        self.write_eof()
+
+    async def _send_file_chunks_drained(self, chunks):
+        """
+        Writes the remaining chunks, waiting for the transport to drain
+        before each, then ends the response.
+        """
+        await self.protocol.drain()
+        for chunk in chunks:
+            self.write(chunk)
+            await self.protocol.drain()
+        self.pending = None
         self.write_eof()
 
     def send(self, *args, **kwargs):
@@ -252,7 +565,18 @@ class HTTPResponse:
 
     @property
     def stream(self):
-        return self.protocol.transport
+        """
+        The object response bytes are written to; the protocol's
+        transport unless replaced (e.g. by a middleware recording the
+        response).
+        """
+        if self._stream is None:
+            return self.protocol.transport
+        return self._stream
+
+    @stream.setter
+    def stream(self, stream):
+        self._stream = stream
 
     @property
     def app(self):
@@ -310,6 +634,20 @@ class Headers:
         ci_key = key.casefold()
         del self._header_data[ci_key]
 
+    def __contains__(self, key):
+        ci_key = self.escape(key).casefold()
+        return ci_key in self._header_data
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored under `key`, or `default` if the header
+        has not been set.
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
     def setdefault(self, key, default=None):
         key = self.escape(key)
         ci_key = key.casefold()
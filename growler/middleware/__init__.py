@@ -24,6 +24,10 @@ from .session import (
 )
 from .cookieparser import CookieParser
 from .responsetime import ResponseTime
+from .compression import Compression
+from .etag import ETag
+from .responsecache import ResponseCache
+from .coalesce import Coalesce
 
 
 __all__ = ['Logger']
@@ -0,0 +1,154 @@
+#
+# growler/middleware/coalesce.py
+#
+"""
+Provides middleware which coalesces concurrent, identical GET requests
+('singleflight'), so an expensive handler runs once for all of them.
+"""
+
+import asyncio
+import logging
+
+from growler.http.methods import HTTPMethod
+from .responsecache import RecordingStream
+
+log = logging.getLogger(__name__)
+
+
+class Coalesce:
+    """
+    Middleware which lets the first of several concurrent, identical GET
+    requests (the 'leader') continue down the middleware chain, while
+    the others wait for its response.
+    The leader's serialized response (status line, headers and body) is
+    recorded as it is sent and written verbatim to every waiting
+    client, whose requests then end without running further middleware.
+
+    Requests are identical if they share the Host, path, query and the
+    values of the request headers named in `vary`.
+    Requests carrying any header named in `bypass` (credentials by
+    default) are never coalesced, unless that header is also in `vary`.
+    Should the leader's middleware finish (or be cancelled) without
+    sending a response, the waiting requests continue down the chain
+    themselves; so do they if the response is not to be shared (see
+    :meth:`is_shareable`) or is larger than `max_bytes`.
+
+    Unlike :class:`ResponseCache`, nothing is kept once the leader's
+    response is sent; the two may be combined, the cache placed first.
+
+    Example:
+
+    >>> app.use(Coalesce(vary=('Accept-Encoding', 'Authorization')))
+    """
+
+    def __init__(self,
+                 vary=('Accept-Encoding', ),
+                 bypass=('Authorization', 'Cookie'),
+                 max_bytes=2 ** 20):
+        """
+        Construct a Coalesce middleware.
+
+        Parameters:
+            vary (tuple of str): Request headers included in the key
+            bypass (tuple of str): Request headers which, when present,
+                keep the request from being coalesced
+            max_bytes (int or None): Responses larger than this are not
+                recorded or shared
+        """
+        self.vary = tuple(h.upper() for h in vary)
+        self.bypass = tuple(h.upper() for h in bypass if h.upper() not in self.vary)
+        self.max_bytes = max_bytes
+        self._flights = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def __call__(self, req, res):
+        if req.method != HTTPMethod.GET or self.is_private(req):
+            return
+
+        key = self.make_key(req)
+        flight = self._flights.get(key)
+        if flight is None:
+            self.leaders += 1
+            self.lead(res, key)
+            return
+
+        self.coalesced += 1
+        response = await asyncio.shield(flight)
+        if response is None:
+            # the leader sent nothing - handle this request normally
+            return
+
+        status_code, data = response
+        res.stream.write(data)
+        res.status_code = status_code
+        res.write_eof()
+
+    def is_private(self, req):
+        """
+        Returns whether the request carries a header named in bypass.
+        """
+        return any(req.headers.get(name) for name in self.bypass)
+
+    def make_key(self, req):
+        """
+        Builds the key identifying identical requests.
+        """
+        query = tuple(sorted((k, tuple(v)) for k, v in req.query.items()))
+        varying = tuple(req.headers.get(name) for name in self.vary)
+        return (req.headers.get('HOST'), req.path, query, varying)
+
+    def lead(self, res, key):
+        """
+        Registers the request as the leader of key, recording its
+        response to be shared with any identical requests which arrive
+        before it is sent.
+        """
+        loop = asyncio.get_event_loop()
+        flight = self._flights[key] = loop.create_future()
+
+        recorder = RecordingStream(res.stream, max_bytes=self.max_bytes)
+        res.stream = recorder
+
+        def land(response):
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if not flight.done():
+                flight.set_result(response)
+
+        def after_send():
+            # emitted on the loop, after every write of the response -
+            # including those a blocking handler deferred from its worker
+            if recorder.overflowed or not self.is_shareable(res):
+                land(None)
+            else:
+                land((res.status_code, b''.join(recorder.chunks)))
+
+        res.events.on('after_send', after_send)
+
+        task = asyncio.current_task()
+        if task is not None:
+            task.add_done_callback(lambda _: land(None))
+
+    def is_shareable(self, res):
+        """
+        Returns whether the leader's response may be sent to the other
+        clients: not if it sets a cookie, is marked ``private`` or
+        ``no-store``, or varies on request headers outside of the key.
+        """
+        cache_control = (res.headers.get('Cache-Control') or '').lower()
+        if 'no-store' in cache_control or 'private' in cache_control:
+            return False
+
+        cookie = res.headers.get('Set-Cookie')
+        if callable(cookie):
+            cookie = cookie()
+        if cookie:
+            return False
+
+        vary = res.headers.get('Vary') or ''
+        varying = (h.strip().upper() for h in vary.split(','))
+        return all(not h or h in self.vary for h in varying)
+
+    def __len__(self):
+        return len(self._flights)
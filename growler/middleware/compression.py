@@ -0,0 +1,200 @@
+#
+# growler/middleware/compression.py
+#
+"""
+Provides middleware which compresses response bodies according to the
+encodings a client advertises in its Accept-Encoding header.
+"""
+
+import zlib
+import logging
+
+try:
+    from compression import zstd
+except ImportError:  # pragma: no cover
+    zstd = None
+
+log = logging.getLogger(__name__)
+
+
+class Compression:
+    """
+    Middleware which negotiates a content-coding (zstd, gzip or deflate)
+    with the client and compresses the response body as it is written.
+
+    The decision to compress is made upon the response's 'headers'
+    event, once the status, content type and size of the response are
+    known.
+    Responses whose body is already stored in ``res.message`` (i.e.
+    send_text, send_html, send_json) are compressed in one pass so an
+    exact Content-Length can be sent.
+    Streamed bodies (send_file) install a compressor object as the
+    response's ``content_encoder``, through which every
+    :meth:`HTTPResponse.write` passes; their Content-Length header is
+    dropped and the body is delimited by closing the connection.
+
+    Example:
+
+    >>> app.use(Compression(min_size=512, level=5))
+    """
+
+    DEFAULT_CONTENT_TYPES = (
+        'text/',
+        'application/json',
+        'application/javascript',
+        'application/xml',
+        'image/svg+xml',
+    )
+
+    SKIP_STATUS_CODES = frozenset((204, 206, 304))
+
+    def __init__(self,
+                 min_size=1024,
+                 content_types=DEFAULT_CONTENT_TYPES,
+                 level=6,
+                 zstd_level=None,
+                 encodings=None):
+        """
+        Construct Compression middleware.
+
+        Parameters:
+            min_size (int): Responses smaller than this many bytes are
+                sent uncompressed.
+            content_types (tuple of str): Allowlist of media types to
+                compress. An entry ending with '/' matches every subtype.
+            level (int): Compression level for gzip and deflate (0-9).
+            zstd_level (int or None): Compression level for zstd; None
+                uses the library default.
+            encodings (tuple of str or None): Supported encodings in
+                order of server preference. Defaults to every encoding
+                this interpreter provides.
+        """
+        self.min_size = min_size
+        self.content_types = tuple(content_types)
+        self.level = level
+        self.zstd_level = zstd_level
+
+        if encodings is None:
+            encodings = self.available_encodings()
+        self.encodings = tuple(encodings)
+
+    @staticmethod
+    def available_encodings():
+        """
+        Returns the content-codings supported by this interpreter, most
+        preferred first.
+        """
+        encodings = ('gzip', 'deflate')
+        if zstd is not None:
+            encodings = ('zstd', ) + encodings
+        return encodings
+
+    def __call__(self, req, res):
+        encoding = self.negotiate(req.headers.get('ACCEPT-ENCODING', ''))
+
+        def on_headers():
+            if not self.should_compress(res):
+                return
+
+            res.headers['Vary'] = self.add_vary(res.headers.get('Vary'))
+            if encoding is None:
+                return
+
+            encoder = self.make_encoder(encoding)
+            res.headers['Content-Encoding'] = encoding
+
+            if 'Content-Length' in res.headers:
+                # streamed body - compress as it is written; a None value
+                # suppresses the header (and the default Content-Length)
+                res.headers['Content-Length'] = None
+                res.content_encoder = encoder
+            else:
+                message = res.message
+                if isinstance(message, str):
+                    message = message.encode()
+                res.message = encoder.compress(message) + encoder.flush()
+
+            log.debug("%d compressing response with %s" % (id(self), encoding))
+
+        res.events.on('headers', on_headers)
+
+    def negotiate(self, accept_encoding):
+        """
+        Picks the encoding to use from the value of an Accept-Encoding
+        header, or None if no supported encoding is acceptable.
+
+        Encodings are chosen by the client's quality value, with ties
+        broken by the order of :attr:`encodings`.
+        """
+        qualities = {}
+        for item in accept_encoding.split(','):
+            name, *params = item.strip().split(';')
+            name = name.strip().lower()
+            if not name:
+                continue
+            q = 1.0
+            for param in params:
+                key, _, value = param.strip().partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            qualities[name] = q
+
+        wildcard = qualities.get('*', 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = qualities.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def should_compress(self, res):
+        """
+        Returns whether the response is eligible for compression, based
+        on its status, existing Content-Encoding, media type and size.
+        """
+        if res.status_code < 200 or res.status_code in self.SKIP_STATUS_CODES:
+            return False
+
+        if 'Content-Encoding' in res.headers:
+            return False
+
+        content_type = res.headers.get('Content-Type') or ''
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        if not any(media_type == allowed
+                   or (allowed.endswith('/') and media_type.startswith(allowed))
+                   for allowed in self.content_types):
+            return False
+
+        length = res.headers.get('Content-Length')
+        size = int(length) if length is not None else len(res.message)
+        return size >= self.min_size
+
+    def make_encoder(self, encoding):
+        """
+        Returns a new streaming compressor object, with ``compress`` and
+        ``flush`` methods, for the named encoding.
+        """
+        if encoding == 'zstd':
+            if self.zstd_level is None:
+                return zstd.ZstdCompressor()
+            return zstd.ZstdCompressor(level=self.zstd_level)
+        if encoding == 'gzip':
+            return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        if encoding == 'deflate':
+            return zlib.compressobj(self.level, zlib.DEFLATED, zlib.MAX_WBITS)
+        raise ValueError("Unsupported content-coding %r" % encoding)
+
+    @staticmethod
+    def add_vary(vary):
+        """
+        Returns the value of a Vary header including Accept-Encoding.
+        """
+        if not vary:
+            return 'Accept-Encoding'
+        fields = [field.strip().lower() for field in vary.split(',')]
+        if 'accept-encoding' in fields or '*' in fields:
+            return vary
+        return vary + ', Accept-Encoding'
@@ -0,0 +1,84 @@
+#
+# growler/middleware/etag.py
+#
+"""
+Provides middleware which tags dynamic responses with an ETag and answers
+conditional GET requests with '304 Not Modified'.
+"""
+
+import hashlib
+import logging
+
+from growler.http.methods import HTTPMethod
+from growler.http.etag import (
+    format_etag,
+    etag_matches,
+)
+
+log = logging.getLogger(__name__)
+
+
+class ETag:
+    """
+    Middleware which hashes the body of buffered responses (send_text,
+    send_html, send_json, ...) and sets the result as the ETag header.
+    Streamed responses (send_file, marked by ``res.streaming``) are left
+    alone.
+    If the request's If-None-Match header matches the tag, the response
+    is turned into a bodyless '304 Not Modified' before it is sent.
+
+    Responses which already carry an ETag (e.g. one set by the handler
+    with :meth:`HTTPResponse.not_modified`) are not re-hashed, but are
+    still checked against If-None-Match.
+
+    The work is done upon the response's 'headers' event, so if this is
+    used with the Compression middleware, use Compression first: the tag
+    is then computed over the encoded body, keeping strong tags distinct
+    between encodings.
+    """
+
+    HASH_DIGEST_SIZE = 12
+
+    def __init__(self, weak=False):
+        """
+        Construct ETag middleware.
+
+        Parameters:
+            weak (bool): Generate weak (W/"...") rather than strong tags
+        """
+        self.weak = weak
+
+    def __call__(self, req, res):
+        if req.method not in (HTTPMethod.GET, HTTPMethod.HEAD):
+            return
+
+        def on_headers():
+            # only buffered bodies may be hashed and replaced; streamed
+            # ones lose their Content-Length if compressed
+            if res.status_code != 200 or res.streaming:
+                return
+            if res.headers.get('Content-Length') is not None:
+                return
+
+            etag = res.headers.get('ETag')
+            if etag is None:
+                etag = self.calculate_etag(res.message)
+                res.headers['ETag'] = etag
+
+            if etag_matches(req.headers.get('IF-NONE-MATCH'), etag):
+                log.debug("%d %s not modified" % (id(self), etag))
+                res.status_code = 304
+                res.message = b''
+                res.headers['Content-Length'] = None
+
+        res.events.on('headers', on_headers)
+
+    def calculate_etag(self, body):
+        """
+        Returns a quoted entity-tag computed from the bytes (or str) of a
+        response body.
+        """
+        if isinstance(body, str):
+            body = body.encode()
+        digest = hashlib.blake2b(body, digest_size=self.HASH_DIGEST_SIZE)
+        return format_etag(digest.hexdigest(), self.weak)
@@ -0,0 +1,334 @@
+#
+# growler/middleware/responsecache.py
+#
+"""
+Provides middleware which caches complete, serialized responses in memory
+and replays them to subsequent clients without running the rest of the
+middleware chain.
+"""
+
+import re
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+from growler.http.methods import HTTPMethod
+
+log = logging.getLogger(__name__)
+
+
+def _current_task():
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        # not called from within a running event loop
+        return None
+
+
+class CacheEntry:
+    """
+    A serialized response stored by the ResponseCache.
+    """
+
+    __slots__ = [
+        'status_code',
+        'head',
+        'body',
+        'created',
+        'expires',
+        'stale_until',
+        'revalidating',
+    ]
+
+    def __init__(self, status_code, head, body, created, ttl, stale_ttl):
+        self.status_code = status_code
+        self.head = head
+        self.body = body
+        self.created = created
+        self.expires = created + ttl
+        self.stale_until = self.expires + stale_ttl
+        self.revalidating = False
+
+    @property
+    def size(self):
+        return len(self.head) + len(self.body)
+
+
+class RecordingStream:
+    """
+    Stand-in for a transport which keeps a copy of every chunk written,
+    optionally forwarding the data to the real transport.
+    Once more than `max_bytes` have been written the copy is dropped and
+    recording stops, marking the recorder as overflowed.
+    """
+
+    def __init__(self, stream=None, max_bytes=None):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.chunks = []
+        self.size = 0
+        self.overflowed = False
+
+    def write(self, data):
+        if not self.overflowed:
+            self.size += len(data)
+            if self.max_bytes is not None and self.size > self.max_bytes:
+                self.overflowed = True
+                self.chunks = []
+            else:
+                self.chunks.append(data)
+        if self.stream is not None:
+            self.stream.write(data)
+
+    def write_eof(self):
+        if self.stream is not None:
+            self.stream.write_eof()
+
+
+class ResponseCache:
+    """
+    Middleware which stores the complete serialized response (status,
+    header bytes and body) of cacheable requests, and writes cached
+    responses straight to the transport on subsequent requests.
+    A hit ends the response, so no further middleware is run.
+
+    Entries are keyed on the method, Host, path, query and the values of
+    the request headers named in `vary`.
+    Requests carrying any header named in `bypass` (credentials by
+    default) are neither answered from nor stored in the cache, unless
+    that header is also in `vary`.
+    Entries are evicted in least-recently-used order once the total
+    size of stored responses exceeds `max_bytes`.
+
+    An expired entry may still be served for `stale_while_revalidate`
+    seconds; the first such request is answered with the stale copy and
+    then continues down the middleware chain with its output recorded
+    (not sent) to refresh the entry.
+
+    Only GET responses with a status in `statuses`, without
+    ``Cache-Control: no-store`` or ``private`` and without Set-Cookie
+    are stored.
+    HEAD requests are answered with the header bytes of a cached GET.
+
+    Example:
+
+    >>> app.use(ResponseCache(ttl=2, route_ttls={'/slow': 10}))
+    """
+
+    def __init__(self,
+                 ttl=5.0,
+                 max_bytes=64 * 2 ** 20,
+                 max_entry_bytes=None,
+                 vary=('Accept-Encoding', ),
+                 bypass=('Authorization', 'Cookie'),
+                 route_ttls=None,
+                 stale_while_revalidate=0.0,
+                 statuses=(200, ),
+                 clock=time.monotonic):
+        """
+        Construct a ResponseCache.
+
+        Parameters:
+            ttl (float): Seconds a stored response is fresh
+            max_bytes (int): Upper bound of the total size of stored
+                responses
+            max_entry_bytes (int or None): Responses larger than this
+                are not stored; defaults to an eighth of max_bytes
+            vary (tuple of str): Request headers included in the key
+            bypass (tuple of str): Request headers which, when present,
+                skip the cache so one client's response is never
+                replayed to another
+            route_ttls (dict or None): Maps a path (str) or compiled
+                regex to the ttl used for matching requests, overriding
+                `ttl`. A ttl of 0 disables caching for that route.
+            stale_while_revalidate (float): Seconds past expiry an
+                entry may be served while it is refreshed
+            statuses (tuple of int): Status codes which may be stored
+            clock (callable): Returns the current time in seconds
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_bytes // 8 if max_entry_bytes is None else max_entry_bytes
+        self.vary = tuple(h.upper() for h in vary)
+        self.bypass = tuple(h.upper() for h in bypass if h.upper() not in self.vary)
+        self.route_ttls = [
+            (re.compile(re.escape(path) + '$') if isinstance(path, str) else path, route_ttl)
+            for path, route_ttl in (route_ttls or {}).items()
+        ]
+        self.stale_while_revalidate = stale_while_revalidate
+        self.statuses = frozenset(statuses)
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def __call__(self, req, res):
+        if req.method not in (HTTPMethod.GET, HTTPMethod.HEAD):
+            return
+
+        ttl = self.ttl_for(req.path)
+        if ttl <= 0 or self.is_private(req):
+            return
+
+        key = self.make_key(req)
+        now = self.clock()
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            if now < entry.expires:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                self.replay(req, res, entry, now)
+                res.write_eof()
+                return
+
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self.replay(req, res, entry, now)
+                if entry.revalidating or req.method != HTTPMethod.GET:
+                    res.write_eof()
+                    return
+                # the client has its response - continue the chain
+                # writing only into the recorder to refresh the entry,
+                # which must not be cancelled as the client disconnects
+                entry.revalidating = True
+                req.cancel_on_disconnect = False
+                res.protocol.transport.write_eof()
+                self.record(req, res, key, ttl, forward=False)
+                task = _current_task()
+                if task is not None:
+                    # should the refresh fail without sending anything
+                    task.add_done_callback(lambda _: setattr(entry, 'revalidating', False))
+                return
+
+            self.discard(key)
+
+        self.misses += 1
+        if req.method == HTTPMethod.GET:
+            self.record(req, res, key, ttl, forward=True)
+
+    def ttl_for(self, path):
+        """
+        Returns the ttl of the first route pattern matching path, or the
+        default ttl.
+        """
+        for pattern, ttl in self.route_ttls:
+            if pattern.match(path):
+                return ttl
+        return self.ttl
+
+    def is_private(self, req):
+        """
+        Returns whether the request carries a header named in bypass.
+        """
+        return any(req.headers.get(name) for name in self.bypass)
+
+    def make_key(self, req):
+        """
+        Builds the cache key of a request. HEAD requests share the key
+        of the corresponding GET.
+        """
+        query = tuple(sorted((k, tuple(v)) for k, v in req.query.items()))
+        varying = tuple(req.headers.get(name) for name in self.vary)
+        return (HTTPMethod.GET, req.headers.get('HOST'), req.path, query, varying)
+
+    def replay(self, req, res, entry, now):
+        """
+        Writes a stored response to the client's transport, adding an
+        Age header.
+        """
+        age = ("Age: %d\r\n\r\n" % (now - entry.created)).encode()
+        transport = res.protocol.transport
+        transport.write(entry.head[:-2] + age)
+        if req.method != HTTPMethod.HEAD:
+            transport.write(entry.body)
+        res.status_code = entry.status_code
+
+    def record(self, req, res, key, ttl, forward):
+        """
+        Replaces the response's stream with a recorder, storing the
+        serialized response once it has been sent.
+        """
+        recorder = RecordingStream(res.stream if forward else None,
+                                   max_bytes=self.max_entry_bytes)
+        res.stream = recorder
+        header_count = None
+
+        def after_headers():
+            nonlocal header_count
+            header_count = len(recorder.chunks)
+
+        def after_send():
+            stale = self._entries.get(key)
+            if stale is not None:
+                stale.revalidating = False
+
+            if header_count is None or recorder.overflowed:
+                return
+            if not self.is_cacheable(res):
+                return
+            head = b''.join(recorder.chunks[:header_count])
+            body = b''.join(recorder.chunks[header_count:])
+            self.store(key, res.status_code, head, body, ttl)
+
+        res.events.on('after_headers', after_headers)
+        res.events.on('after_send', after_send)
+
+    def is_cacheable(self, res):
+        """
+        Returns whether a sent response may be stored.
+        """
+        if res.status_code not in self.statuses:
+            return False
+
+        cache_control = (res.headers.get('Cache-Control') or '').lower()
+        if 'no-store' in cache_control or 'private' in cache_control:
+            return False
+
+        cookie = res.headers.get('Set-Cookie')
+        if callable(cookie):
+            cookie = cookie()
+        return not cookie
+
+    def store(self, key, status_code, head, body, ttl):
+        """
+        Adds a serialized response to the cache, evicting the least
+        recently used entries to stay within max_bytes.
+        """
+        self.discard(key)
+        entry = CacheEntry(status_code, head, body, self.clock(), ttl,
+                           self.stale_while_revalidate)
+        if entry.size > self.max_entry_bytes:
+            return
+
+        self._entries[key] = entry
+        self.size += entry.size
+
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+
+        log.debug("%d stored %s (%d bytes)" % (id(self), key[2], entry.size))
+
+    def discard(self, key):
+        """
+        Removes the entry stored under key, if any.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def clear(self):
+        """
+        Removes every stored response.
+        """
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -18,6 +18,9 @@ class Static:
 
     This middleware uses the HTTPResponse object's send_file method
     to determine mime type.
+    Requests with a Range header are served partial content by
+    send_file, validated against the Etag set here when the request
+    includes If-Range.
     At this time there is no way to change this without subclassing.
     """
 
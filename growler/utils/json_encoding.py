@@ -0,0 +1,77 @@
+#
+# growler/utils/json_encoding.py
+#
+"""
+JSON encoding functions used by :meth:`HTTPResponse.send_json`.
+
+Every encoder accepts a single object and returns the encoded bytes,
+so the response may write the result without any further conversion.
+The default encoder uses the standard library's json module with
+compact separators.
+The faster :func:`orjson_encoder` (requiring the third-party `orjson`
+package) may be chosen through the application's `json_encoder`
+option; note it rejects non-str dict keys and integers beyond 64 bits,
+and encodes NaN and Infinity as null.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+_compact_encoder = json.JSONEncoder(separators=(',', ':'))
+
+
+def stdlib_json_encoder(obj):
+    """
+    Encodes obj with the standard library json module, using compact
+    separators.
+    """
+    return _compact_encoder.encode(obj).encode()
+
+
+def orjson_encoder(obj):
+    """
+    Encodes obj with orjson, which produces bytes directly.
+    Raises ImportError if orjson is not installed.
+    """
+    if orjson is None:
+        raise ImportError("orjson is not installed")
+    return orjson.dumps(obj)
+
+
+default_json_encoder = stdlib_json_encoder
+
+
+def json_size_hint(obj, limit):
+    """
+    Cheaply estimates the 'size' of a JSON-serializable object by
+    counting the values (including those of nested lists and dicts) it
+    contains, stopping once `limit` has been exceeded.
+    Strings and bytes count one per 64 characters.
+
+    Args:
+        obj (mixed): The object to be encoded
+        limit (int): The count beyond which counting stops
+
+    Returns:
+        int: The number of values counted, at most limit + 1
+    """
+    count = 0
+    stack = [obj]
+    while stack and count <= limit:
+        item = stack.pop()
+        if isinstance(item, dict):
+            count += len(item)
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            count += len(item)
+            stack.extend(item)
+        elif isinstance(item, (str, bytes)):
+            count += len(item) // 64
+        else:
+            count += 1
+    return min(count, limit + 1)
@@ -0,0 +1,410 @@
+#
+# growler/utils/pool.py
+#
+"""
+A generic pool of reusable asynchronous resources, such as database or
+socket clients.
+
+Resources are created by a factory, checked (optionally) before being
+handed out, closed after sitting idle too long, and shared fairly:
+requests wait for a resource in arrival order.
+A pool may be attached to an application, which then fills it on
+startup, closes it on shutdown and makes it available to handlers:
+
+    >>> pool = AsyncPool(connect_db, min_size=2, max_size=10,
+    ...                  check=lambda conn: conn.is_open)
+    >>> pool.attach(app, 'db')
+    >>>
+    >>> @app.get('/users')
+    ... async def users(req, res):
+    ...     async with req.app['db'].connection() as conn:
+    ...         res.send_json(await conn.fetch_users())
+"""
+
+import time
+import asyncio
+import inspect
+import logging
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+
+class PoolTimeout(asyncio.TimeoutError):
+    """
+    Raised when no resource became available within the acquire timeout.
+    """
+
+
+class PoolClosed(RuntimeError):
+    """
+    Raised when acquiring from a closed pool.
+    """
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        value = await value
+    return value
+
+
+class PooledResource:
+    """
+    Asynchronous context manager acquiring a resource from a pool and
+    releasing it on exit; the resource is discarded if the block raised
+    an exception.
+    """
+
+    def __init__(self, pool, timeout):
+        self.pool = pool
+        self.timeout = timeout
+        self.resource = None
+
+    async def __aenter__(self):
+        self.resource = await self.pool.acquire(self.timeout)
+        return self.resource
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.pool.release(self.resource, discard=exc_type is not None)
+        self.resource = None
+
+
+class AsyncPool:
+    """
+    A bounded pool of resources made by a factory.
+
+    At most `max_size` resources exist at once; requests arriving when
+    all are in use wait, first come first served, at most
+    `acquire_timeout` seconds.
+    Idle resources are reused most recently released first, so the
+    others may reach `max_idle` seconds of idleness and be closed,
+    while at least `min_size` resources are kept.
+    If a `check` function is given, idle resources are checked before
+    being handed out and those failing are closed and replaced.
+    """
+
+    def __init__(self,
+                 factory,
+                 min_size=0,
+                 max_size=10,
+                 max_idle=300.0,
+                 check=None,
+                 close=None,
+                 acquire_timeout=None,
+                 clock=time.monotonic):
+        """
+        Construct an AsyncPool.
+
+        Args:
+            factory (callable): Returns a new resource, or an awaitable
+                of one
+            min_size (int): The number of resources created by
+                :meth:`start` and kept when idle
+            max_size (int): The maximum number of resources
+            max_idle (float or None): Seconds after which an idle
+                resource is closed; None keeps resources forever
+            check (callable or None): Called with an idle resource
+                before it is handed out, returns (or returns an
+                awaitable of) whether it is usable
+            close (callable or None): Called to dispose of a resource,
+                may return an awaitable; defaults to calling the
+                resource's close method, if any
+            acquire_timeout (float or None): The default number of
+                seconds :meth:`acquire` waits for a resource
+            clock (callable): Returns the current time in seconds
+        """
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError("Invalid pool size (%r, %r)" % (min_size, max_size))
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.check = check
+        self.close_resource = close
+        self.acquire_timeout = acquire_timeout
+        self.clock = clock
+
+        self.closed = False
+        self.size = 0
+        self._idle = deque()
+        self._waiters = deque()
+        self._reaper = None
+
+        self.created = 0
+        self.destroyed = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.failed_checks = 0
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    @property
+    def in_use(self):
+        return self.size - len(self._idle)
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    def connection(self, timeout=None):
+        """
+        Returns an asynchronous context manager holding a resource of
+        the pool for the duration of an ``async with`` block.
+        """
+        return PooledResource(self, timeout)
+
+    async def acquire(self, timeout=None):
+        """
+        Takes a resource from the pool, creating one if none is idle
+        and the pool is not full, otherwise waiting for one.
+        The resource must be given back with :meth:`release`.
+
+        Args:
+            timeout (float or None): Seconds to wait at most; defaults
+                to the pool's acquire_timeout
+
+        Raises:
+            PoolTimeout: If no resource became available in time
+            PoolClosed: If the pool is closed
+        """
+        if timeout is None:
+            timeout = self.acquire_timeout
+        loop = asyncio.get_event_loop()
+        end = None if timeout is None else loop.time() + timeout
+
+        # a resource handed over by release, yet to be checked
+        resource = None
+        # whether this request has reached the head of the line
+        woken = False
+        while True:
+            if self.closed:
+                raise PoolClosed("Pool is closed")
+
+            if resource is None:
+                resource = self._take_idle(woken)
+
+            if resource is not None:
+                if await self._checked(resource):
+                    self.acquired += 1
+                    return resource
+                resource = None
+            elif self.size < self.max_size and (woken or not self._waiters):
+                return await self._create()
+            else:
+                resource = await self._wait_until(loop, end, timeout, front=woken)
+                woken = True
+
+    def _take_idle(self, woken):
+        """
+        Returns the most recently released idle resource, unless there
+        is none or, for a request not yet at the head of the line,
+        others are waiting.
+        """
+        if self._idle and (woken or not self._waiters):
+            resource, _ = self._idle.pop()
+            return resource
+        return None
+
+    async def _checked(self, resource):
+        """
+        Returns whether a resource passed the check, closing it if not.
+        Should the check be interrupted (e.g. the acquiring task be
+        cancelled) the resource is given back to the pool.
+        """
+        try:
+            healthy = await self._is_healthy(resource)
+        except BaseException:
+            self._hand_over(resource)
+            raise
+        if not healthy:
+            await self._destroy(resource)
+        return healthy
+
+    async def _wait_until(self, loop, end, timeout, front):
+        """
+        Waits in line, until the loop time end (if not None), for a
+        released resource (or for capacity, None).
+        """
+        remaining = None if end is None else end - loop.time()
+        try:
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError()
+            return await self._wait(loop, remaining, front)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolTimeout("No resource available within %ss" % timeout) from None
+
+    async def _wait(self, loop, timeout, front=False):
+        """
+        Waits in line for a released resource (or for capacity, None);
+        at the head of the line if front is true, e.g. when a request
+        already served must wait again.
+        """
+        waiter = loop.create_future()
+        if front:
+            self._waiters.appendleft(waiter)
+        else:
+            self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # handed a resource as we gave up - pass it on
+                self._hand_over(waiter.result())
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    async def _create(self):
+        self.size += 1
+        try:
+            resource = await _maybe_await(self.factory())
+        except BaseException:
+            self.size -= 1
+            self._hand_over(None)
+            raise
+        self.created += 1
+        self.acquired += 1
+        return resource
+
+    async def _is_healthy(self, resource):
+        if self.check is None:
+            return True
+        try:
+            healthy = await _maybe_await(self.check(resource))
+        except Exception:
+            log.exception("%d pool check failed", id(self))
+            healthy = False
+        if not healthy:
+            self.failed_checks += 1
+        return healthy
+
+    async def _destroy(self, resource):
+        self.size -= 1
+        self.destroyed += 1
+        try:
+            if self.close_resource is not None:
+                await _maybe_await(self.close_resource(resource))
+            elif hasattr(resource, 'close'):
+                await _maybe_await(resource.close())
+        except Exception:
+            log.exception("%d error closing pooled resource", id(self))
+        finally:
+            # the capacity is freed even if closing was cancelled
+            self._hand_over(None)
+
+    def _hand_over(self, resource):
+        """
+        Gives a released resource (or, if None, freed capacity) to the
+        first waiter, storing the resource as idle if none waits.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(resource)
+                return
+        if resource is not None:
+            self._idle.append((resource, self.clock()))
+
+    async def release(self, resource, discard=False):
+        """
+        Gives a resource back to the pool, which closes it if discard is
+        true (e.g. after an error left it in an unknown state) or the
+        pool has been closed.
+        """
+        if discard or self.closed:
+            await self._destroy(resource)
+            return
+        self._hand_over(resource)
+        await self.evict_idle()
+
+    async def evict_idle(self):
+        """
+        Closes the resources idle longer than max_idle, keeping at least
+        min_size resources.
+
+        Returns:
+            int: The number of resources closed
+        """
+        if self.max_idle is None:
+            return 0
+        limit = self.clock() - self.max_idle
+        evicted = 0
+        # the least recently released resources are at the left
+        while self._idle and self.size > self.min_size and self._idle[0][1] <= limit:
+            resource, _ = self._idle.popleft()
+            await self._destroy(resource)
+            evicted += 1
+        return evicted
+
+    async def start(self):
+        """
+        Creates min_size resources and, if max_idle is set, starts a
+        task periodically closing idle resources.
+        """
+        self.closed = False
+        while self.size < self.min_size:
+            resource = await self._create()
+            self.acquired -= 1
+            self._hand_over(resource)
+        if self.max_idle is not None and self._reaper is None:
+            self._reaper = asyncio.get_event_loop().create_task(self._reap())
+
+    async def _reap(self):
+        while not self.closed:
+            await asyncio.sleep(self.max_idle / 2)
+            await self.evict_idle()
+
+    async def close(self):
+        """
+        Closes the idle resources and refuses further acquisitions;
+        resources in use are closed as they are released.
+        """
+        self.closed = True
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(PoolClosed("Pool is closed"))
+        while self._idle:
+            resource, _ = self._idle.popleft()
+            await self._destroy(resource)
+
+    def attach(self, app, name):
+        """
+        Stores the pool in the application's configuration under name
+        (so handlers may use ``req.app[name]``), filling it on startup
+        and closing it on shutdown.
+
+        Returns:
+            This pool
+        """
+        app[name] = self
+        app.on_startup(lambda app: self.start())
+        app.on_shutdown(lambda app: self.close())
+        return self
+
+    def metrics(self):
+        """
+        Returns a dict of the pool's limits, sizes and counters.
+        """
+        return {
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'size': self.size,
+            'idle': self.idle,
+            'in_use': self.in_use,
+            'waiting': self.waiting,
+            'created': self.created,
+            'destroyed': self.destroyed,
+            'acquired': self.acquired,
+            'timeouts': self.timeouts,
+            'failed_checks': self.failed_checks,
+        }
@@ -0,0 +1,43 @@
+#
+# tests/middleware/conftest.py
+#
+
+import pytest
+import growler
+from unittest import mock
+from growler.http import HTTPMethod
+
+
+@pytest.fixture
+def app():
+    return mock.Mock(spec=growler.App,
+                     json_encoder=growler.App.json_encoder,
+                     json_offload_threshold=None)
+
+
+@pytest.fixture
+def make_pair(app):
+    """
+    Returns a function building a mock request and a real response,
+    written to a mock transport, for middleware to handle.
+    """
+    def make_pair(path='/a', method=HTTPMethod.GET, query=None, **headers):
+        protocol = mock.Mock(spec=growler.http.GrowlerHTTPProtocol,
+                             http_application=app,
+                             writing_paused=False)
+        req = mock.Mock(path=path, method=method, query=query or {}, headers=headers)
+        res = growler.http.HTTPResponse(protocol)
+        res.request = req
+        return req, res
+    return make_pair
+
+
+@pytest.fixture
+def sent_bytes():
+    """
+    Returns a function joining everything a response wrote to its
+    transport.
+    """
+    def sent_bytes(res):
+        return b''.join(c[0][0] for c in res.protocol.transport.write.call_args_list)
+    return sent_bytes
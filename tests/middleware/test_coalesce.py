@@ -0,0 +1,185 @@
+#
+# tests/middleware/test_coalesce.py
+#
+
+import asyncio
+import threading
+import pytest
+import growler
+from growler.http import HTTPMethod
+from growler.middleware.coalesce import Coalesce
+
+
+@pytest.fixture
+def coalesce():
+    return Coalesce(vary=('Accept', ))
+
+
+@pytest.mark.asyncio
+async def test_followers_share_leader_response(event_loop, coalesce, make_pair, sent_bytes):
+    leader = make_pair()
+    await coalesce(*leader)
+    assert len(coalesce) == 1
+
+    followers = [make_pair() for _ in range(3)]
+    waiting = [event_loop.create_task(coalesce(*pair)) for pair in followers]
+    await asyncio.sleep(0)
+    assert not any(task.done() for task in waiting)
+
+    leader[1].send_text('hello')
+    await asyncio.gather(*waiting)
+
+    expected = sent_bytes(leader[1])
+    assert expected.endswith(b'hello')
+    for _, res in followers:
+        assert res.has_ended
+        assert sent_bytes(res) == expected
+    assert (coalesce.leaders, coalesce.coalesced) == (1, 3)
+    assert len(coalesce) == 0
+
+
+@pytest.mark.asyncio
+async def test_key_distinguishes_requests(coalesce, make_pair):
+    await coalesce(*make_pair())
+    await coalesce(*make_pair(query={'q': ['1']}))
+    await coalesce(*make_pair(ACCEPT='text/html'))
+    await coalesce(*make_pair(HOST='b.example'))
+    await coalesce(*make_pair(method=HTTPMethod.POST))
+    assert coalesce.leaders == 4
+    assert coalesce.coalesced == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('header', ['AUTHORIZATION', 'COOKIE'])
+async def test_credentials_not_coalesced(coalesce, make_pair, header):
+    await coalesce(*make_pair(**{header: 'alice'}))
+    req, res = make_pair(**{header: 'bob'})
+    await coalesce(req, res)
+    assert not res.has_ended
+    assert (coalesce.leaders, coalesce.coalesced) == (0, 0)
+    assert len(coalesce) == 0
+
+
+@pytest.mark.asyncio
+async def test_credentials_in_vary_are_keyed(make_pair):
+    coalesce = Coalesce(vary=('Authorization', ))
+    await coalesce(*make_pair(AUTHORIZATION='alice'))
+    await coalesce(*make_pair(AUTHORIZATION='bob'))
+    assert coalesce.leaders == 2
+
+
+@pytest.mark.asyncio
+async def test_followers_share_blocking_leader_response(event_loop, coalesce, make_pair,
+                                                        sent_bytes):
+    app = growler.App()
+    app.use(coalesce)
+    started, release = threading.Event(), threading.Event()
+
+    @app.get('/a')
+    @growler.blocking
+    def handler(req, res):
+        started.set()
+        release.wait(1)
+        res.send_text('hello')
+
+    pairs = [make_pair() for _ in range(3)]
+    for req, _ in pairs:
+        req.deadline = None
+    leader = event_loop.create_task(app.handle_client_request(*pairs[0]))
+    await event_loop.run_in_executor(None, started.wait, 1)
+    followers = [event_loop.create_task(app.handle_client_request(*pair))
+                 for pair in pairs[1:]]
+    while coalesce.coalesced < 2:
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(leader, *followers)
+
+    expected = sent_bytes(pairs[0][1])
+    assert expected.endswith(b'\r\n\r\nhello')
+    for _, res in pairs[1:]:
+        assert sent_bytes(res) == expected
+    assert (coalesce.leaders, coalesce.coalesced) == (1, 2)
+    app.thread_pools.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_leader_without_response(event_loop, coalesce, make_pair):
+    leader = event_loop.create_task(coalesce(*make_pair()))
+    await leader
+    # the leader's task is done without a response being sent
+    await asyncio.sleep(0)
+    assert len(coalesce) == 0
+
+    req, res = make_pair()
+    await coalesce(req, res)
+    assert not res.has_ended
+    assert coalesce.leaders == 2
+
+
+@pytest.mark.asyncio
+async def test_follower_continues_if_leader_fails(event_loop, coalesce, make_pair):
+    release = asyncio.Event()
+
+    async def lead():
+        await coalesce(*make_pair())
+        await release.wait()
+
+    leader = event_loop.create_task(lead())
+    await asyncio.sleep(0)
+    req, res = make_pair()
+    follower = event_loop.create_task(coalesce(req, res))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await follower
+    assert not res.has_ended
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('header, value', [
+    ('Set-Cookie', 'session=abc'),
+    ('Cache-Control', 'private'),
+    ('Cache-Control', 'no-store'),
+    ('Vary', 'Cookie'),
+    ('Vary', '*'),
+])
+async def test_unshareable_response(event_loop, coalesce, make_pair, header, value):
+    leader = make_pair()
+    await coalesce(*leader)
+    req, res = make_pair()
+    follower = event_loop.create_task(coalesce(req, res))
+    await asyncio.sleep(0)
+
+    leader[1].headers[header] = value
+    leader[1].send_text('private data')
+    await follower
+    assert not res.has_ended
+
+
+@pytest.mark.asyncio
+async def test_vary_on_key_header_is_shared(event_loop, coalesce, make_pair):
+    leader = make_pair()
+    await coalesce(*leader)
+    req, res = make_pair()
+    follower = event_loop.create_task(coalesce(req, res))
+    await asyncio.sleep(0)
+
+    leader[1].headers['Vary'] = 'accept'
+    leader[1].send_text('hello')
+    await follower
+    assert res.has_ended
+
+
+@pytest.mark.asyncio
+async def test_large_response_not_shared(event_loop, make_pair):
+    coalesce = Coalesce(max_bytes=100)
+    leader = make_pair()
+    await coalesce(*leader)
+    req, res = make_pair()
+    follower = event_loop.create_task(coalesce(req, res))
+    await asyncio.sleep(0)
+
+    leader[1].send_text('x' * 1000)
+    assert leader[1].stream.overflowed
+    await follower
+    assert not res.has_ended
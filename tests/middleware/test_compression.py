@@ -0,0 +1,151 @@
+#
+# tests/middleware/test_compression.py
+#
+
+import gzip
+import zlib
+import pytest
+import growler
+from unittest import mock
+from growler.middleware.compression import Compression
+
+
+@pytest.fixture
+def compression():
+    return Compression(min_size=16, encodings=('gzip', 'deflate'))
+
+
+@pytest.fixture
+def accept_encoding():
+    return 'gzip, deflate'
+
+
+@pytest.fixture
+def req(accept_encoding):
+    return mock.MagicMock(headers={'ACCEPT-ENCODING': accept_encoding})
+
+
+@pytest.fixture
+def mock_protocol():
+    app = mock.Mock(spec=growler.App,
+                    json_encoder=growler.App.json_encoder,
+                    json_offload_threshold=None)
+    return mock.Mock(spec=growler.http.GrowlerHTTPProtocol,
+                     http_application=app,
+                     writing_paused=False)
+
+
+@pytest.fixture
+def res(mock_protocol):
+    return growler.http.HTTPResponse(mock_protocol)
+
+
+def written(mock_protocol):
+    calls = mock_protocol.transport.write.call_args_list
+    head = calls[0][0][0]
+    body = b''.join(c[0][0] for c in calls[1:])
+    return head, body
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    ('gzip', 'gzip'),
+    ('deflate, gzip', 'gzip'),
+    ('gzip;q=0.5, deflate', 'deflate'),
+    ('gzip;q=0, deflate;q=0', None),
+    ('*', 'gzip'),
+    ('br', None),
+    ('', None),
+    ('identity', None),
+])
+def test_negotiate(compression, accept_encoding, expected):
+    assert compression.negotiate(accept_encoding) == expected
+
+
+def test_available_encodings():
+    encodings = Compression.available_encodings()
+    assert 'gzip' in encodings and 'deflate' in encodings
+
+
+def test_compresses_json(compression, req, res, mock_protocol):
+    obj = {'values': list(range(100))}
+    compression(req, res)
+    res.send_json(obj)
+
+    head, body = written(mock_protocol)
+    assert b'\r\nContent-Encoding: gzip\r\n' in head
+    assert b'\r\nVary: Accept-Encoding\r\n' in head
+    assert ('\r\nContent-Length: %d\r\n' % len(body)).encode() in head
+    assert b'"values"' in gzip.decompress(body)
+
+
+@pytest.mark.parametrize('accept_encoding', ['deflate'])
+def test_compresses_html_deflate(compression, req, res, mock_protocol):
+    html = '<html>' + 'spam ' * 100 + '</html>'
+    compression(req, res)
+    res.send_html(html)
+
+    head, body = written(mock_protocol)
+    assert b'\r\nContent-Encoding: deflate\r\n' in head
+    assert zlib.decompress(body) == html.encode()
+
+
+def test_streams_file(compression, req, res, mock_protocol, tmpdir):
+    data = b'growler ' * 20000
+    f = tmpdir / 'big.txt'
+    f.write(data)
+
+    res.set_type('text/plain')
+    res.FILE_CHUNK_SIZE = 1024
+    compression(req, res)
+    res.send_file(str(f))
+
+    head, body = written(mock_protocol)
+    assert b'\r\nContent-Encoding: gzip\r\n' in head
+    assert b'Content-Length' not in head
+    assert gzip.decompress(body) == data
+    assert res.content_encoder is None
+
+
+def test_skips_small_response(compression, req, res, mock_protocol):
+    compression(req, res)
+    res.send_text('tiny')
+    head, body = written(mock_protocol)
+    assert b'Content-Encoding' not in head
+    assert body == b'tiny'
+
+
+def test_skips_disallowed_type(compression, req, res, mock_protocol):
+    compression(req, res)
+    res.set_type('image/png')
+    res.send_text('x' * 100)
+    head, body = written(mock_protocol)
+    assert b'Content-Encoding' not in head
+    assert b'Vary' not in head
+
+
+@pytest.mark.parametrize('accept_encoding', ['br'])
+def test_sets_vary_without_encoding(compression, req, res, mock_protocol):
+    compression(req, res)
+    res.send_text('x' * 100)
+    head, body = written(mock_protocol)
+    assert b'Content-Encoding' not in head
+    assert b'\r\nVary: Accept-Encoding\r\n' in head
+    assert body == b'x' * 100
+
+
+def test_skips_encoded_response(compression, req, res, mock_protocol):
+    compression(req, res)
+    res.headers['Content-Encoding'] = 'br'
+    res.send_text('x' * 100)
+    head, body = written(mock_protocol)
+    assert body == b'x' * 100
+
+
+@pytest.mark.parametrize('vary, expected', [
+    (None, 'Accept-Encoding'),
+    ('Cookie', 'Cookie, Accept-Encoding'),
+    ('accept-encoding', 'accept-encoding'),
+    ('*', '*'),
+])
+def test_add_vary(vary, expected):
+    assert Compression.add_vary(vary) == expected
@@ -0,0 +1,171 @@
+#
+# tests/middleware/test_etag.py
+#
+
+import zlib
+import pytest
+import growler
+from unittest import mock
+from growler.http import HTTPMethod
+from growler.middleware.etag import ETag
+from growler.middleware.compression import Compression
+from growler.http.etag import format_etag, etag_matches
+
+
+@pytest.fixture
+def etag():
+    return ETag()
+
+
+@pytest.fixture
+def if_none_match():
+    return None
+
+
+@pytest.fixture
+def req(if_none_match):
+    headers = {}
+    if if_none_match is not None:
+        headers['IF-NONE-MATCH'] = if_none_match
+    return mock.Mock(headers=headers, method=HTTPMethod.GET)
+
+
+@pytest.fixture
+def mock_protocol():
+    app = mock.Mock(spec=growler.App,
+                    json_encoder=growler.App.json_encoder,
+                    json_offload_threshold=None)
+    return mock.Mock(spec=growler.http.GrowlerHTTPProtocol,
+                     http_application=app,
+                     writing_paused=False)
+
+
+@pytest.fixture
+def res(mock_protocol, req):
+    res = growler.http.HTTPResponse(mock_protocol)
+    res.request = req
+    return res
+
+
+def written(mock_protocol):
+    calls = mock_protocol.transport.write.call_args_list
+    return calls[0][0][0], b''.join(c[0][0] for c in calls[1:])
+
+
+@pytest.mark.parametrize('value, weak, expected', [
+    ('abc', False, '"abc"'),
+    ('abc', True, 'W/"abc"'),
+    ('"abc"', True, '"abc"'),
+    ('W/"abc"', False, 'W/"abc"'),
+])
+def test_format_etag(value, weak, expected):
+    assert format_etag(value, weak) == expected
+
+
+@pytest.mark.parametrize('header, tag, expected', [
+    ('"a"', '"a"', True),
+    ('"b", "a"', '"a"', True),
+    ('W/"a"', '"a"', True),
+    ('"a"', 'W/"a"', True),
+    ('*', '"a"', True),
+    ('"b"', '"a"', False),
+    (None, '"a"', False),
+])
+def test_etag_matches(header, tag, expected):
+    assert etag_matches(header, tag) is expected
+
+
+def test_sets_etag(etag, req, res, mock_protocol):
+    etag(req, res)
+    res.send_text('hello world')
+
+    head, body = written(mock_protocol)
+    tag = etag.calculate_etag(b'hello world')
+    assert res.headers['ETag'] == tag
+    assert ('\r\nETag: %s\r\n' % tag).encode() in head
+    assert body == b'hello world'
+
+
+def test_weak_etag(req, res):
+    etag = ETag(weak=True)
+    etag(req, res)
+    res.send_text('hello world')
+    assert res.headers['ETag'].startswith('W/"')
+
+
+@pytest.mark.parametrize('if_none_match', [ETag().calculate_etag(b'hello world')])
+def test_not_modified(etag, req, res, mock_protocol):
+    etag(req, res)
+    res.send_text('hello world')
+
+    head, body = written(mock_protocol)
+    assert head.startswith(b'HTTP/1.1 304 Not Modified\r\n')
+    assert b'Content-Length' not in head
+    assert body == b''
+
+
+@pytest.mark.parametrize('if_none_match', ['"something-else"'])
+def test_modified(etag, req, res, mock_protocol):
+    etag(req, res)
+    res.send_text('hello world')
+    head, body = written(mock_protocol)
+    assert head.startswith(b'HTTP/1.1 200 OK\r\n')
+    assert body == b'hello world'
+
+
+def test_ignores_post(etag, req, res):
+    req.method = HTTPMethod.POST
+    etag(req, res)
+    res.send_text('hello world')
+    assert 'ETag' not in res.headers
+
+
+def test_ignores_streamed_body(etag, req, res, tmpdir):
+    f = tmpdir / 'file.txt'
+    f.write(b'data')
+    etag(req, res)
+    res.send_file(str(f))
+    assert 'ETag' not in res.headers
+
+
+@pytest.mark.parametrize('if_none_match', ['"v1"'])
+def test_response_not_modified_skips_rendering(req, res, mock_protocol):
+    assert res.not_modified('v1')
+    assert res.has_ended
+    assert res.status_code == 304
+    head, body = written(mock_protocol)
+    assert b'\r\nETag: "v1"\r\n' in head
+
+
+@pytest.mark.parametrize('if_none_match', ['"v1"'])
+def test_response_modified(req, res, mock_protocol):
+    assert not res.not_modified('v2')
+    assert not res.has_ended
+    assert res.headers['ETag'] == '"v2"'
+
+
+def test_etag_after_compression(req, res, mock_protocol):
+    req.headers['ACCEPT-ENCODING'] = 'gzip'
+    Compression(min_size=0)(req, res)
+    etag = ETag()
+    etag(req, res)
+    res.send_text('x' * 100)
+
+    head, body = written(mock_protocol)
+    assert res.headers['ETag'] == etag.calculate_etag(body)
+
+
+def test_ignores_compressed_streamed_body(req, res, mock_protocol, tmpdir):
+    f = tmpdir / 'file.txt'
+    f.write(b'x' * 100)
+    req.headers['ACCEPT-ENCODING'] = 'gzip'
+    req.headers['IF-NONE-MATCH'] = ETag().calculate_etag(b'')
+    res.set_type('text/plain')
+    Compression(min_size=0)(req, res)
+    ETag()(req, res)
+    res.send_file(str(f))
+
+    head, body = written(mock_protocol)
+    assert 'ETag' not in res.headers
+    assert res.status_code == 200
+    assert zlib.decompress(body, 16 + zlib.MAX_WBITS) == b'x' * 100
@@ -0,0 +1,268 @@
+#
+# tests/middleware/test_responsecache.py
+#
+
+import re
+import asyncio
+import pytest
+import growler
+from growler.http import HTTPMethod
+from growler.middleware.responsecache import ResponseCache
+
+
+class Clock:
+    now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(clock):
+    return ResponseCache(ttl=10, stale_while_revalidate=5, clock=clock)
+
+
+def test_miss_then_hit(cache, make_pair, sent_bytes):
+    req, res = make_pair()
+    cache(req, res)
+    assert not res.has_ended
+    res.send_text('hello')
+    first = sent_bytes(res)
+    assert len(cache) == 1
+    assert cache.misses == 1
+
+    req, res = make_pair()
+    cache(req, res)
+    assert res.has_ended
+    assert cache.hits == 1
+    replay = sent_bytes(res)
+    assert replay.endswith(b'\r\n\r\nhello')
+    assert b'\r\nAge: 0\r\n' in replay
+    assert replay.replace(b'Age: 0\r\n', b'') == first
+    res.protocol.transport.write_eof.assert_called_with()
+
+
+def test_head_uses_get_entry(cache, make_pair, sent_bytes):
+    req, res = make_pair()
+    cache(req, res)
+    res.send_text('hello')
+
+    req, res = make_pair(method=HTTPMethod.HEAD)
+    cache(req, res)
+    assert res.has_ended
+    assert not sent_bytes(res).endswith(b'hello')
+
+
+def test_key_includes_query_and_vary(cache, make_pair):
+    req, res = make_pair(query={'x': ['1']}, **{'ACCEPT-ENCODING': 'gzip'})
+    cache(req, res)
+    res.send_text('one')
+
+    for kwargs in ({'query': {'x': ['2']}, 'ACCEPT-ENCODING': 'gzip'},
+                   {'query': {'x': ['1']}}):
+        req, res = make_pair(**kwargs)
+        cache(req, res)
+        assert not res.has_ended
+
+
+def test_key_includes_host(cache, make_pair):
+    req, res = make_pair(HOST='a.example')
+    cache(req, res)
+    res.send_text('a')
+
+    req, res = make_pair(HOST='b.example')
+    cache(req, res)
+    assert not res.has_ended
+
+
+@pytest.mark.parametrize('header', ['AUTHORIZATION', 'COOKIE'])
+def test_bypasses_credentials(cache, make_pair, header):
+    req, res = make_pair()
+    cache(req, res)
+    res.send_text('public')
+
+    req, res = make_pair(**{header: 'secret'})
+    cache(req, res)
+    assert not res.has_ended
+    res.send_text('private')
+    assert len(cache) == 1
+    assert cache.hits == 0
+
+
+def test_credentials_in_vary_are_keyed(clock, make_pair):
+    cache = ResponseCache(ttl=10, vary=('Cookie', ), clock=clock)
+    req, res = make_pair(COOKIE='a=1')
+    cache(req, res)
+    res.send_text('one')
+
+    req, res = make_pair(COOKIE='a=1')
+    cache(req, res)
+    assert res.has_ended
+
+    req, res = make_pair(COOKIE='a=2')
+    cache(req, res)
+    assert not res.has_ended
+
+
+@pytest.mark.asyncio
+async def test_stores_blocking_response(cache, make_pair, sent_bytes):
+    app = growler.App()
+    app.use(cache)
+
+    @app.get('/a')
+    @growler.blocking
+    def handler(req, res):
+        res.send_text('hello')
+
+    req, res = make_pair()
+    req.deadline = None
+    await app.handle_client_request(req, res)
+    assert len(cache) == 1
+    entry = next(iter(cache._entries.values()))
+    assert entry.body == b'hello'
+    assert sent_bytes(res).endswith(entry.body)
+    app.thread_pools.shutdown()
+
+
+def test_expired_entry_is_refetched(cache, make_pair, clock):
+    req, res = make_pair()
+    cache(req, res)
+    res.send_text('old')
+
+    clock.now += 20
+    req, res = make_pair()
+    cache(req, res)
+    assert not res.has_ended
+    assert len(cache) == 0
+
+
+def test_stale_while_revalidate(cache, make_pair, sent_bytes, clock):
+    req, res = make_pair()
+    cache(req, res)
+    res.send_text('old')
+
+    clock.now += 12
+    req, res = make_pair()
+    cache(req, res)
+    # the stale copy is sent and the client connection ended
+    assert sent_bytes(res).endswith(b'old')
+    res.protocol.transport.write_eof.assert_called_once_with()
+    assert not res.has_ended
+    assert cache.stale_hits == 1
+
+    # concurrent stale request does not revalidate again
+    req2, res2 = make_pair()
+    cache(req2, res2)
+    assert res2.has_ended
+
+    # the chain continues, refreshing the entry without writing to client
+    res.send_text('new')
+    assert sent_bytes(res).endswith(b'old')
+
+    req, res = make_pair()
+    cache(req, res)
+    assert res.has_ended
+    assert sent_bytes(res).endswith(b'new')
+
+
+@pytest.mark.asyncio
+async def test_revalidation_survives_disconnect(cache, make_pair, clock):
+    req, res = make_pair()
+    cache(req, res)
+    res.send_text('old')
+    clock.now += 12
+
+    refreshing = asyncio.Event()
+
+    async def request():
+        req, res = make_pair()
+        cache(req, res)
+        assert req.cancel_on_disconnect is False
+        refreshing.set()
+        await asyncio.sleep(10)
+
+    task = asyncio.ensure_future(request())
+    await refreshing.wait()
+    entry = next(iter(cache._entries.values()))
+    assert entry.revalidating
+
+    # the refresh ended without sending a response
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not entry.revalidating
+
+
+def test_lru_eviction(clock, make_pair):
+    cache = ResponseCache(ttl=10, max_bytes=1000, max_entry_bytes=1000, clock=clock)
+    for path in ('/a', '/b', '/c'):
+        req, res = make_pair(path=path)
+        cache(req, res)
+        res.send_text('x' * 200)
+    assert cache.size <= 1000
+    assert len(cache) < 3
+
+    req, res = make_pair(path='/a')
+    cache(req, res)
+    assert not res.has_ended
+
+
+def test_recording_stops_past_max_entry_bytes(clock, make_pair, sent_bytes, tmpdir):
+    f = tmpdir / 'big.txt'
+    f.write(b'x' * 5000)
+    cache = ResponseCache(ttl=10, max_entry_bytes=1000, clock=clock)
+    req, res = make_pair()
+    cache(req, res)
+    res.FILE_CHUNK_SIZE = 500
+    recorder = res.stream
+    res.send_file(str(f))
+    assert recorder.overflowed
+    assert recorder.chunks == []
+    assert sent_bytes(res).endswith(b'x' * 5000)
+    assert len(cache) == 0
+
+
+def test_route_ttls(clock, make_pair):
+    cache = ResponseCache(ttl=10, route_ttls={'/nocache': 0, re.compile('/long'): 100},
+                          clock=clock)
+    assert cache.ttl_for('/nocache') == 0
+    assert cache.ttl_for('/long/x') == 100
+    assert cache.ttl_for('/other') == 10
+
+    req, res = make_pair(path='/nocache')
+    cache(req, res)
+    res.send_text('x')
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize('header, value', [
+    ('Cache-Control', 'no-store'),
+    ('Cache-Control', 'private, max-age=10'),
+    ('Set-Cookie', 'a=b'),
+])
+def test_uncacheable_response(cache, make_pair, header, value):
+    req, res = make_pair()
+    cache(req, res)
+    res.headers[header] = value
+    res.send_text('x')
+    assert len(cache) == 0
+
+
+def test_uncacheable_status(cache, make_pair):
+    req, res = make_pair()
+    cache(req, res)
+    res.send_text('x', status=404)
+    assert len(cache) == 0
+
+
+def test_ignores_post(cache, make_pair):
+    req, res = make_pair(method=HTTPMethod.POST)
+    cache(req, res)
+    res.send_text('x')
+    assert len(cache) == 0
+    assert cache.misses == 0
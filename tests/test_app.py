@@ -234,71 +234,81 @@ def test_use_growler_router_metaclass(app, mock_route_generator):
     assert mrouter.get_b == router.mw_list[2].func
 
 
-def test_create_server(app, mock_event_loop):
+@pytest.fixture
+def server_loop(mock_event_loop):
+    """
+    The mock event loop, running the coroutines given to its
+    run_until_complete method on a real event loop.
+    """
+    loop = asyncio.new_event_loop()
+    server = mock.Mock(spec=asyncio.AbstractServer)
+    mock_event_loop.create_server = mock.AsyncMock(return_value=server)
+    mock_event_loop.run_until_complete.side_effect = loop.run_until_complete
+    yield mock_event_loop
+    loop.close()
+
+
+def test_create_server(app, server_loop):
     """ Test if the application creates a server coroutine """
     protocol_factory = mock.Mock()
-    server_coro = mock.Mock()
-    mock_event_loop.create_server.return_value = server_coro
-    app.create_server(mock_event_loop, False, protocol_factory)
-    protocol_factory.assert_called_with(app, loop=mock_event_loop)
-    assert mock_event_loop.create_server.called
-    mock_event_loop.run_until_complete.assert_called_with(server_coro)
+    server = app.create_server(server_loop, False, protocol_factory)
+    protocol_factory.assert_called_with(app, loop=server_loop)
+    assert server is server_loop.create_server.return_value
+    assert server_loop.run_until_complete.called
+    assert app.started
 
 
-def test_create_server_default_params(app, mock_event_loop):
+def test_create_server_default_params(app, server_loop):
     """ Test if the application creates a server coroutine """
-    import asyncio
-    asyncio.set_event_loop(mock_event_loop)
+    asyncio.set_event_loop(server_loop)
     server = app.create_server(port=1)
 
     create_server_call = mock.call(mock.ANY, port=1)
-    assert mock_event_loop.create_server.mock_calls[0] == create_server_call
-
-    run_until_complete_call = mock.call(mock_event_loop.create_server.return_value)
-    assert mock_event_loop.run_until_complete.mock_calls[0] == run_until_complete_call
+    assert server_loop.create_server.mock_calls[0] == create_server_call
+    assert server is server_loop.create_server.return_value
 
 
-def test_create_server_as_coroutine(app, mock_event_loop):
+@pytest.mark.asyncio
+async def test_create_server_as_coroutine(app, mock_event_loop):
     """ Test if the application creates a server coroutine """
     protocol_factory = mock.Mock()
-    app.create_server(mock_event_loop, True, protocol_factory)
-    assert mock_event_loop.create_server.called
+    mock_event_loop.create_server = mock.AsyncMock()
+    server = await app.create_server(mock_event_loop, True, protocol_factory)
+    assert server is mock_event_loop.create_server.return_value
     protocol_factory.assert_called_with(app, loop=mock_event_loop)
     assert not mock_event_loop.run_until_complete.called
 
 
-def test_create_server_and_run_forever(app, mock_event_loop):
+def test_create_server_and_run_forever(app, server_loop):
     m = mock.Mock()
-    app.create_server_and_run_forever(loop=mock_event_loop, protocol_factory=m)
+    app.create_server_and_run_forever(loop=server_loop, protocol_factory=m)
 
-    m.assert_called_with(app, loop=mock_event_loop)
-    assert mock_event_loop.create_server.called
-    assert mock_event_loop.run_forever.called
+    m.assert_called_with(app, loop=server_loop)
+    assert server_loop.create_server.called
+    assert server_loop.run_forever.called
 
 
-def test_create_server_and_run_forever_args(app, mock_event_loop):
-    app.create_server_and_run_forever(loop=mock_event_loop, arg1='arg1', arg2='arg2')
-    assert mock_event_loop.create_server.called
-    assert mock_event_loop.run_forever.called
+def test_create_server_and_run_forever_args(app, server_loop):
+    app.create_server_and_run_forever(loop=server_loop, arg1='arg1', arg2='arg2')
+    assert server_loop.create_server.called
+    assert server_loop.run_forever.called
 
 
-def test_create_server_and_run_forever_default_params(app, mock_event_loop):
+def test_create_server_and_run_forever_default_params(app, server_loop):
     """ Test if the application creates a server coroutine """
-    import asyncio
 
     # solves a coverage problem
-    mock_event_loop.run_forever.side_effect = KeyboardInterrupt
+    server_loop.run_forever.side_effect = KeyboardInterrupt
 
-    asyncio.set_event_loop(mock_event_loop)
-    server = app.create_server_and_run_forever(host='◉', port=1)
+    asyncio.set_event_loop(server_loop)
+    app.create_server_and_run_forever(host='◉', port=1)
 
     create_server_call = mock.call(mock.ANY, host='◉', port=1)
-    assert mock_event_loop.create_server.mock_calls[0] == create_server_call
-
-    run_until_complete_call = mock.call(mock_event_loop.create_server.return_value)
-    assert mock_event_loop.run_until_complete.mock_calls[0] == run_until_complete_call
+    assert server_loop.create_server.mock_calls[0] == create_server_call
 
-    mock_event_loop.run_forever.assert_called_with()
+    server_loop.run_forever.assert_called_with()
+    server = server_loop.create_server.return_value
+    server.close.assert_called_with()
 
 #
 # @pytest.mark.parametrize("method", [
@@ -409,6 +419,24 @@ async def test_handle_client_request_coro(app, req, res):
     assert m.called
 
 
+@pytest.mark.asyncio
+async def test_handle_client_request_awaits_pending(app, req, res, event_loop):
+    res.has_ended = False
+    after = mock.Mock()
+
+    async def deferred_send():
+        res.has_ended = True
+
+    def mw(req, res):
+        res.pending = event_loop.create_task(deferred_send())
+
+    app.use(mw)
+    app.use(lambda req, res: after())
+    await app.handle_client_request(req, res)
+    assert res.has_ended
+    assert not after.called
+
+
 @pytest.mark.asyncio
 async def test_handle_client_request_exception(app, req, res, mock_route_generator):
     generator = mock.MagicMock()
@@ -668,3 +696,407 @@ async def test_response_not_sent(app, req, res):
     foo.assert_not_called
     bar.assert_not_called
     app.handle_response_not_sent.assert_called_with(req, res)
+
+
+def test_pipeline_shared_by_route_shape(app):
+    def mw(req, res):
+        pass
+
+    app.use(mw, '/a')
+    first = app.pipeline(0x01, '/a/1')
+    assert first.middleware == (mw, )
+    assert app.pipeline(0x01, '/a/2') is first
+    assert app.pipeline(0x01, '/b').middleware == ()
+
+
+def test_pipeline_recompiled_after_add(app):
+    def m1(req, res):
+        pass
+
+    def m2(req, res):
+        pass
+
+    app.use(m1)
+    assert app.pipeline(0x01, '/').middleware == (m1, )
+    app.use(m2)
+    assert app.pipeline(0x01, '/').middleware == (m1, m2)
+
+
+def test_pipeline_none_for_custom_chain(app):
+    app.middleware = mock.Mock()
+    assert app.pipeline(0x01, '/') is None
+
+
+@pytest.mark.asyncio
+async def test_nested_router_error_reaches_app_handler(app, req, res):
+    req.path = '/a/b/c'
+    res.has_ended = False
+    handler = mock.Mock()
+    ex = Exception("boom")
+
+    def app_error_handler(req, res, err):
+        handler(err)
+        res.has_ended = True
+
+    def raises(req, res):
+        raise ex
+
+    inner = growler.Router()
+    inner.get('/c', raises)
+    middle = growler.Router()
+    middle.add_router('/b', inner)
+
+    app.use(app_error_handler)
+    app.add_router('/a', middle)
+
+    assert app.pipeline(0x01, '/a/b/c').middleware == (raises, )
+    await app.handle_client_request(req, res)
+    handler.assert_called_once_with(ex)
+
+
+@pytest.mark.asyncio
+async def test_handle_client_request_sets_params(app, req, res):
+    req.path = '/users/12/files/a/b.txt'
+    params = []
+
+    def show(req, res):
+        params.append(req.params)
+
+    users = growler.Router()
+    users.get('/:id<int>/files/*path', show)
+    app.add_router('/users', users)
+
+    await app.handle_client_request(req, res)
+    assert params == [{'id': 12, 'path': 'a/b.txt'}]
+
+
+@pytest.mark.asyncio
+async def test_first_request_freezes_app(app, req, res):
+    assert not app.frozen
+    await app.handle_client_request(req, res)
+    assert app.frozen
+
+    # non-strict freeze - middleware may still be added
+    m = mock.Mock()
+    app.use(lambda req, res: m())
+    await app.handle_client_request(req, res)
+    assert m.called
+
+
+def test_strict_freeze_rejects_middleware(app):
+    router = growler.Router()
+    app.add_router('/a', router)
+    app.freeze(strict=True)
+    with pytest.raises(RuntimeError):
+        app.use(lambda req, res: None)
+    with pytest.raises(RuntimeError):
+        router.get('/b', lambda req, res: None)
+
+
+def test_pipeline_records_async_middleware(app):
+    def sync_mw(req, res):
+        pass
+
+    async def async_mw(req, res):
+        pass
+
+    async def async_err(req, res, err):
+        pass
+
+    class AsyncCallable:
+        async def __call__(self, req, res):
+            pass
+
+    obj = AsyncCallable()
+    app.use(async_err)
+    app.use(sync_mw)
+    app.use(async_mw)
+    app.use(obj)
+    pipeline = app.pipeline(0x01, '/')
+    assert pipeline.middleware == (sync_mw, async_mw, obj)
+    assert pipeline.is_async == (False, True, True)
+    assert pipeline.async_error_handlers == {id(async_err)}
+
+
+@pytest.mark.asyncio
+async def test_async_error_handler_awaited(app, req, res):
+    res.has_ended = False
+    handled = mock.Mock()
+
+    async def async_err(req, res, err):
+        handled(err)
+        res.has_ended = True
+
+    ex = Exception("boom")
+
+    def raises(req, res):
+        raise ex
+
+    app.use(async_err)
+    app.use(raises)
+    await app.handle_client_request(req, res)
+    handled.assert_called_once_with(ex)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('host, expected', [
+    ('api.example.com', 'api'),
+    ('shop.tenant.example.com:8000', 'tenant'),
+    ('other.org', 'main'),
+])
+async def test_vhost_dispatch(app, req, res, host, expected):
+    req.headers = {'HOST': host}
+    res.has_ended = False
+    served = []
+
+    def serve(name):
+        def handler(req, res):
+            served.append(name)
+            res.has_ended = True
+        return handler
+
+    app.use(serve('main'))
+    app.vhost('api.example.com').get('/', serve('api'))
+    app.vhost('*.example.com', growler.Router()).get('/', serve('tenant'))
+
+    await app.handle_client_request(req, res)
+    assert served == [expected]
+
+
+def test_vhost_routes_compiled_separately(app):
+    def main(req, res):
+        pass
+
+    def api(req, res):
+        pass
+
+    app.use(main)
+    app.vhost('api.example.com').get('/', api)
+    assert app.pipeline(0x01, '/').middleware == (main, )
+    assert app.pipeline(0x01, '/', 'api.example.com').middleware == (api, )
+
+
+@pytest.fixture
+def lazy_admin(monkeypatch):
+    module = types.ModuleType('growler_test_admin')
+    module.router = growler.Router()
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    return module
+
+
+@pytest.mark.asyncio
+async def test_lazy_router_loaded_on_request(app, req, res, lazy_admin):
+    req.path = '/admin/users'
+    res.has_ended = False
+    handler = mock.Mock()
+
+    def users(req, res):
+        handler()
+        res.has_ended = True
+
+    lazy_admin.router.get('/users', users)
+    lazy = app.add_lazy_router('/admin', 'growler_test_admin:router')
+    assert lazy.loaded is None
+
+    await app.handle_client_request(req, res)
+    assert lazy.loaded is lazy_admin.router
+    assert handler.called
+
+
+@pytest.mark.asyncio
+async def test_lazy_router_loaded_after_strict_freeze(app, req, res, lazy_admin):
+    req.path = '/admin/users'
+    res.has_ended = False
+    handler = mock.Mock()
+
+    def users(req, res):
+        handler()
+        res.has_ended = True
+
+    lazy_admin.router.get('/users', users)
+    lazy = app.add_lazy_router('/admin', 'growler_test_admin:router')
+    app.freeze(strict=True)
+
+    await app.handle_client_request(req, res)
+    assert handler.called
+    assert lazy.loaded.frozen
+    with pytest.raises(RuntimeError):
+        lazy.add(growler.http.HTTPMethod.GET, '/other', users)
+
+
+@pytest.mark.asyncio
+async def test_lazy_router_import_error_sends_500(app, req, res):
+    req.path = '/admin'
+    app.add_lazy_router('/admin', 'growler_test_missing_module:router')
+    await app.handle_client_request(req, res)
+    assert res.send_html.call_args[0][1] == 500
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('warm_up', [False, True])
+async def test_startup_warm_up_is_opt_in(lazy_admin, warm_up):
+    app = growler.App(warm_up_lazy_routers=warm_up)
+    lazy = app.add_lazy_router('/admin', 'growler_test_admin:router')
+    await app.startup()
+    assert (lazy.loaded is lazy_admin.router) is warm_up
+
+
+@pytest.mark.asyncio
+async def test_warm_up_loads_lazy_routers(app, lazy_admin, event_loop):
+    lazy = app.add_lazy_router('/admin', 'growler_test_admin:router')
+    await app.warm_up(event_loop)
+    assert lazy.loaded is lazy_admin.router
+
+
+def test_dispatch_sync_route_inline(app, req, res):
+    res.has_ended = False
+    res.pending = None
+    called = []
+
+    def first(req, res):
+        called.append('first')
+
+    def second(req, res):
+        called.append('second')
+        res.has_ended = True
+
+    app.use(first)
+    app.use(second)
+    assert app.pipeline(0x01, '/').is_sync
+    assert app.dispatch(req, res) is None
+    assert called == ['first', 'second']
+
+
+@pytest.mark.asyncio
+async def test_dispatch_async_route_returns_coroutine(app, req, res):
+    res.has_ended = False
+    res.pending = None
+    called = []
+
+    def first(req, res):
+        called.append('first')
+
+    async def second(req, res):
+        called.append('second')
+        res.has_ended = True
+
+    app.use(first)
+    app.use(second)
+    coro = app.dispatch(req, res)
+    assert called == []
+    await coro
+    assert called == ['first', 'second']
+
+
+@pytest.mark.asyncio
+async def test_dispatch_resumes_after_awaitable(app, req, res, event_loop):
+    res.has_ended = False
+    res.pending = None
+    called = []
+
+    def first(req, res):
+        called.append('first')
+        return asyncio.sleep(0)
+
+    def second(req, res):
+        called.append('second')
+        res.has_ended = True
+
+    app.use(first)
+    app.use(second)
+    coro = app.dispatch(req, res)
+    assert called == ['first']
+    await coro
+    assert called == ['first', 'second']
+
+
+@pytest.mark.asyncio
+async def test_dispatch_error_returns_handler(app, req, res):
+    error = Exception("boom")
+
+    def raises(req, res):
+        raise error
+
+    handler = mock.Mock()
+
+    def on_error(req, res, err):
+        handler(err)
+        res.has_ended = True
+
+    res.has_ended = False
+    app.use(on_error)
+    app.use(raises)
+    await app.dispatch(req, res)
+    handler.assert_called_once_with(error)
+
+
+@pytest.mark.asyncio
+async def test_startup_and_shutdown_hooks(app):
+    calls = []
+
+    @app.on_startup
+    async def open_pool(app):
+        calls.append('open')
+
+    app.on_startup(lambda app: calls.append('templates'))
+
+    @app.on_shutdown
+    def close_templates(app):
+        calls.append('close templates')
+
+    @app.on_shutdown
+    async def close_pool(app):
+        raise RuntimeError("already closed")
+
+    await app.startup()
+    await app.startup()
+    assert app.started and app.frozen
+    assert calls == ['open', 'templates']
+
+    await app.shutdown()
+    assert calls == ['open', 'templates', 'close templates']
+    assert not app.started
+
+
+@pytest.mark.asyncio
+async def test_shutdown_waits_for_background(app):
+    done = []
+
+    async def job():
+        await asyncio.sleep(0.01)
+        done.append(True)
+
+    app.background(job)
+    await app.shutdown()
+    assert done == [True]
+
+
+@pytest.mark.asyncio
+async def test_create_server_runs_startup(app, event_loop):
+    started = []
+    app.on_startup(lambda app: started.append(True))
+    protocol_factory = mock.Mock()
+    server = await app.create_server(event_loop, True, protocol_factory,
+                                     host='127.0.0.1', port=0)
+    assert started == [True]
+    server.close()
+    await server.wait_closed()
+
+
+def test_head_prefers_explicit_head_route(app):
+    def get_a(req, res):
+        pass
+
+    def head_a(req, res):
+        pass
+
+    def get_b(req, res):
+        pass
+
+    app.get('/a', get_a)
+    app.head('/a', head_a)
+    app.get('/b', get_b)
+
+    assert app.pipeline(growler.http.HTTPMethod.HEAD, '/a').middleware == (head_a, )
+    assert app.pipeline(growler.http.HTTPMethod.HEAD, '/b').middleware == (get_b, )
+    assert app.pipeline(growler.http.HTTPMethod.GET, '/a').middleware == (get_a, )
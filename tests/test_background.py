@@ -0,0 +1,131 @@
+#
+# tests/test_background.py
+#
+
+import asyncio
+import threading
+import pytest
+from unittest import mock
+
+import growler
+from growler.core.background import BackgroundTasks
+from growler.core.offload import blocking
+
+
+@pytest.mark.asyncio
+async def test_background_runs_jobs():
+    tasks = BackgroundTasks()
+    done = []
+
+    async def job(value):
+        done.append(value)
+
+    assert tasks.submit(job(1))
+    assert tasks.submit(job, 2)
+    assert tasks.submit(done.append, 3)
+    assert await tasks.join()
+    assert sorted(done) == [1, 2, 3]
+    assert tasks.metrics()['completed'] == 3
+
+
+def test_background_awaitable_with_args():
+    tasks = BackgroundTasks()
+    coro = asyncio.sleep(0)
+    with pytest.raises(TypeError):
+        tasks.submit(coro, 1)
+    coro.close()
+
+
+@pytest.mark.asyncio
+async def test_background_limits():
+    tasks = BackgroundTasks(max_concurrency=1, max_queue=1)
+    release = asyncio.Event()
+
+    assert tasks.submit(release.wait)
+    assert tasks.submit(release.wait)
+    assert not tasks.submit(release.wait)
+    assert tasks.metrics()['active'] == 1
+    assert tasks.queued == 1
+    assert tasks.dropped == 1
+
+    assert not await tasks.join(timeout=0.01)
+    release.set()
+    assert await tasks.join()
+    assert len(tasks) == 0
+
+
+@pytest.mark.asyncio
+async def test_background_counts_failures():
+    tasks = BackgroundTasks()
+
+    def fails():
+        raise ValueError()
+
+    tasks.submit(fails)
+    await tasks.join()
+    assert tasks.failed == 1
+    assert tasks.completed == 0
+
+
+@pytest.mark.asyncio
+async def test_background_cancel():
+    tasks = BackgroundTasks(max_concurrency=1)
+    tasks.submit(asyncio.sleep, 10)
+    tasks.submit(asyncio.sleep(10))
+    tasks.cancel()
+    assert await tasks.join()
+    assert tasks.dropped == 1
+
+
+@pytest.fixture
+def res():
+    app = growler.App(background_concurrency=2)
+    protocol = mock.Mock(spec=growler.http.GrowlerHTTPProtocol,
+                         http_application=app)
+    res = growler.http.HTTPResponse(protocol)
+    res.request = mock.Mock(method=growler.http.HTTPMethod.GET, deadline=None)
+    return res
+
+
+@pytest.mark.asyncio
+async def test_response_after_waits_for_send(res):
+    done = []
+    res.after(done.append, 'after')
+    await asyncio.sleep(0)
+    assert done == []
+    assert len(res.app.background_tasks) == 0
+
+    res.send_text('hello')
+    assert res.protocol.transport.write_eof.called
+    await res.app.background_tasks.join()
+    assert done == ['after']
+
+    res.after(done.append, 'late')
+    await res.app.background_tasks.join()
+    assert done == ['after', 'late']
+
+
+@pytest.mark.asyncio
+async def test_response_after_in_blocking_handler(res):
+    app = res.app
+    done = []
+
+    @app.get('/')
+    @blocking
+    def handler(req, res):
+        res.after(done.append, threading.current_thread())
+        res.send_text('hello')
+
+    await app.startup()
+    req = res.request
+    req.path = '/'
+    req.headers = {}
+    await app.handle_client_request(req, res)
+    # the job is started from the event loop's thread
+    await asyncio.sleep(0)
+    assert await app.background_tasks.join()
+
+    assert len(done) == 1
+    assert done[0] is not threading.current_thread()
+    assert res.status_code == 200
+    assert app.background_tasks.failed == 0
@@ -0,0 +1,146 @@
+#
+# tests/test_bulkhead.py
+#
+
+import asyncio
+import threading
+import pytest
+from unittest import mock
+
+import growler
+from growler.core.bulkhead import (
+    Bulkhead,
+    bulkhead,
+    get_bulkhead,
+)
+from growler.core.offload import blocking
+
+
+def test_bulkhead_decorator():
+    @bulkhead(max_concurrency=2, max_queue=1, status=429)
+    def a(req, res):
+        pass
+
+    limit = get_bulkhead(a)
+    assert (limit.max_concurrency, limit.max_queue, limit.status) == (2, 1, 429)
+    assert get_bulkhead(lambda req, res: None) is None
+    assert get_bulkhead(mock.Mock()) is None
+
+
+@pytest.mark.parametrize("args", [(0, ), (1, -1)])
+def test_bulkhead_invalid_limits(args):
+    with pytest.raises(ValueError):
+        Bulkhead(*args)
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_queue_and_reject(event_loop):
+    limit = Bulkhead(1, max_queue=1)
+    assert await limit.acquire()
+    waiting = event_loop.create_task(limit.acquire())
+    await asyncio.sleep(0)
+    assert limit.queued == 1
+    assert not await limit.acquire()
+    assert limit.rejected == 1
+
+    limit.release()
+    assert await waiting
+    assert limit.active == 1
+    limit.release()
+    assert limit.metrics() == {
+        'max_concurrency': 1,
+        'max_queue': 1,
+        'active': 0,
+        'queued': 0,
+        'rejected': 1,
+        'completed': 2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_cancelled_waiter(event_loop):
+    limit = Bulkhead(1, max_queue=1)
+    assert await limit.acquire()
+    waiting = event_loop.create_task(limit.acquire())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert limit.queued == 0
+    limit.release()
+    assert limit.active == 0
+
+
+@pytest.fixture
+def req():
+    return mock.Mock(spec=growler.http.HTTPRequest, path='/report', method=0x01, headers={})
+
+
+def make_res():
+    return mock.Mock(spec=growler.http.HTTPResponse,
+                     has_ended=False,
+                     pending=None,
+                     headers={})
+
+
+@pytest.mark.asyncio
+async def test_route_bulkhead_refuses_overflow(event_loop, req):
+    app = growler.App()
+    release = asyncio.Event()
+
+    @app.get('/report')
+    @bulkhead(max_concurrency=1, status=429)
+    async def report(req, res):
+        await release.wait()
+        res.has_ended = True
+
+    first = make_res()
+    task = event_loop.create_task(app.handle_client_request(req, first))
+    await asyncio.sleep(0)
+
+    second = make_res()
+    await app.handle_client_request(req, second)
+    assert second.send_html.call_args[0][1] == 429
+    assert second.headers['Retry-After'] == '1'
+
+    release.set()
+    await task
+    assert not first.send_html.called
+    assert get_bulkhead(report).active == 0
+
+
+@pytest.mark.asyncio
+async def test_timed_out_blocking_route_keeps_slot(req):
+    app = growler.App(request_timeout=0.05)
+    req.deadline = None
+    finished = threading.Event()
+
+    @app.get('/report')
+    @bulkhead(max_concurrency=1)
+    @blocking
+    def report(req, res):
+        finished.wait(1)
+
+    protocol = mock.Mock(spec=growler.http.GrowlerHTTPProtocol, http_application=app)
+    res = growler.http.HTTPResponse(protocol)
+    res.request = req
+    await app.handle_client_request(req, res)
+    assert res.status_code == 504
+    # the worker thread still runs the route
+    assert get_bulkhead(report).active == 1
+
+    finished.set()
+    await asyncio.sleep(0.05)
+    assert get_bulkhead(report).active == 0
+    app.thread_pools.shutdown()
+
+
+def test_router_bulkhead_applies_to_routes():
+    app = growler.App()
+    router = growler.Router()
+    router.get('/a', lambda req, res: None)
+    app.add_router('/slow', bulkhead(router, max_concurrency=2))
+    app.get('/fast', lambda req, res: None)
+
+    assert app.pipeline(0x01, '/slow/a').bulkheads == (get_bulkhead(router), )
+    assert app.pipeline(0x01, '/fast').bulkheads == ()
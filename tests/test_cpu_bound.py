@@ -0,0 +1,114 @@
+#
+# tests/test_cpu_bound.py
+#
+
+import os
+import pickle
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from growler.core.cpu_bound import (
+    cpu_bound,
+    send_result,
+    CpuBoundHandler,
+    SharedPayload,
+    import_function,
+    run_in_process,
+)
+
+
+def checksum(data):
+    return [len(data), sum(data) % 251, os.getpid()]
+
+
+@cpu_bound(inputs=lambda req: (req.params['n'], ), shm_threshold=None)
+def square(n):
+    return n * n
+
+
+handler = cpu_bound(checksum, shm_threshold=16)
+
+
+@pytest.fixture(scope='module')
+def process_pool():
+    pool = ProcessPoolExecutor(1)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def res(process_pool):
+    res = mock.Mock(headers={})
+    res.app.process_pool = process_pool
+    return res
+
+
+def test_handler_is_middleware():
+    assert isinstance(square, CpuBoundHandler)
+    assert square.__name__ == 'square'
+    assert square.__qualname__ == 'square'
+
+
+def test_handler_pickles_as_function():
+    assert pickle.loads(pickle.dumps(square)) is square.func
+    assert import_function(__name__, 'checksum') is checksum
+
+
+def test_run_in_process_reads_shared_payload():
+    blocks = []
+    data = bytes(range(100))
+    payload = handler.share(data, blocks)
+    try:
+        assert isinstance(payload, SharedPayload)
+        assert run_in_process(len, (payload, )) == 100
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+def test_small_arguments_not_shared():
+    blocks = []
+    assert handler.share(b'abc', blocks) == b'abc'
+    assert handler.share(12345678901234567890, blocks) == 12345678901234567890
+    assert blocks == []
+
+
+@pytest.mark.asyncio
+async def test_cpu_bound_runs_in_process(res):
+    req = mock.Mock(params={'n': 12})
+    await square(req, res)
+    res.send_json.assert_called_once_with(144)
+
+
+@pytest.mark.asyncio
+async def test_cpu_bound_shares_request_body(res):
+    data = bytes(range(256)) * 4
+
+    async def body():
+        return data
+
+    req = mock.Mock(body=body)
+    await handler(req, res)
+    size, total, pid = res.send_json.call_args[0][0]
+    assert (size, total) == (len(data), sum(data) % 251)
+    assert pid != os.getpid()
+
+
+@pytest.mark.parametrize('result, method', [
+    ('text', 'send_text'),
+    ({'a': 1}, 'send_json'),
+])
+def test_send_result(result, method):
+    res = mock.Mock()
+    send_result(res, result)
+    getattr(res, method).assert_called_once_with(result)
+
+
+def test_send_result_bytes():
+    res = mock.Mock(headers={})
+    send_result(res, b'\x00\x01')
+    assert res.message == b'\x00\x01'
+    assert res.headers['Content-Type'] == 'application/octet-stream'
+    assert res.end.called
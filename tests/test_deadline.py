@@ -0,0 +1,170 @@
+#
+# tests/test_deadline.py
+#
+
+import time
+import asyncio
+import pytest
+from unittest import mock
+
+import growler
+from growler.core.deadline import (
+    deadline,
+    deadline_timeout,
+    parse_timeout_header,
+    run_to_completion,
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ('1.5', 1.5),
+    (' 2 ', 2.0),
+    ('0', 0.0),
+    ('soon', None),
+    ('nan', None),
+])
+def test_parse_timeout_header(value, expected):
+    assert parse_timeout_header(value) == expected
+
+
+def test_deadline_marks_function():
+    @deadline(0.25)
+    def a(req, res):
+        pass
+
+    assert deadline_timeout(a) == 0.25
+    assert deadline_timeout(lambda req, res: None) is None
+    assert deadline_timeout(mock.Mock()) is None
+
+
+def test_time_remaining():
+    req = growler.http.HTTPRequest(mock.MagicMock(), {})
+    assert req.time_remaining is None
+    req.deadline = time.monotonic() + 10
+    assert 9 < req.time_remaining <= 10
+    req.deadline = time.monotonic() - 1
+    assert req.time_remaining == 0.0
+
+
+@pytest.fixture
+def req():
+    return mock.Mock(spec=growler.http.HTTPRequest,
+                     path='/',
+                     method=0x01,
+                     headers={},
+                     deadline=None)
+
+
+@pytest.fixture
+def res():
+    return mock.Mock(spec=growler.http.HTTPResponse, has_ended=False, pending=None)
+
+
+@pytest.mark.asyncio
+async def test_slow_middleware_times_out(req, res):
+    app = growler.App(request_timeout=0.01)
+    app.handle_timeout = mock.Mock()
+    cancelled = []
+
+    @app.use
+    async def slow(req, res):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    await app.handle_client_request(req, res)
+    assert cancelled
+    app.handle_timeout.assert_called_once_with(req, res, 504)
+    assert req.deadline is not None
+
+
+@pytest.mark.asyncio
+async def test_route_deadline_overrides_app(req, res):
+    app = growler.App(request_timeout=10)
+
+    @app.get('/')
+    @deadline(0.01)
+    async def slow(req, res):
+        await asyncio.sleep(1)
+
+    assert app.pipeline(0x01, '/').timeout == 0.01
+    await app.handle_client_request(req, res)
+    assert res.send_html.call_args[0][1] == 504
+
+
+@pytest.mark.asyncio
+async def test_header_shortens_deadline(req, res):
+    app = growler.App(request_timeout=10, deadline_header='X-Request-Timeout')
+    app.handle_timeout = mock.Mock()
+    req.headers['X-REQUEST-TIMEOUT'] = '0'
+    called = []
+    app.use(lambda req, res: called.append(True))
+
+    await app.handle_client_request(req, res)
+    assert not called
+    app.handle_timeout.assert_called_once_with(req, res, 503)
+
+
+@pytest.mark.asyncio
+async def test_fast_middleware_within_deadline(req, res):
+    app = growler.App(request_timeout=1)
+    app.handle_timeout = mock.Mock()
+
+    @app.use
+    def fast(req, res):
+        assert req.time_remaining is None or req.time_remaining > 0
+        res.has_ended = True
+
+    await app.handle_client_request(req, res)
+    assert not app.handle_timeout.called
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_is_counted(event_loop, req, res):
+    app = growler.App()
+
+    @app.use
+    async def slow(req, res):
+        await asyncio.sleep(1)
+
+    task = event_loop.create_task(app.handle_client_request(req, res))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert app.abandoned_requests == 1
+    assert req.cancel_on_disconnect is True
+    assert not res.send_html.called
+
+
+def test_run_to_completion_route():
+    app = growler.App()
+
+    @app.post('/')
+    @run_to_completion
+    def charge(req, res):
+        pass
+
+    app.get('/', lambda req, res: None)
+    assert app.pipeline(growler.http.HTTPMethod.GET, '/').cancellable
+    assert not app.pipeline(growler.http.HTTPMethod.POST, '/').cancellable
+
+
+@pytest.mark.asyncio
+async def test_resumed_request_keeps_cancel_opt_out(req, res):
+    app = growler.App()
+    res.has_ended = False
+    res.pending = None
+
+    @app.use
+    def opt_out(req, res):
+        req.cancel_on_disconnect = False
+        return asyncio.sleep(0)
+
+    app.use(lambda req, res: None)
+
+    await app.dispatch(req, res)
+    assert req.cancel_on_disconnect is False
@@ -29,7 +29,9 @@ def MockGrowlerHTTPProtocol(request):
 def mock_app(mock_req_factory, mock_res_factory):
     return mock.Mock(spec=growler.Application,
                      _request_class=mock_req_factory,
-                     _response_class=mock_res_factory)
+                     _response_class=mock_res_factory,
+                     inline_sync=False,
+                     eager_tasks=False)
 
 
 @pytest.fixture
@@ -52,7 +54,7 @@ def mock_req():
 
 @pytest.fixture
 def mock_res():
-    res = mock.Mock(spec=growler.http.HTTPResponse)
+    res = mock.Mock(spec=growler.http.HTTPResponse, pending=None)
     return res
 
 
@@ -170,6 +172,19 @@ def test_begin_application(proto, mock_app, mock_req, mock_res):
     mock_app.handle_client_request.assert_called_with(mock_req, mock_res)
 
 
+def test_begin_application_inline(proto, mock_app, mock_req, mock_res):
+    proto.loop = mock.Mock()
+    mock_app.inline_sync = True
+    mock_app.dispatch.return_value = None
+    proto.begin_application(mock_req, mock_res)
+    mock_app.dispatch.assert_called_with(mock_req, mock_res)
+    assert not proto.loop.create_task.called
+
+    mock_app.dispatch.return_value = continuation = mock.Mock()
+    proto.begin_application(mock_req, mock_res)
+    proto.loop.create_task.assert_called_with(continuation)
+
+
 @pytest.mark.asyncio
 async def test_body_storage_pair(proto):
     data = b'test data'
@@ -107,6 +107,12 @@ def test_type_is(empty_req, mock_responder):
     assert empty_req.type_is(a_type)
 
 
+def test_unrouted_request_defaults(empty_req):
+    assert empty_req.params is None
+    assert empty_req.deadline is None
+    assert empty_req.cancel_on_disconnect is True
+
+
 def test_ip_property(empty_req, mock_responder):
     assert empty_req.ip is mock_responder.ip
 
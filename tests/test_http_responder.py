@@ -167,6 +167,7 @@ def test_build_req_and_res(responder, mock_req, mock_res):
     req, res = responder.build_req_and_res()
     assert req is mock_req
     assert res is mock_res
+    assert res.request is req
 
 
 def test_set_request_line(responder, mock_protocol):
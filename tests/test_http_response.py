@@ -4,6 +4,7 @@
 
 import pytest
 import random
+import asyncio
 import growler
 
 from pathlib import Path
@@ -11,6 +12,7 @@ from unittest import mock
 from asyncio import BaseEventLoop
 from collections import OrderedDict
 from growler.http.response import Headers
+from growler.utils.json_encoding import stdlib_json_encoder
 
 from mock_classes import (
     request_uri,
@@ -30,6 +32,8 @@ def headers():
 @pytest.fixture
 def mock_app():
     return mock.Mock(spec=growler.App,
+                     json_encoder=stdlib_json_encoder,
+                     json_offload_threshold=None,
                      )
 
 @pytest.fixture
@@ -40,6 +44,7 @@ def mock_protocol(mock_app, request_uri):
     protocol = mock.Mock(spec=growler.http.GrowlerHTTPProtocol,
                          loop=mock.Mock(spec=BaseEventLoop),
                          http_application=mock_app,
+                         writing_paused=False,
                          headers=None,
                          path=unquote(parsed_url.path),
                          query=parse_qs(parsed_url.query),)
@@ -203,8 +208,8 @@ def test_redirect(res, mock_protocol, url, status):
 
 
 @pytest.mark.parametrize('obj, expect', [
-    ({'a': 'b'}, b'{"a": "b"}'),
-    ({'x': [1, 2., 3]}, b'{"x": [1, 2.0, 3]}'),
+    ({'a': 'b'}, b'{"a":"b"}'),
+    ({'x': [1, 2., 3]}, b'{"x":[1,2.0,3]}'),
     ("spamalot!", b'"spamalot!"'),
 ])
 def test_json(res, mock_protocol, obj, expect):
@@ -254,6 +259,34 @@ def test_send_file(res, mock_protocol, tmpdir):
     assert length_header in header_bytes
 
 
+@pytest.mark.asyncio
+async def test_send_file_waits_for_drain(event_loop, res, mock_protocol, tmpdir):
+    f = tmpdir / 'big.bin'
+    f.write(b'0123456789')
+    res.FILE_CHUNK_SIZE = 4
+    mock_protocol.loop = event_loop
+    mock_protocol.writing_paused = True
+    drained = asyncio.Event()
+
+    async def drain():
+        await drained.wait()
+
+    mock_protocol.drain = drain
+    pending = res.send_file(str(f))
+    assert res.pending is pending
+    await asyncio.sleep(0)
+    writes = mock_protocol.transport.write.call_args_list
+    assert [c[0][0] for c in writes[1:]] == [b'0123']
+    assert not res.has_ended
+
+    mock_protocol.writing_paused = False
+    drained.set()
+    await pending
+    assert b''.join(c[0][0] for c in writes[1:]) == b'0123456789'
+    assert res.has_ended
+    assert res.pending is None
+
+
 def test_send_file_by_path_object(res, mock_protocol, tmpdir):
     data = b'spam-spam-spam'
     f = tmpdir / 'spam.txt'
@@ -266,7 +299,7 @@ def test_send_file_by_path_object(res, mock_protocol, tmpdir):
 
 
 @pytest.mark.parametrize('obj, expect', [
-    ({'a': 'b'}, b'{"a": "b"}')
+    ({'a': 'b'}, b'{"a":"b"}')
 ])
 def test_headers(res, mock_protocol, obj, expect):
     res.json(obj)
@@ -360,3 +393,166 @@ def test_headers_add_header_tuple(headers):
 def test_headers_add_header_with_params(headers):
     headers.add_header('A', 'b', encoding='utf8', foo='bar')
     assert str(headers) == 'A: b; encoding="utf8" foo="bar"\r\n\r\n'
+
+
+@pytest.fixture
+def range_file(tmpdir):
+    f = tmpdir / 'range.bin'
+    f.write(b'0123456789abcdefghij')
+    return str(f)
+
+
+def range_request(range_value, **headers):
+    headers['RANGE'] = range_value
+    return mock.Mock(headers=headers, method=growler.http.HTTPMethod.GET)
+
+
+def test_send_file_accept_ranges(res, mock_protocol, range_file):
+    res.send_file(range_file)
+    header_bytes = mock_protocol.transport.write.call_args_list[0][0][0]
+    assert b'\r\nAccept-Ranges: bytes\r\n' in header_bytes
+    assert res.status_code == 200
+
+
+@pytest.mark.parametrize('range_value, expect, content_range', [
+    ('bytes=0-4', b'01234', 'bytes 0-4/20'),
+    ('bytes=15-', b'fghij', 'bytes 15-19/20'),
+    ('bytes=-3', b'hij', 'bytes 17-19/20'),
+    ('bytes=18-100', b'ij', 'bytes 18-19/20'),
+    ('bytes=2-3,4-5', b'2345', 'bytes 2-5/20'),
+])
+def test_send_file_single_range(res, mock_protocol, range_file,
+                                range_value, expect, content_range):
+    res.request = range_request(range_value)
+    res.send_file(range_file)
+
+    assert res.status_code == 206
+    assert res.headers['Content-Range'] == content_range
+
+    header_bytes = mock_protocol.transport.write.call_args_list[0][0][0]
+    assert header_bytes.startswith(b'HTTP/1.1 206 Partial Content\r\n')
+    length_header = ('\r\nContent-Length: %d\r\n' % len(expect)).encode()
+    assert length_header in header_bytes
+
+    body = b''.join(c[0][0] for c in mock_protocol.transport.write.call_args_list[1:])
+    assert body == expect
+
+
+def test_send_file_multiple_ranges(res, mock_protocol, range_file):
+    res.request = range_request('bytes=0-1, 10-12')
+    res.set_type('text/plain')
+    res.send_file(range_file)
+
+    assert res.status_code == 206
+    content_type = res.headers['Content-Type']
+    assert content_type.startswith('multipart/byteranges; boundary=')
+    boundary = content_type.split('=', 1)[1].encode()
+
+    body = b''.join(c[0][0] for c in mock_protocol.transport.write.call_args_list[1:])
+    assert int(res.headers['Content-Length']) == len(body)
+    assert b'\r\nContent-Range: bytes 0-1/20\r\n\r\n01\r\n--' + boundary in body
+    assert b'\r\nContent-Range: bytes 10-12/20\r\n\r\nabc\r\n--' + boundary in body
+    assert body.endswith(b'--' + boundary + b'--\r\n')
+    assert body.count(b'Content-Type: text/plain') == 2
+
+
+def test_send_file_unsatisfiable_range(res, mock_protocol, range_file):
+    res.request = range_request('bytes=20-30')
+    res.send_file(range_file)
+
+    assert res.status_code == 416
+    assert res.headers['Content-Range'] == 'bytes */20'
+    assert mock_protocol.transport.write.call_count == 1
+    mock_protocol.transport.write_eof.assert_called_with()
+
+
+@pytest.mark.parametrize('range_value', [
+    'items=0-4',
+    'bytes=4-0',
+    'bytes=a-b',
+    'bytes=-',
+])
+def test_send_file_ignores_invalid_range(res, mock_protocol, range_file, range_value):
+    res.request = range_request(range_value)
+    res.send_file(range_file)
+    assert res.status_code == 200
+    assert 'Content-Range' not in res.headers
+
+
+@pytest.mark.parametrize('if_range, expected_status', [
+    ('abc', 206),
+    ('xyz', 200),
+    ('W/"abc"', 200),
+])
+def test_send_file_if_range(res, mock_protocol, range_file, if_range, expected_status):
+    res.headers['Etag'] = 'abc'
+    res.request = range_request('bytes=0-4', **{'IF-RANGE': if_range})
+    res.send_file(range_file)
+    assert res.status_code == expected_status
+
+
+def test_send_file_range_ignored_on_non_get(res, mock_protocol, range_file):
+    res.request = range_request('bytes=0-4')
+    res.request.method = growler.http.HTTPMethod.POST
+    res.send_file(range_file)
+    assert res.status_code == 200
+
+
+def test_headers_contains_and_get(headers):
+    headers['Foo'] = 'bar'
+    assert 'foo' in headers
+    assert 'baz' not in headers
+    assert headers.get('FOO') == 'bar'
+    assert headers.get('baz', 'spam') == 'spam'
+
+
+@pytest.mark.asyncio
+async def test_send_json_offloaded(res, mock_protocol, mock_app, event_loop):
+    mock_protocol.loop = event_loop
+    mock_app.json_offload_threshold = 2
+    obj = {'x': [1, 2, 3]}
+
+    pending = res.send_json(obj)
+    assert pending is res.pending
+    assert not res.has_ended
+
+    await pending
+    assert res.has_ended
+    assert res.pending is None
+    body_bytes = mock_protocol.transport.write.call_args_list[1][0][0]
+    assert body_bytes == b'{"x":[1,2,3]}'
+
+
+def test_send_json_custom_encoder(res, mock_protocol, mock_app):
+    mock_app.json_encoder = mock.Mock(return_value=b'[]')
+    assert res.send_json([1]) is None
+    mock_app.json_encoder.assert_called_with([1])
+    body_bytes = mock_protocol.transport.write.call_args_list[1][0][0]
+    assert body_bytes == b'[]'
+
+
+@pytest.fixture
+def head_request():
+    return mock.Mock(headers={}, method=growler.http.HTTPMethod.HEAD)
+
+
+def test_head_send_text_omits_body(res, mock_protocol, head_request):
+    res.request = head_request
+    res.send_text('some text')
+
+    assert mock_protocol.transport.write.call_count == 1
+    header_bytes = mock_protocol.transport.write.call_args_list[0][0][0]
+    assert b'\r\nContent-Length: 9\r\n' in header_bytes
+    assert res.has_ended
+
+
+def test_head_send_file_does_not_open(res, mock_protocol, head_request, range_file):
+    res.request = head_request
+    with mock.patch('io.FileIO') as file_io:
+        res.send_file(range_file)
+    assert not file_io.called
+
+    assert mock_protocol.transport.write.call_count == 1
+    header_bytes = mock_protocol.transport.write.call_args_list[0][0][0]
+    assert b'\r\nContent-Length: 20\r\n' in header_bytes
+    mock_protocol.transport.write_eof.assert_called_with()
@@ -0,0 +1,45 @@
+#
+# tests/test_json_encoding.py
+#
+
+import json
+import pytest
+from growler.utils.json_encoding import (
+    stdlib_json_encoder,
+    default_json_encoder,
+    json_size_hint,
+)
+
+
+@pytest.mark.parametrize('obj, expect', [
+    ({'a': 'b'}, b'{"a":"b"}'),
+    ([1, 2.5, None, True], b'[1,2.5,null,true]'),
+    ("spam", b'"spam"'),
+])
+def test_stdlib_json_encoder(obj, expect):
+    assert stdlib_json_encoder(obj) == expect
+
+
+def test_default_json_encoder_is_stdlib():
+    assert default_json_encoder is stdlib_json_encoder
+    assert default_json_encoder({1: 'a'}) == b'{"1":"a"}'
+    assert default_json_encoder(2 ** 70) == str(2 ** 70).encode()
+    assert default_json_encoder(float('nan')) == b'NaN'
+
+
+def test_default_json_encoder_returns_bytes():
+    obj = {'x': [1, 2, {'y': 'z'}]}
+    result = default_json_encoder(obj)
+    assert isinstance(result, bytes)
+    assert json.loads(result.decode()) == obj
+
+
+@pytest.mark.parametrize('obj, limit, expect', [
+    (1, 10, 1),
+    ([1, 2, 3], 10, 6),
+    ({'a': [1, 2], 'b': 3}, 10, 7),
+    ('x' * 640, 100, 10),
+    (list(range(1000)), 10, 11),
+])
+def test_json_size_hint(obj, limit, expect):
+    assert json_size_hint(obj, limit) == expect
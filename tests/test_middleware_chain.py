@@ -256,3 +256,44 @@ def test_chain_reversed(chain):
     rev = reversed(chain)
     assert next(rev).func is mw1
     assert next(rev).func is mw0
+
+
+@pytest.mark.parametrize('mask, should_match', [
+    (growler.http.HTTPMethod.GET, True),
+    (growler.http.HTTPMethod.HEAD, True),
+    (growler.http.HTTPMethod.ALL, True),
+    (growler.http.HTTPMethod.POST, False),
+])
+def test_head_matches_get_middleware(chain, mask, should_match):
+    func = mock.Mock()
+    chain.add(mask, '/a', func)
+    matches = list(chain(growler.http.HTTPMethod.HEAD, '/a'))
+    assert (matches == [func]) == should_match
+
+
+def test_flatten_collects_enclosing_error_handlers(chain):
+    def outer_err(req, res, err):
+        pass
+
+    def inner_err(req, res, err):
+        pass
+
+    def mw(req, res):
+        pass
+
+    inner = MiddlewareChain()
+    inner.add(0x1, '', inner_err)
+    inner.add(0x1, '/b', mw)
+    chain.add(0x1, '', outer_err)
+    chain.add(0x1, '/a', inner)
+    chain.add(0x1, '', mw)
+
+    steps = [(node.func, tuple(h.func for h in handlers))
+             for node, handlers in chain.flatten(0x1, '/a/b')]
+    assert steps == [(mw, (outer_err, inner_err)), (mw, (outer_err, ))]
+
+
+def test_add_increments_generation(chain):
+    before = MiddlewareChain.generation
+    chain.add(0x1, '/', mock.Mock())
+    assert MiddlewareChain.generation == before + 1
@@ -0,0 +1,260 @@
+#
+# tests/test_offload.py
+#
+
+import time
+import asyncio
+import threading
+import pytest
+from unittest import mock
+
+import growler
+from growler.core.offload import (
+    blocking,
+    blocking_pool,
+    ThreadPool,
+    ThreadPools,
+    ThreadSafeStream,
+)
+
+
+def test_blocking_marks_function():
+    @blocking
+    def a(req, res):
+        pass
+
+    @blocking(pool='db')
+    def b(req, res):
+        pass
+
+    assert blocking_pool(a) == 'default'
+    assert blocking_pool(b) == 'db'
+    assert blocking_pool(lambda req, res: None) is None
+    assert blocking_pool(mock.Mock()) is None
+
+
+@pytest.mark.asyncio
+async def test_thread_pool_runs_in_worker(event_loop):
+    pool = ThreadPool('test', 2)
+    ident = await pool.run(event_loop, threading.get_ident)
+    assert ident != threading.get_ident()
+    assert pool.metrics() == {
+        'max_workers': 2,
+        'queued': 0,
+        'active': 0,
+        'completed': 1,
+        'max_queued': 1,
+    }
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_thread_pool_counts_queue(event_loop):
+    pool = ThreadPool('test', 1)
+    release = threading.Event()
+    first = event_loop.create_task(pool.run(event_loop, release.wait))
+    second = event_loop.create_task(pool.run(event_loop, lambda: None))
+    await asyncio.sleep(0.05)
+    assert pool.metrics()['active'] == 1
+    assert pool.metrics()['queued'] == 1
+    release.set()
+    await asyncio.gather(first, second)
+    assert pool.metrics()['max_queued'] >= 1
+    assert pool.metrics()['completed'] == 2
+    pool.shutdown()
+
+
+def test_thread_safe_stream():
+    stream, loop = mock.Mock(), mock.Mock()
+    safe = ThreadSafeStream(stream, loop)
+
+    def from_worker():
+        safe.write(b'x')
+        safe.write_eof()
+
+    worker = threading.Thread(target=from_worker)
+    worker.start()
+    worker.join()
+    assert loop.call_soon_threadsafe.call_args_list == [
+        mock.call(stream.write, b'x'),
+        mock.call(stream.write_eof),
+    ]
+    assert not stream.write.called
+
+    # writes made on the loop's thread are not delayed
+    safe.write(b'y')
+    stream.write.assert_called_once_with(b'y')
+
+
+def test_abandoned_thread_safe_stream_drops_worker_output():
+    stream, loop = mock.Mock(), mock.Mock()
+    safe = ThreadSafeStream(stream, loop)
+    safe.abandoned = True
+    worker = threading.Thread(target=safe.write, args=(b'x', ))
+    worker.start()
+    worker.join()
+    assert not loop.call_soon_threadsafe.called
+    safe.write(b'y')
+    stream.write.assert_called_once_with(b'y')
+
+
+def test_thread_pools_configure():
+    pools = ThreadPools(default_max_workers=3)
+    assert pools.get('a').max_workers == 3
+    pools.configure('a', 5)
+    assert pools.get('a').max_workers == 5
+    assert set(pools.metrics()) == {'a'}
+    pools.shutdown()
+
+
+@pytest.fixture
+def app():
+    return growler.App()
+
+
+@pytest.fixture
+def req():
+    return mock.Mock(spec=growler.http.HTTPRequest, path='/', method=0x01, deadline=None)
+
+
+@pytest.fixture
+def res():
+    return mock.Mock(spec=growler.http.HTTPResponse, has_ended=False, pending=None)
+
+
+@pytest.mark.asyncio
+async def test_blocking_middleware_runs_in_pool(app, req, res):
+    threads = []
+
+    @app.use
+    @blocking(pool='legacy')
+    def legacy(req, res):
+        threads.append(threading.get_ident())
+        res.has_ended = True
+
+    app.thread_pool('legacy', 2)
+    await app.handle_client_request(req, res)
+    assert threads and threads[0] != threading.get_ident()
+    assert app.thread_pools.metrics()['legacy']['completed'] == 1
+    app.thread_pools.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_offload_sync_policy(req, res):
+    app = growler.App(offload_sync=True)
+    threads = []
+
+    @app.use
+    def plain(req, res):
+        threads.append(threading.get_ident())
+
+    @app.use
+    async def coro(req, res):
+        threads.append(threading.get_ident())
+        res.has_ended = True
+
+    await app.handle_client_request(req, res)
+    assert threads[0] != threading.get_ident()
+    assert threads[1] == threading.get_ident()
+    assert app.pipeline(0x01, '/').blocking == ('default', None)
+    app.thread_pools.shutdown()
+
+
+def make_response(app):
+    protocol = mock.Mock(spec=growler.http.GrowlerHTTPProtocol,
+                         http_application=app)
+    res = growler.http.HTTPResponse(protocol)
+    res.request = mock.Mock(method=growler.http.HTTPMethod.GET)
+    return res
+
+
+def sent_bytes(res):
+    return b''.join(c[0][0] for c in res.protocol.transport.write.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_blocking_response_events_run_on_loop(app, req):
+    res = make_response(app)
+    seen = []
+
+    @app.use
+    @blocking
+    def handler(req, res):
+        res.events.on('after_send', lambda: seen.append((threading.get_ident(),
+                                                         sent_bytes(res))))
+        res.send_text('hello')
+
+    await app.handle_client_request(req, res)
+    assert seen == [(threading.get_ident(), sent_bytes(res))]
+    assert seen[0][1].endswith(b'\r\n\r\nhello')
+    assert res.stream is res.protocol.transport
+    assert res.handoff is None
+    app.thread_pools.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_blocking_send_file_waits_for_drain(event_loop, app, req, tmpdir):
+    f = tmpdir / 'big.bin'
+    f.write(b'0123456789')
+    res = make_response(app)
+    res.FILE_CHUNK_SIZE = 4
+    res.protocol.writing_paused = True
+    drained = asyncio.Event()
+
+    async def drain():
+        if res.protocol.writing_paused:
+            await drained.wait()
+
+    res.protocol.drain = drain
+
+    @app.use
+    @blocking
+    def handler(req, res):
+        res.send_file(str(f))
+
+    handling = event_loop.create_task(app.handle_client_request(req, res))
+    while not res.protocol.transport.write.call_count > 1:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    assert sent_bytes(res).endswith(b'\r\n\r\n0123')
+
+    res.protocol.writing_paused = False
+    drained.set()
+    await handling
+    assert sent_bytes(res).endswith(b'\r\n\r\n0123456789')
+    assert res.has_ended
+    app.thread_pools.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_timed_out_blocking_middleware_cannot_write(req):
+    app = growler.App(request_timeout=0.05)
+    res = make_response(app)
+    finished = threading.Event()
+
+    @app.use
+    @blocking
+    def slow(req, res):
+        finished.wait(1)
+        res.send_text('late')
+
+    await app.handle_client_request(req, res)
+    head = sent_bytes(res)
+    assert head.startswith(b'HTTP/1.1 504 ')
+    assert res.stream is not res.protocol.transport
+
+    finished.set()
+    await asyncio.sleep(0.05)
+    assert sent_bytes(res) == head
+    assert res.stream is res.protocol.transport
+    app.thread_pools.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_blocking_middleware_skipped_past_deadline(app, req, res):
+    called = []
+    req.deadline = time.monotonic() - 1
+    pools = app.thread_pools
+    await pools.run('default', lambda req, res: called.append(True), req, res)
+    assert not called
+    pools.shutdown()
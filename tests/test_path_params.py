@@ -0,0 +1,63 @@
+#
+# tests/test_path_params.py
+#
+
+import uuid
+import pytest
+
+from growler.core import path_params
+from growler.core.path_params import Param
+
+
+@pytest.mark.parametrize('segment, name, converter', [
+    (':id', 'id', 'str'),
+    (':id<int>', 'id', 'int'),
+    (':x<float>', 'x', 'float'),
+    (':key<uuid>', 'key', 'uuid'),
+    ('*rest', 'rest', 'path'),
+])
+def test_parse_param_segment(segment, name, converter):
+    param = path_params.parse_segment(segment)
+    assert isinstance(param, Param)
+    assert param.name == name
+    assert param.converter.name == converter
+
+
+@pytest.mark.parametrize('segment', ['users', '', 'a:b', '*', ':'])
+def test_parse_literal_segment(segment):
+    assert path_params.parse_segment(segment) == segment
+
+
+def test_unknown_converter():
+    with pytest.raises(ValueError):
+        path_params.parse_segment(':id<nope>')
+
+
+@pytest.mark.parametrize('path, expected', [
+    ('/users', False),
+    ('/users/:id', True),
+    ('/files/*path', True),
+])
+def test_has_params(path, expected):
+    assert path_params.has_params(path) is expected
+
+
+@pytest.mark.parametrize('path, req_path, groups', [
+    ('/users/:id<int>', '/users/12', {'id': '12'}),
+    ('/users/:id<int>', '/users/ab', None),
+    ('/v/:x<float>', '/v/1.5', {'x': '1.5'}),
+    ('/files/*path', '/files/a/b.txt', {'path': 'a/b.txt'}),
+    ('/a.b/:x', '/a.b/y', {'x': 'y'}),
+    ('/a.b/:x', '/axb/y', None),
+])
+def test_path_to_regex(path, req_path, groups):
+    match = path_params.path_to_regex(path).fullmatch(req_path)
+    if groups is None:
+        assert match is None
+    else:
+        assert match.groupdict() == groups
+
+
+def test_path_converters():
+    converters = path_params.path_converters('/:a<int>/:b/:c<uuid>')
+    assert converters == {'a': int, 'b': str, 'c': uuid.UUID}
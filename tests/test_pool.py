@@ -0,0 +1,219 @@
+#
+# tests/test_pool.py
+#
+
+import asyncio
+import pytest
+
+import growler
+from growler.utils.pool import (
+    AsyncPool,
+    PoolClosed,
+    PoolTimeout,
+)
+
+
+class FakeConnection:
+
+    def __init__(self, ident):
+        self.ident = ident
+        self.open = True
+
+    def close(self):
+        self.open = False
+
+
+class Factory:
+
+    def __init__(self):
+        self.made = []
+
+    async def __call__(self):
+        conn = FakeConnection(len(self.made))
+        self.made.append(conn)
+        return conn
+
+
+class Clock:
+    now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def factory():
+    return Factory()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.mark.parametrize("sizes", [(0, 0), (3, 2), (-1, 2)])
+def test_invalid_sizes(factory, sizes):
+    with pytest.raises(ValueError):
+        AsyncPool(factory, min_size=sizes[0], max_size=sizes[1])
+
+
+@pytest.mark.asyncio
+async def test_acquire_reuses_released(factory):
+    pool = AsyncPool(factory, max_size=2)
+    conn = await pool.acquire()
+    await pool.release(conn)
+    assert await pool.acquire() is conn
+    assert pool.metrics()['created'] == 1
+    assert pool.metrics()['acquired'] == 2
+    assert pool.in_use == 1
+
+
+@pytest.mark.asyncio
+async def test_waiters_served_in_order(event_loop, factory):
+    pool = AsyncPool(factory, max_size=1)
+    conn = await pool.acquire()
+    order = []
+
+    async def borrow(name):
+        got = await pool.acquire()
+        order.append(name)
+        await pool.release(got)
+
+    tasks = [event_loop.create_task(borrow(n)) for n in 'abc']
+    await asyncio.sleep(0)
+    assert pool.waiting == 3
+    await pool.release(conn)
+    await asyncio.gather(*tasks)
+    assert order == ['a', 'b', 'c']
+    assert len(factory.made) == 1
+
+
+@pytest.mark.asyncio
+async def test_acquire_timeout(factory):
+    pool = AsyncPool(factory, max_size=1, acquire_timeout=0.01)
+    conn = await pool.acquire()
+    with pytest.raises(PoolTimeout):
+        await pool.acquire()
+    assert pool.timeouts == 1
+    assert pool.waiting == 0
+    await pool.release(conn)
+    assert await pool.acquire() is conn
+
+
+@pytest.mark.asyncio
+async def test_check_replaces_unhealthy(factory):
+    pool = AsyncPool(factory, check=lambda conn: conn.open)
+    conn = await pool.acquire()
+    await pool.release(conn)
+    conn.open = False
+
+    replacement = await pool.acquire()
+    assert replacement is not conn
+    assert pool.failed_checks == 1
+    assert pool.size == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_check_keeps_resource(event_loop, factory):
+    checking = asyncio.Event()
+
+    async def check(conn):
+        checking.set()
+        await asyncio.sleep(10)
+        return True
+
+    pool = AsyncPool(factory, check=check)
+    conn = await pool.acquire()
+    await pool.release(conn)
+
+    task = event_loop.create_task(pool.acquire())
+    await checking.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert (pool.size, pool.idle) == (1, 1)
+    assert conn.open
+
+
+@pytest.mark.asyncio
+async def test_woken_waiter_keeps_its_place(event_loop, factory):
+    pool = AsyncPool(factory, max_size=1)
+    conn = await pool.acquire()
+    first = event_loop.create_task(pool.acquire())
+    await asyncio.sleep(0)
+
+    go = asyncio.Event()
+
+    async def later():
+        await go.wait()
+        return await pool.acquire()
+
+    second = event_loop.create_task(later())
+    await asyncio.sleep(0)
+    go.set()
+    # first is woken with the freed capacity, which is taken before it runs
+    await pool.release(conn, discard=True)
+    newcomer = await pool.acquire()
+    await asyncio.sleep(0)
+    assert pool.waiting == 2
+
+    await pool.release(newcomer)
+    assert await asyncio.wait_for(first, 1) is newcomer
+    assert not second.done()
+    second.cancel()
+
+
+@pytest.mark.asyncio
+async def test_idle_eviction(factory, clock):
+    pool = AsyncPool(factory, min_size=1, max_idle=10, clock=clock)
+    a, b = await pool.acquire(), await pool.acquire()
+    await pool.release(a)
+    clock.now += 5
+    await pool.release(b)
+    clock.now += 6
+
+    assert await pool.evict_idle() == 1
+    assert not a.open and b.open
+    clock.now += 20
+    assert await pool.evict_idle() == 0
+    assert pool.size == 1
+
+
+@pytest.mark.asyncio
+async def test_discard_frees_capacity(event_loop, factory):
+    pool = AsyncPool(factory, max_size=1)
+    conn = await pool.acquire()
+    waiter = event_loop.create_task(pool.acquire())
+    await asyncio.sleep(0)
+    await pool.release(conn, discard=True)
+    replacement = await waiter
+    assert replacement is not conn and not conn.open
+
+
+@pytest.mark.asyncio
+async def test_connection_context(factory):
+    pool = AsyncPool(factory)
+    async with pool.connection() as conn:
+        assert pool.in_use == 1
+    assert pool.idle == 1
+
+    with pytest.raises(ValueError):
+        async with pool.connection() as conn:
+            raise ValueError()
+    assert not conn.open
+    assert pool.size == 0
+
+
+@pytest.mark.asyncio
+async def test_attach_to_app(factory):
+    app = growler.App()
+    pool = AsyncPool(factory, min_size=2).attach(app, 'db')
+    assert app['db'] is pool
+
+    await app.startup()
+    assert pool.idle == 2
+    await app.shutdown()
+    assert pool.closed and pool.size == 0
+    assert not any(conn.open for conn in factory.made)
+    with pytest.raises(PoolClosed):
+        await pool.acquire()
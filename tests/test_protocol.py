@@ -109,3 +109,49 @@ def test_get_factory():
     assert callable(factory)
     proto = factory()
     assert isinstance(proto, GrowlerProtocol)
+
+
+@pytest.mark.asyncio
+async def test_connection_lost_cancels_tasks(event_loop, m_make_responder):
+    proto = GrowlerProtocol(event_loop, m_make_responder)
+    kept_req = mock.Mock(cancel_on_disconnect=False)
+    running = proto.track_task(event_loop.create_task(asyncio.sleep(1)))
+    kept = proto.track_task(event_loop.create_task(asyncio.sleep(0.01)), kept_req)
+    done = proto.track_task(event_loop.create_task(asyncio.sleep(0)))
+    await done
+    await asyncio.sleep(0)
+    assert done not in proto.tasks
+
+    assert proto.cancel_tasks() == 1
+    await asyncio.sleep(0)
+    assert running.cancelled()
+    assert not kept.cancelled()
+    await kept
+    assert proto.tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_while_writing_paused(event_loop, m_make_responder):
+    proto = GrowlerProtocol(event_loop, m_make_responder)
+    await proto.drain()
+
+    proto.pause_writing()
+    waiting = [event_loop.create_task(proto.drain()) for _ in range(2)]
+    await asyncio.sleep(0)
+    assert not any(task.done() for task in waiting)
+
+    waiting[0].cancel()
+    proto.resume_writing()
+    await asyncio.wait_for(waiting[1], 1)
+    assert waiting[0].cancelled()
+    assert not proto.writing_paused
+
+
+@pytest.mark.asyncio
+async def test_connection_lost_releases_drain(event_loop, m_make_responder):
+    proto = GrowlerProtocol(event_loop, m_make_responder)
+    proto.pause_writing()
+    waiting = event_loop.create_task(proto.drain())
+    await asyncio.sleep(0)
+    proto.connection_lost(None)
+    await asyncio.wait_for(waiting, 1)
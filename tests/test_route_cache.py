@@ -0,0 +1,71 @@
+#
+# tests/test_route_cache.py
+#
+
+import pytest
+from unittest import mock
+
+import growler
+from growler.core.middleware_chain import MiddlewareChain
+from growler.core.route_cache import RouteCache
+
+
+@pytest.fixture
+def cache():
+    return RouteCache(maxsize=2, admit_after=2)
+
+
+def test_key_admitted_on_second_put(cache):
+    cache.put('a', 1)
+    assert 'a' not in cache
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_admit_immediately():
+    cache = RouteCache(maxsize=2, admit_after=1)
+    cache.put('a', 1)
+    assert cache.get('a') == 1
+
+
+def test_least_recently_used_evicted():
+    cache = RouteCache(maxsize=2, admit_after=1)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert len(cache) == 2
+
+
+def test_one_off_keys_do_not_evict(cache):
+    cache.put('a', 1)
+    cache.put('a', 1)
+    for n in range(100):
+        cache.put('/item/%d' % n, n)
+    assert 'a' in cache
+    assert len(cache) == 1
+    assert len(cache._sightings) <= cache.maxsize
+
+
+def test_clear(cache):
+    cache.put('a', 1)
+    cache.put('a', 1)
+    cache.clear()
+    assert len(cache) == 0
+    cache.put('a', 1)
+    assert 'a' not in cache
+
+
+def test_app_pipeline_cache_sized_by_chain():
+    class SmallChain(MiddlewareChain):
+        route_cache_size = 16
+
+    app = growler.App(middleware_chain=SmallChain())
+    app.use(mock.Mock())
+    app.resolve(0x1, '/')
+    assert app._pipelines.maxsize == 16
+    assert not hasattr(app.middleware, '_route_cache')
@@ -0,0 +1,145 @@
+#
+# tests/test_route_index.py
+#
+
+import re
+import pytest
+from unittest import mock
+
+from growler.core.middleware_chain import MiddlewareChain, MiddlewareNode
+from growler.core.route_index import RouteIndex
+from growler.http.methods import HTTPMethod
+
+ROUTES = ['', '/', '/a', '/a/', '/a/b', '/a/b/c', '/b', '/[x-y]', 'rel']
+
+PATHS = ['/', '', '/a', '/a/', '/a/b', '/a/b/', '/a/bc', '/a/b/c/d',
+         '/ab', '/b/a', '/[x-y]/z', '/x', 'rel']
+
+
+def make_nodes(routes):
+    return [MiddlewareNode(func=mock.Mock(), mask=0x1, path=route,
+                           is_errorhandler=False, is_subchain=False)
+            for route in routes]
+
+
+def linear_lookup(nodes, path):
+    found = []
+    for node in nodes:
+        match, rest = node.path_split(path)
+        if match is not None:
+            found.append((node, rest))
+    return found
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_lookup_equals_linear_scan(path):
+    nodes = make_nodes(ROUTES)
+    index = RouteIndex(nodes)
+    result = [(node, rest) for node, match, rest in index.lookup(path)]
+    assert result == linear_lookup(nodes, path)
+
+
+def test_lookup_keeps_registration_order():
+    nodes = make_nodes(['/a/b', '/a', '/a/b', ''])
+    index = RouteIndex(nodes)
+    assert [node for node, _, _ in index.lookup('/a/b')] == nodes
+
+
+def test_regex_nodes_are_tested():
+    nodes = make_nodes(['/a'])
+    regex_node = MiddlewareNode(func=mock.Mock(), mask=0x1,
+                                path=re.compile(r'/a(?P<n>\d+)'),
+                                is_errorhandler=False, is_subchain=False)
+    nodes.insert(0, regex_node)
+    index = RouteIndex(nodes)
+    assert index.regex_nodes == [(0, regex_node)]
+
+    found = index.lookup('/a12/x')
+    assert [node for node, _, _ in found] == [regex_node]
+    assert found[0][1].groupdict() == {'n': '12'}
+    assert found[0][2] == '/x'
+
+
+def test_match_object_group():
+    index = RouteIndex(make_nodes(['/a']))
+    (node, match, rest), = index.lookup('/a/b')
+    assert match
+    assert match.group() == '/a'
+    assert rest == '/b'
+
+
+def test_chain_rebuilds_index_after_add():
+    chain = MiddlewareChain()
+    first = mock.Mock()
+    chain.add(0x1, '/a', first)
+    assert [mw.func for mw, _, _ in chain.find_matching_middleware(0x1, '/a')] == [first]
+
+    second = mock.Mock()
+    chain.add(0x1, '/a', second)
+    found = [mw.func for mw, _, _ in chain.find_matching_middleware(0x1, '/a')]
+    assert found == [first, second]
+
+
+def test_nested_subchain_route():
+    chain = MiddlewareChain()
+    inner = MiddlewareChain()
+    func = mock.Mock()
+    inner.add(0x1, '/list', func)
+    chain.add(0x1, '/blog', inner)
+
+    for mw in chain(0x1, '/blog/list'):
+        mw()
+    assert func.called
+
+
+def test_chain_keeps_index_per_method():
+    chain = MiddlewareChain()
+    get_func, post_func = mock.Mock(), mock.Mock()
+    chain.add(0b01, '/a', get_func)
+    chain.add(0b10, '/a', post_func)
+
+    assert [n.func for n in chain.route_index(0b01).nodes] == [get_func]
+    assert [n.func for n in chain.route_index(0b10).nodes] == [post_func]
+    assert chain.route_index(0b01) is chain.route_index(0b01)
+
+
+def test_head_index_includes_get_nodes():
+    chain = MiddlewareChain()
+    get_func = mock.Mock()
+    chain.add(HTTPMethod.GET, '/a', get_func)
+    chain.add(HTTPMethod.POST, '/a', mock.Mock())
+    head_or_get = chain.resolve_method(HTTPMethod.HEAD, '/a')
+    assert [n.func for n in chain.route_index(head_or_get).nodes] == [get_func]
+    assert chain.route_index(HTTPMethod.HEAD).nodes == []
+
+
+def test_chain_add_clears_method_indexes():
+    chain = MiddlewareChain()
+    chain.add(0b01, '/a', mock.Mock())
+    before = chain.route_index(0b01)
+    chain.add(0b01, '/b', mock.Mock())
+    assert chain.route_index(0b01) is not before
+    assert len(chain.route_index(0b01).nodes) == 2
+
+
+PARAM_ROUTES = ['/users/:id<int>', '/users/me', '/users/:name', '/users/:id<int>/posts',
+                '/files/*path', '/files/*path/x', '/f/:x<float>/']
+
+PARAM_PATHS = ['/users/12', '/users/me', '/users/-3/posts', '/users/ab/posts',
+               '/files/', '/files/a/b', '/files', '/files/a/x', '/f/1.5/z', '/f/1.5']
+
+
+@pytest.mark.parametrize('path', PARAM_PATHS)
+def test_param_lookup_equals_linear_scan(path):
+    nodes = make_nodes(PARAM_ROUTES)
+    index = RouteIndex(nodes)
+    result = [(node, match.groupdict(), rest) for node, match, rest in index.lookup(path)]
+    expected = [(node, node.path_split(path)[0].groupdict(), rest)
+                for node, rest in linear_lookup(nodes, path)]
+    assert result == expected
+
+
+def test_rest_param_followed_by_segments_not_indexed():
+    nodes = make_nodes(['/files/*path/x'])
+    index = RouteIndex(nodes)
+    assert index.regex_nodes == [(0, nodes[0])]
@@ -9,9 +9,11 @@ from growler import (
     RouterMeta,
     get_routing_attributes,
 )
+from growler.core.router import LazyRouter
 from unittest import mock
 import pytest
 import re
+import sys
 import types
 
 
@@ -321,3 +323,78 @@ def test_find_routable_attributes(router):
     for x, y in _find_routeable_attributes(obj, keys):
         assert y == 'GET'
         assert x == obj.get_something
+
+
+@pytest.fixture
+def lazy_module(monkeypatch):
+    module = types.ModuleType('growler_test_lazy_module')
+    module.router = Router()
+    module.make_router = lambda: module.router
+    module.not_a_router = object()
+    monkeypatch.setitem(sys.modules, module.__name__, module)
+    return module
+
+
+@pytest.mark.parametrize('target', [
+    'growler_test_lazy_module',
+    'growler_test_lazy_module:router',
+    'growler_test_lazy_module:make_router',
+])
+def test_lazy_router_import_target(lazy_module, target):
+    assert LazyRouter.import_target(target) is lazy_module.router
+
+
+def test_lazy_router_import_target_errors(lazy_module):
+    with pytest.raises(TypeError):
+        LazyRouter.import_target('growler_test_lazy_module:not_a_router')
+    with pytest.raises(AttributeError):
+        LazyRouter.import_target('growler_test_lazy_module:missing')
+    with pytest.raises(ImportError):
+        LazyRouter.import_target('growler_test_no_such_module:router')
+
+
+def test_lazy_router_loads_on_first_match(lazy_module):
+    endpoint = mock.Mock()
+    lazy_module.router.add(GET, '/list', endpoint)
+
+    lazy = LazyRouter('growler_test_lazy_module:router')
+    assert lazy.loaded is None
+    assert list(lazy(GET, '/list')) == [endpoint]
+    assert lazy.loaded is lazy_module.router
+
+    lazy.load()
+    assert len(lazy.mw_list) == 1
+
+
+def test_route_table_built_once_per_class():
+    from growler.core import router as router_module
+
+    class Controller:
+        def get_index(self, req, res):
+            """/"""
+
+        def post_item(self, req, res):
+            """/item"""
+
+    with mock.patch.object(router_module, '_find_routes',
+                           wraps=router_module._find_routes) as find:
+        first = router_module.routerify(Controller())
+        second = router_module.routerify(Controller())
+        assert find.call_count == 1
+
+    table = router_module.get_route_table(Controller)
+    assert table == ((GET, '/', 'get_index'), (POST, '/item', 'post_item'))
+    assert first.first().func.__self__ is not second.first().func.__self__
+
+
+def test_router_metaclass_uses_route_table():
+    class MetaRoutes(metaclass=RouterMeta):
+        def get_b(self, req, res):
+            """/b"""
+
+        def get_a(self, req, res):
+            """/a"""
+
+    obj = MetaRoutes()
+    router = obj._RouterMeta__growler_router()
+    assert [route[2] for route in router.routes] == [obj.get_b, obj.get_a]
@@ -0,0 +1,55 @@
+#
+# tests/test_vhost.py
+#
+
+import pytest
+from unittest import mock
+
+from growler.core.vhost import VirtualHosts
+
+
+@pytest.fixture
+def vhosts():
+    return VirtualHosts()
+
+
+@pytest.mark.parametrize('host, expected', [
+    ('Example.COM', 'example.com'),
+    ('example.com:8080', 'example.com'),
+    ('example.com.', 'example.com'),
+    ('[::1]:8000', '[::1]'),
+    ('  api.example.com ', 'api.example.com'),
+])
+def test_normalize(host, expected):
+    assert VirtualHosts.normalize(host) == expected
+
+
+def test_exact_match(vhosts):
+    chain = mock.Mock()
+    vhosts.add('api.example.com', chain)
+    assert vhosts.match('API.example.com:443') == ('api.example.com', chain)
+    assert vhosts.match('example.com') is None
+    assert len(vhosts) == 1
+
+
+def test_wildcard_match(vhosts):
+    outer, inner = mock.Mock(), mock.Mock()
+    vhosts.add('*.example.com', outer)
+    vhosts.add('*.eu.example.com', inner)
+    assert vhosts.match('a.example.com') == ('.example.com', outer)
+    assert vhosts.match('a.b.example.com') == ('.example.com', outer)
+    assert vhosts.match('x.eu.example.com') == ('.eu.example.com', inner)
+    assert vhosts.match('example.com') is None
+
+
+def test_exact_precedes_wildcard(vhosts):
+    exact, wild = mock.Mock(), mock.Mock()
+    vhosts.add('*.example.com', wild)
+    vhosts.add('api.example.com', exact)
+    assert vhosts.match('api.example.com')[1] is exact
+
+
+@pytest.mark.parametrize('hostname', ['a.*.com', '*.*.com', 'api*'])
+def test_invalid_wildcards(vhosts, hostname):
+    with pytest.raises(ValueError):
+        vhosts.add(hostname, mock.Mock())